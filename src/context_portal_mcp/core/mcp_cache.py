@@ -3,16 +3,30 @@ File-based MCP cache for server-level settings (e.g., output capture toggle).
 Mirrors the UI cache pattern but scoped for MCP/server concerns.
 """
 
+import atexit
+import functools
+import heapq
 import json
 import logging
+import os
+import queue
 import re
-from datetime import datetime
+import string
+import threading
+import time
+from datetime import datetime, timezone
+from operator import itemgetter
 from pathlib import Path
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional, List, Tuple
 
 from .config import get_database_path
 from .exceptions import DatabaseError
 
+try:  # Optional C JSON encoder/decoder; stdlib json is used when it is not installed
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
 log = logging.getLogger(__name__)
 
 _DEFAULT_CAPTURE_CONFIG: Dict[str, Any] = {
@@ -25,23 +39,110 @@ _DEFAULT_CAPTURE_CONFIG: Dict[str, Any] = {
 }
 
 _SAFE_BASENAME_PATTERN = re.compile(r"[^A-Za-z0-9._-]+")
-
-# Matches our capture naming convention: `<stem>_YYYYMMDD_HHMMSS_mmm.json`
-_CAPTURE_TIMESTAMP_SUFFIX_RE = re.compile(r"_(\d{8}_\d{6}_\d{3})\.json$")
+_SAFE_BASENAME_CHARS = frozenset(string.ascii_letters + string.digits + "._-")
+# ASCII names are sanitized with a single str.translate pass: every unsafe
+# character becomes NUL, and NUL runs are then joined back with one "_" so the
+# result matches _SAFE_BASENAME_PATTERN.sub("_", name).
+_SAFE_TRANSLATE_TABLE = {c: 0 for c in range(128) if chr(c) not in _SAFE_BASENAME_CHARS}
+
+# Our capture naming convention is `<stem>_YYYYMMDD_HHMMSS_mmm.json`; the suffix is
+# fixed-width, so it is checked by position (formerly `_(\d{8}_\d{6}_\d{3})\.json$`).
+_CAPTURE_SUFFIX_LEN = len("_YYYYMMDD_HHMMSS_mmm.json")
+
+# In-memory settings cache: (workspace_id, key) -> (insert_ts, mtime, value).
+# Entries are written through by `save_mcp_setting`; the TTL bounds staleness
+# when the file is edited externally without its mtime changing.
+CACHE_TTL = float(os.getenv("CONPORT_SETTINGS_CACHE_TTL", "10"))
+_SETTINGS_CACHE: Dict[Tuple[str, str], Tuple[float, float, Any]] = {}
+_SETTINGS_CACHE_LOCK = threading.Lock()
+
+# Resolved (and already created) directories per workspace, so the hot
+# save/load/capture paths skip `get_database_path` and `mkdir` after first use.
+_CACHE_DIR_MEMO: Dict[str, Path] = {}
+_OUTPUT_DIR_MEMO: Dict[str, Path] = {}
+_WORKSPACE_PATH_MEMO: Dict[str, Path] = {}
+
+# Merged output-capture config per workspace: (stored, last, pending, merged config)
+_CAPTURE_CONFIG_CACHE: Dict[str, Tuple[Any, Any, Any, Dict[str, Any]]] = {}
+_DIR_MEMO_LOCK = threading.Lock()
+
+# `last_capture_*` pointers are non-critical metadata kept in their own small
+# `last_capture.json` (so output_capture.json is only rewritten when the actual
+# settings change). They are held here and coalesced into a single save every `_LAST_CAPTURE_FLUSH_EVERY` captures, after
+# `_LAST_CAPTURE_FLUSH_INTERVAL` seconds, or at interpreter exit.
+_LAST_CAPTURE_FLUSH_EVERY = 16
+_LAST_CAPTURE_FLUSH_INTERVAL = 5.0
+_LAST_CAPTURE_KEYS = ("last_capture_file", "last_capture_tool")
+_pending_last_capture: Dict[str, Dict[str, Any]] = {}
+_pending_capture_count = 0
+_pending_flush_timer: Optional[threading.Timer] = None
+_PENDING_LOCK = threading.Lock()
+
+# Opt-in background capture writer (CONPORT_CAPTURE_ASYNC=1). Tool responses
+# then return as soon as the payload is serialized; a daemon thread drains the
+# queue in batches. The default stays synchronous so a failed write is still
+# reported by returning None.
+CAPTURE_ASYNC = os.getenv("CONPORT_CAPTURE_ASYNC", "").strip().lower() in ("1", "true", "yes", "on")
+_CAPTURE_BATCH_MAX = 32
+_capture_queue: "queue.Queue[Tuple[Path, bytes, Dict[str, Any]]]" = queue.Queue()
+_capture_writer: Optional[threading.Thread] = None
+_CAPTURE_WRITER_LOCK = threading.Lock()
 
 
 def get_mcp_cache_dir(workspace_id: str) -> Path:
     """Return `<workspace>/context_portal_aimed/mcp-cache/`, creating it if missing."""
+    cache_dir = _CACHE_DIR_MEMO.get(workspace_id)
+    if cache_dir is not None:
+        return cache_dir
     try:
         db_path = get_database_path(workspace_id)
         cache_dir = db_path.parent / "mcp-cache"
         cache_dir.mkdir(parents=True, exist_ok=True)
+        with _DIR_MEMO_LOCK:
+            _CACHE_DIR_MEMO[workspace_id] = cache_dir
         return cache_dir
     except Exception as e:  # pragma: no cover - defensive logging
         log.error(f"Failed to create MCP cache directory for {workspace_id}: {e}")
         raise DatabaseError(f"Could not create MCP cache directory: {e}")
 
 
+def _dump_json_bytes(obj: Any) -> bytes:
+    """Serialize `obj` as indented UTF-8 JSON, using orjson when available."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # e.g. ints wider than 64 bits; let the stdlib encoder decide
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def _load_json_bytes(data: bytes) -> Any:
+    """Decode JSON from raw bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _workspace_path(workspace_id: str) -> Path:
+    """Return a shared `Path(workspace_id)` instead of re-parsing the string per call."""
+    path = _WORKSPACE_PATH_MEMO.get(workspace_id)
+    if path is None:
+        path = _WORKSPACE_PATH_MEMO.setdefault(workspace_id, Path(workspace_id))
+    return path
+
+
+def _get_output_dir(workspace_id: str) -> Path:
+    """Return `<workspace>/conport-aimed_output/`, creating it on first use."""
+    output_dir = _OUTPUT_DIR_MEMO.get(workspace_id)
+    if output_dir is None:
+        output_dir = _workspace_path(workspace_id) / "conport-aimed_output"
+        output_dir.mkdir(parents=True, exist_ok=True)
+        with _DIR_MEMO_LOCK:
+            _OUTPUT_DIR_MEMO[workspace_id] = output_dir
+    return output_dir
+
+
+@functools.lru_cache(maxsize=128)
 def _sanitize_base_filename(name: Optional[str]) -> Optional[str]:
     """Sanitize a user-supplied base filename and enforce `.json` extension.
 
@@ -64,7 +165,13 @@ def _sanitize_base_filename(name: Optional[str]) -> Optional[str]:
         # fallback to raw string
         pass
 
-    name = _SAFE_BASENAME_PATTERN.sub("_", name).strip("._")
+    # Well-formed names (the common case) never need the regex substitution.
+    if not _SAFE_BASENAME_CHARS.issuperset(name):
+        if name.isascii():
+            name = "_".join(filter(None, name.translate(_SAFE_TRANSLATE_TABLE).split("\0")))
+        else:
+            name = _SAFE_BASENAME_PATTERN.sub("_", name)
+    name = name.strip("._")
     if not name:
         return None
     if not name.lower().endswith(".json"):
@@ -80,21 +187,56 @@ def save_mcp_setting(workspace_id: str, key: str, value: Any) -> None:
         "updated_at": datetime.utcnow().isoformat(timespec="seconds"),
         "data": value,
     }
-    with open(cache_file, "w", encoding="utf-8") as f:
-        json.dump(cache_data, f, indent=2, ensure_ascii=False)
+    data = _dump_json_bytes(cache_data)
+    try:
+        with open(cache_file, "wb") as f:
+            f.write(data)
+    except FileNotFoundError:
+        # The memoized directory was removed while the server ran; resolve and create it again once.
+        with _DIR_MEMO_LOCK:
+            _CACHE_DIR_MEMO.pop(workspace_id, None)
+        cache_file = get_mcp_cache_dir(workspace_id) / f"{key}.json"
+        with open(cache_file, "wb") as f:
+            f.write(data)
+
+    # Write-through: keep the in-memory copy in step with what is on disk.
+    try:
+        mtime = os.stat(cache_file).st_mtime
+    except OSError:
+        mtime = None
+    with _SETTINGS_CACHE_LOCK:
+        if mtime is None:
+            _SETTINGS_CACHE.pop((workspace_id, key), None)
+        else:
+            _SETTINGS_CACHE[(workspace_id, key)] = (time.monotonic(), mtime, value)
 
 
 def load_mcp_setting(workspace_id: str, key: str, default: Any = None) -> Any:
-    """Load an MCP setting or return default when missing/invalid."""
+    """Load an MCP setting or return default when missing/invalid.
+
+    Values are served from an in-memory cache while the file's mtime is
+    unchanged and the entry is younger than `CACHE_TTL` seconds.
+    """
     try:
         cache_dir = get_mcp_cache_dir(workspace_id)
         cache_file = cache_dir / f"{key}.json"
-        if not cache_file.exists():
+        # EAFP: the stat doubles as the existence check
+        mtime = os.stat(cache_file).st_mtime
+        now = time.monotonic()
+        with _SETTINGS_CACHE_LOCK:
+            cached = _SETTINGS_CACHE.get((workspace_id, key))
+        if cached is not None and cached[1] == mtime and now - cached[0] < CACHE_TTL:
+            return cached[2]
+
+        cache_data = _load_json_bytes(cache_file.read_bytes())
+        if "data" not in cache_data:
             return default
-
-        with open(cache_file, "r", encoding="utf-8") as f:
-            cache_data = json.load(f)
-        return cache_data.get("data", default)
+        value = cache_data["data"]
+        with _SETTINGS_CACHE_LOCK:
+            _SETTINGS_CACHE[(workspace_id, key)] = (now, mtime, value)
+        return value
+    except FileNotFoundError:
+        return default
     except (json.JSONDecodeError, OSError, KeyError) as e:
         log.warning(f"Invalid MCP setting file {key} for {workspace_id}: {e}; returning default")
         return default
@@ -104,12 +246,28 @@ def load_mcp_setting(workspace_id: str, key: str, default: Any = None) -> Any:
 
 
 def get_output_capture_config(workspace_id: str) -> Dict[str, Any]:
-    """Return output capture config merged with defaults and sanitized filename."""
-    stored = load_mcp_setting(workspace_id, "output_capture", {}) or {}
-    config = {**_DEFAULT_CAPTURE_CONFIG, **stored}
+    """Return output capture config merged with defaults and sanitized filename.
+
+    The merged result is memoized per workspace and reused while the cached
+    stored setting and pending pointers are the same objects; any save or new
+    capture replaces one of them, which invalidates the entry.
+
+    The returned dict is shared with the cache: treat it as read-only and copy
+    it before making changes.
+    """
+    stored = load_mcp_setting(workspace_id, "output_capture")
+    last = load_mcp_setting(workspace_id, "last_capture")
+    pending = _pending_last_capture.get(workspace_id)
+    cached = _CAPTURE_CONFIG_CACHE.get(workspace_id)
+    if cached is not None and cached[0] is stored and cached[1] is last and cached[2] is pending:
+        return cached[3]
+
+    # Pointers in output_capture.json (older layout) are overridden by the sidecar.
+    config = {**_DEFAULT_CAPTURE_CONFIG, **(stored or {}), **(last or {}), **(pending or {})}
     config["base_filename"] = _sanitize_base_filename(config.get("base_filename"))
     if config.get("timestamp_tz") is None:
         config["timestamp_tz"] = "UTC"
+    _CAPTURE_CONFIG_CACHE[workspace_id] = (stored, last, pending, config)
     return config
 
 
@@ -120,7 +278,7 @@ def set_output_capture_config(
     timestamp_tz: Optional[str] = "UTC",
 ) -> Dict[str, Any]:
     """Update and persist output capture config. Returns the saved config."""
-    current = get_output_capture_config(workspace_id)
+    current = dict(get_output_capture_config(workspace_id))
     current.update(
         {
             "enabled": bool(enabled),
@@ -129,15 +287,184 @@ def set_output_capture_config(
             "timestamp_tz": timestamp_tz or current.get("timestamp_tz") or "UTC",
         }
     )
-    save_mcp_setting(workspace_id, "output_capture", current)
+    save_output_capture_config(workspace_id, current)
     return current
 
 
+def save_output_capture_config(workspace_id: str, config: Dict[str, Any]) -> None:
+    """Persist `config` to output_capture.json, leaving out the `last_capture_*` pointers.
+
+    The pointers live in last_capture.json; `get_output_capture_config` merges them
+    in, so its result can be passed here without copying them into the settings file.
+    """
+    save_mcp_setting(
+        workspace_id,
+        "output_capture",
+        {k: v for k, v in config.items() if k not in _LAST_CAPTURE_KEYS},
+    )
+
+
+def _record_last_capture(workspace_id: str, capture_file: str, tool_name: str) -> None:
+    """Queue a `last_capture_*` update, flushing once enough have accumulated."""
+    global _pending_capture_count, _pending_flush_timer
+
+    with _PENDING_LOCK:
+        _pending_last_capture[workspace_id] = {
+            "last_capture_file": capture_file,
+            "last_capture_tool": tool_name,
+        }
+        _pending_capture_count += 1
+        flush_now = _pending_capture_count >= _LAST_CAPTURE_FLUSH_EVERY
+        if not flush_now and _pending_flush_timer is None:
+            _pending_flush_timer = threading.Timer(_LAST_CAPTURE_FLUSH_INTERVAL, flush_last_capture_pointers)
+            _pending_flush_timer.daemon = True
+            _pending_flush_timer.start()
+
+    if flush_now:
+        flush_last_capture_pointers()
+
+
+def flush_last_capture_pointers() -> None:
+    """Persist pending `last_capture_*` pointers to each workspace's last_capture.json."""
+    global _pending_capture_count, _pending_flush_timer
+
+    with _PENDING_LOCK:
+        pending = dict(_pending_last_capture)
+        _pending_capture_count = 0
+        if _pending_flush_timer is not None:
+            _pending_flush_timer.cancel()
+            _pending_flush_timer = None
+
+    for workspace_id, pointers in pending.items():
+        try:
+            save_mcp_setting(workspace_id, "last_capture", pointers)
+        except FileNotFoundError:
+            # Workspace (or its cache dir) was removed before the flush; nothing to update.
+            log.debug(f"Skipping last capture pointer flush for missing workspace {workspace_id}")
+        except Exception as e:
+            log.warning(f"Failed to persist last capture pointer for {workspace_id}: {e}")
+            continue
+        with _PENDING_LOCK:
+            # Only drop the entry if no newer capture replaced it meanwhile.
+            if _pending_last_capture.get(workspace_id) is pointers:
+                del _pending_last_capture[workspace_id]
+
+
+atexit.register(flush_last_capture_pointers)
+
+
+def _capture_timestamps() -> Tuple[str, str]:
+    """Return `(YYYYMMDD_HHMMSS_mmm, ISO-8601 ms 'Z')` for the current UTC time.
+
+    Both strings come from a single clock read so filename and `captured_at` agree.
+    """
+    secs, ms = divmod(time.time_ns() // 1_000_000, 1000)
+    t = time.gmtime(secs)
+    date = f"{t.tm_year:04d}{t.tm_mon:02d}{t.tm_mday:02d}"
+    clock = f"{t.tm_hour:02d}{t.tm_min:02d}{t.tm_sec:02d}"
+    iso = (
+        f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}"
+        f"T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}.{ms:03d}Z"
+    )
+    return f"{date}_{clock}_{ms:03d}", iso
+
+
+def _write_capture_error(output_path: Path, meta: Dict[str, Any], error: Exception) -> None:
+    """Log a failed capture and leave an `.error.json` marker next to it."""
+    log.error(f"Failed to write capture for {meta.get('tool')} ({output_path}): {error}")
+    try:
+        error_path = output_path.with_suffix(".error.json")
+        with open(error_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "meta": meta,
+                    "error": str(error),
+                },
+                f,
+                indent=2,
+                ensure_ascii=False,
+            )
+    except Exception:
+        log.debug("Failed to write capture error file", exc_info=True)
+
+
+def _write_bytes_atomic(tmp_path: Path, output_path: Path, data: bytes) -> None:
+    """Write `data` to `tmp_path` unbuffered, then rename it over `output_path`."""
+    with open(tmp_path, "wb", buffering=0) as f:
+        view = memoryview(data)
+        while view:
+            view = view[f.write(view):]
+    os.replace(tmp_path, output_path)
+
+
+def _write_capture_file(output_path: Path, data: bytes, meta: Dict[str, Any]) -> bool:
+    """Write one serialized capture; returns False (after logging) on failure.
+
+    The bytes go through an unbuffered file (no TextIOWrapper/BufferedWriter
+    copies) into a `.tmp` sibling that is then renamed over the final name, so
+    readers never observe a half-written capture.
+    """
+    tmp_path = output_path.with_suffix(".tmp")
+    try:
+        try:
+            _write_bytes_atomic(tmp_path, output_path, data)
+        except FileNotFoundError:
+            # The memoized output directory was removed while the server ran; create it again once.
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            _write_bytes_atomic(tmp_path, output_path, data)
+        return True
+    except Exception as e:  # pragma: no cover - defensive logging
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        _write_capture_error(output_path, meta, e)
+        return False
+
+
+def _capture_writer_loop() -> None:
+    """Drain queued captures, writing up to `_CAPTURE_BATCH_MAX` per wakeup."""
+    while True:
+        batch = [_capture_queue.get()]
+        while len(batch) < _CAPTURE_BATCH_MAX:
+            try:
+                batch.append(_capture_queue.get_nowait())
+            except queue.Empty:
+                break
+        for output_path, data, meta in batch:
+            try:
+                _write_capture_file(output_path, data, meta)
+            finally:
+                _capture_queue.task_done()
+
+
+def _ensure_capture_writer() -> None:
+    global _capture_writer
+    if _capture_writer is not None:
+        return
+    with _CAPTURE_WRITER_LOCK:
+        if _capture_writer is None:
+            _capture_writer = threading.Thread(
+                target=_capture_writer_loop, name="conport-capture-writer", daemon=True
+            )
+            _capture_writer.start()
+
+
+def flush_captures() -> None:
+    """Block until every queued capture has been written (no-op in sync mode)."""
+    if _capture_writer is not None:
+        _capture_queue.join()
+
+
+atexit.register(flush_captures)
+
+
 def write_captured_result(workspace_id: str, tool_name: str, result: Any) -> Optional[str]:
     """
     Write the tool result to `<workspace>/conport-aimed_output/` if capture is enabled.
 
     Returns the relative capture path (from workspace) when written, else None.
+    With `CAPTURE_ASYNC` enabled the path is returned once the write is queued.
     Errors are logged but do not raise.
     """
     config = get_output_capture_config(workspace_id)
@@ -152,10 +479,9 @@ def write_captured_result(workspace_id: str, tool_name: str, result: Any) -> Opt
     if base_filename is None:
         # Extremely defensive fallback
         base_filename = "results.json"
-    output_dir = Path(workspace_id) / "conport-aimed_output"
-    output_dir.mkdir(parents=True, exist_ok=True)
+    output_dir = _get_output_dir(workspace_id)
 
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S_%f")[:-3]  # milliseconds
+    timestamp, captured_at = _capture_timestamps()
     stem = Path(base_filename).stem
     filename = f"{stem}_{timestamp}.json"
     output_path = output_dir / filename
@@ -163,46 +489,66 @@ def write_captured_result(workspace_id: str, tool_name: str, result: Any) -> Opt
     payload = {
         "meta": {
             "tool": tool_name,
-            "captured_at": datetime.utcnow().isoformat(timespec="milliseconds") + "Z",
+            "captured_at": captured_at,
         },
         "result": result,
     }
 
     try:
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(payload, f, indent=2, ensure_ascii=False)
-    except Exception as e:  # pragma: no cover - defensive logging
-        log.error(f"Failed to write capture for {tool_name} ({workspace_id}): {e}")
-        try:
-            error_path = output_path.with_suffix(".error.json")
-            with open(error_path, "w", encoding="utf-8") as f:
-                json.dump(
-                    {
-                        "meta": payload["meta"],
-                        "error": str(e),
-                    },
-                    f,
-                    indent=2,
-                    ensure_ascii=False,
-                )
-        except Exception:
-            log.debug("Failed to write capture error file", exc_info=True)
+        data = _dump_json_bytes(payload)
+    except Exception as e:
+        _write_capture_error(output_path, payload["meta"], e)
+        return None
+
+    if CAPTURE_ASYNC:
+        _ensure_capture_writer()
+        _capture_queue.put((output_path, data, payload["meta"]))
+    elif not _write_capture_file(output_path, data, payload["meta"]):
         return None
 
     try:
-        relative_capture = str(output_path.relative_to(Path(workspace_id)))
+        relative_capture = str(output_path.relative_to(_workspace_path(workspace_id)))
     except Exception:
         relative_capture = str(output_path)
 
-    # Update last-capture pointers, but do NOT force base_filename when using auto naming.
-    config.update({"enabled": True, "last_capture_file": relative_capture, "last_capture_tool": tool_name})
-    if raw_base_filename is not None:
-        # Keep manual base filename in config (sanitized)
-        config["base_filename"] = _sanitize_base_filename(raw_base_filename)
-    save_mcp_setting(workspace_id, "output_capture", config)
+    # Update last-capture pointers (batched); base_filename is left untouched so
+    # auto naming stays in effect when it is unset.
+    _record_last_capture(workspace_id, relative_capture, tool_name)
     return relative_capture
 
 
+def _workspace_output_dir(workspace_id: str) -> Path:
+    """Path of the capture output directory (not created)."""
+    return _OUTPUT_DIR_MEMO.get(workspace_id) or _workspace_path(workspace_id) / "conport-aimed_output"
+
+
+def _to_utc_naive(dt: datetime) -> datetime:
+    """Normalize a datetime to naive UTC (naive input is treated as UTC)."""
+    if dt.tzinfo is None:
+        return dt
+    try:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    except Exception:
+        return dt.replace(tzinfo=None)
+
+
+def _capture_suffix_timestamp(filename: str) -> Optional[str]:
+    """Return the `YYYYMMDD_HHMMSS_mmm` part of a capture filename, or None."""
+    if len(filename) < _CAPTURE_SUFFIX_LEN or not filename.endswith(".json"):
+        return None
+    ts = filename[-24:-5]
+    if (
+        filename[-25] == "_"
+        and ts[8] == "_"
+        and ts[15] == "_"
+        and ts[:8].isdecimal()
+        and ts[9:15].isdecimal()
+        and ts[16:].isdecimal()
+    ):
+        return ts
+    return None
+
+
 def list_captured_files(
     workspace_id: str,
     *,
@@ -225,85 +571,96 @@ def list_captured_files(
     - source: 'filename' or 'mtime'
     """
 
-    def _to_utc_naive(dt: Optional[datetime]) -> Optional[datetime]:
-        if dt is None:
-            return None
-        # Treat naive datetimes as UTC (tool docs say UTC if naive)
-        if dt.tzinfo is None:
-            return dt
-        # Convert aware -> naive UTC
-        try:
-            from datetime import timezone
-
-            return dt.astimezone(timezone.utc).replace(tzinfo=None)
-        except Exception:
-            return dt.replace(tzinfo=None)
-
-    since_u = _to_utc_naive(since)
-    until_u = _to_utc_naive(until)
-
-    output_dir = Path(workspace_id) / "conport-aimed_output"
-    if not output_dir.exists() or not output_dir.is_dir():
+    output_dir = _workspace_output_dir(workspace_id)
+    if not output_dir.is_dir():
         return []
 
-    needle = (name_like or "").lower().strip() if name_like else None
-
-    items: List[Dict[str, Any]] = []
-
-    for p in output_dir.glob("*.json"):
-        if not p.is_file():
-            continue
-
-        filename = p.name
-        if needle and needle not in filename.lower():
-            continue
-
-        captured_at: Optional[datetime] = None
-        source = "mtime"
+    needle = name_like.lower().strip() if name_like else None
+    if needle and ("/" in needle or os.sep in needle):
+        return []  # a path separator can never occur in a filename
+    # Digits/underscores are case-invariant, so timestamp-style needles can be
+    # matched without lowercasing every filename.
+    needle_is_caseless = bool(needle) and all(c.isdigit() or c == "_" for c in needle)
 
-        m = _CAPTURE_TIMESTAMP_SUFFIX_RE.search(filename)
-        if m:
-            try:
-                captured_at = datetime.strptime(m.group(1), "%Y%m%d_%H%M%S_%f")
-                source = "filename"
-            except Exception:
-                captured_at = None
+    since_u = _to_utc_naive(since) if since is not None else None
+    until_u = _to_utc_naive(until) if until is not None else None
 
-        if captured_at is None:
-            try:
-                captured_at = datetime.utcfromtimestamp(p.stat().st_mtime)
-            except Exception:
-                # As a last resort, use 'now' so the entry is still listable.
-                captured_at = datetime.utcnow()
-
-        if since_u and captured_at < since_u:
-            continue
-        if until_u and captured_at > until_u:
-            continue
-
-        try:
-            rel = str(p.relative_to(Path(workspace_id)))
-        except Exception:
-            rel = str(p)
-
-        items.append(
-            {
-                "capture_file": rel,
-                "filename": filename,
-                "captured_at": captured_at.isoformat(timespec="milliseconds") + "Z",
-                "source": source,
-            }
-        )
-
-    # Newest first
-    items.sort(key=lambda x: x.get("captured_at", ""), reverse=True)
-
-    if limit is None:
-        return items
     try:
-        lim = int(limit)
+        rel_dir = str(output_dir.relative_to(_workspace_path(workspace_id)))
     except Exception:
-        lim = 10
+        rel_dir = str(output_dir)
+
+    found: List[Tuple[datetime, str, str]] = []
+
+    # One scandir pass: DirEntry carries the file type from readdir and caches
+    # its stat result, so no per-file stat is needed unless mtime is required.
+    with os.scandir(output_dir) as entries:
+        for entry in entries:
+            filename = entry.name
+            if not filename.endswith(".json"):
+                continue
+            if not entry.is_file():
+                continue
+
+            if needle:
+                if needle_is_caseless:
+                    if needle not in filename:
+                        continue
+                elif needle not in filename.lower():
+                    continue
+
+            captured_at: Optional[datetime] = None
+            source = "mtime"
+
+            ts = _capture_suffix_timestamp(filename)
+            if ts:
+                try:
+                    # Fixed layout YYYYMMDD_HHMMSS_mmm: build directly, no strptime scan
+                    captured_at = datetime(
+                        int(ts[0:4]), int(ts[4:6]), int(ts[6:8]),
+                        int(ts[9:11]), int(ts[11:13]), int(ts[13:15]),
+                        int(ts[16:19]) * 1000,
+                    )
+                    source = "filename"
+                except Exception:
+                    captured_at = None
+
+            if captured_at is None:
+                try:
+                    # DirEntry.stat() is cached, so this is at most one stat per entry
+                    mtime = entry.stat().st_mtime
+                    captured_at = datetime.fromtimestamp(mtime, tz=timezone.utc).replace(tzinfo=None)
+                except Exception:
+                    # As a last resort, use 'now' so the entry is still listable.
+                    captured_at = datetime.now(timezone.utc).replace(tzinfo=None)
+
+            if since_u and captured_at < since_u:
+                continue
+            if until_u and captured_at > until_u:
+                continue
+
+            found.append((captured_at, filename, source))
+
+    # Newest first. Order on the datetime itself, and only select the top
+    # `limit` entries (heap) instead of sorting the whole directory.
+    if limit is None:
+        lim = -1
+    else:
+        try:
+            lim = int(limit)
+        except Exception:
+            lim = 10
     if lim < 0:
-        return items
-    return items[:lim]
+        selected = sorted(found, key=itemgetter(0), reverse=True)
+    else:
+        selected = heapq.nlargest(lim, found, key=itemgetter(0))
+
+    return [
+        {
+            "capture_file": os.path.join(rel_dir, filename),
+            "filename": filename,
+            "captured_at": captured_at.isoformat(timespec="milliseconds") + "Z",
+            "source": source,
+        }
+        for captured_at, filename, source in selected
+    ]
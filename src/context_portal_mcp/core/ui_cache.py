@@ -5,14 +5,22 @@ Keeps UI concerns completely separate from business data.
 
 import json
 import os
+import threading
+import time
+from contextlib import contextmanager, suppress
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Iterator, Optional, Tuple
 import logging
 from datetime import datetime
 
 from .config import get_database_path
 from .exceptions import DatabaseError
 
+try:  # Optional C JSON encoder/decoder; stdlib json is used when it is not installed
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
 log = logging.getLogger(__name__)
 
 # Debug helpers (will be redefined based on --debug flag)
@@ -24,6 +32,111 @@ def debug_print(message, level="INFO"):
 import sys
 _debug_enabled = True  # Will be overridden
 
+# In-memory preference cache: (workspace_id, key) -> (insert_ts, mtime, value).
+# Kept in step by save/delete (write-through); the TTL bounds staleness when a
+# file is edited externally without its mtime changing.
+CACHE_TTL = float(os.getenv("CONPORT_SETTINGS_CACHE_TTL", "10"))
+_PREFERENCE_CACHE: Dict[Tuple[str, str], Tuple[float, float, Any]] = {}
+_PREFERENCE_CACHE_LOCK = threading.Lock()
+
+# All preferences except _STANDALONE_PREFERENCES live in one ui_state.json per
+# workspace: {"preferences": {key: {"updated_at": ..., "data": ...}}}.
+# env_vars.json keeps its own file because the Next.js API routes, the launcher
+# and portal_killer read it directly.
+UI_STATE_FILENAME = "ui_state.json"
+_STANDALONE_PREFERENCES = frozenset({"env_vars"})
+_RESERVED_CACHE_FILES = frozenset({UI_STATE_FILENAME, "port_workspace_mapping.json"})
+# Cross-process lock serializing writers of ui_state.json (see _file_lock)
+_UI_STATE_LOCK_FILENAME = UI_STATE_FILENAME + ".lock"
+
+# workspace_id -> (insert_ts, file signature or None, preferences)
+_UI_STATE_CACHE: Dict[str, Tuple[float, Optional[Tuple[int, int, int]], Dict[str, Any]]] = {}
+_UI_STATE_MIGRATED: set = set()
+_UI_STATE_LOCK = threading.RLock()
+
+# Resolved (and already created) ui-cache directories per workspace
+_UI_CACHE_DIR_MEMO: Dict[str, Path] = {}
+_UI_CACHE_DIR_MEMO_LOCK = threading.Lock()
+
+
+def _dump_json_bytes(obj: Any) -> bytes:
+    """Serialize `obj` as indented UTF-8 JSON, using orjson when available."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # e.g. ints wider than 64 bits; let the stdlib encoder decide
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def _load_json_bytes(data: bytes) -> Any:
+    """Decode JSON from raw bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _file_signature(path: Path) -> Optional[Tuple[int, int, int]]:
+    """
+    (mtime_ns, size, inode) of `path`, or None if it does not exist. Another process
+    replacing the file within the same mtime tick still changes the inode.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+# Lock files currently held by this thread (see _file_lock)
+_held_file_locks = threading.local()
+
+
+@contextmanager
+def _file_lock(lock_path: Path) -> Iterator[None]:
+    """
+    Holds an exclusive lock on `lock_path` (created if missing) for the duration of the
+    block, so the stdio and HTTP servers (and the launcher) serialize their
+    read-modify-write of shared cache files. Re-entrant within a thread.
+    """
+    held = getattr(_held_file_locks, "paths", None)
+    if held is None:
+        held = _held_file_locks.paths = set()
+    if lock_path in held:
+        yield
+        return
+    with open(lock_path, "a+b") as lock_file:
+        if os.name == "nt":
+            import msvcrt
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        held.add(lock_path)
+        try:
+            yield
+        finally:
+            held.discard(lock_path)
+            if os.name == "nt":
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Write `data` to a per-process temp file next to `path`, then rename it over `path`."""
+    tmp_path = path.with_name(f"{path.name}.tmp.{os.getpid()}")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
 
 def get_ui_cache_dir(workspace_id: str) -> Path:
     """
@@ -32,24 +145,130 @@ def get_ui_cache_dir(workspace_id: str) -> Path:
     
     Directory structure:
     <workspace>/context_portal_aimed/ui-cache/
-    ├── kanban_positions.json
-    ├── dashboard_settings.json
-    ├── graph_positions.json (if exists from graph functionality)
-    └── user_preferences.json
+    ├── ui_state.json   (kanban_positions, dashboard_settings, ... keyed by name)
+    └── env_vars.json   (kept separate; read directly by the UI and launcher)
     """
+    ui_cache_dir = _UI_CACHE_DIR_MEMO.get(workspace_id)
+    if ui_cache_dir is not None:
+        return ui_cache_dir
     try:
         db_path = get_database_path(workspace_id)
         ui_cache_dir = db_path.parent / "ui-cache"
         ui_cache_dir.mkdir(exist_ok=True, parents=True)
+        with _UI_CACHE_DIR_MEMO_LOCK:
+            _UI_CACHE_DIR_MEMO[workspace_id] = ui_cache_dir
         return ui_cache_dir
     except Exception as e:
         log.error(f"Failed to create UI cache directory for {workspace_id}: {e}")
         raise DatabaseError(f"Could not create UI cache directory: {e}")
 
 
+def _preference_file(ui_cache_dir: Path, preference_key: str) -> Path:
+    return ui_cache_dir / f"{preference_key}.json"
+
+
+def _migrate_legacy_preferences(ui_cache_dir: Path, preferences: Dict[str, Any]) -> bool:
+    """
+    Import pre-consolidation `<key>.json` preference files into `preferences`.
+
+    Files are removed once imported; JSON files that do not look like a preference
+    (no "data" key) are left in place. Returns True if anything was imported.
+    """
+    migrated = []
+    for legacy_file in ui_cache_dir.glob("*.json"):
+        key = legacy_file.stem
+        if legacy_file.name in _RESERVED_CACHE_FILES or key in _STANDALONE_PREFERENCES:
+            continue
+        try:
+            cache_data = _load_json_bytes(legacy_file.read_bytes())
+        except Exception as e:
+            log.warning(f"Skipping unreadable legacy UI preference file {legacy_file}: {e}")
+            continue
+        if not (isinstance(cache_data, dict) and "data" in cache_data):
+            log.info(f"Leaving {legacy_file} in place: not a UI preference file")
+            continue
+        # Entries already in ui_state.json are newer than the legacy file
+        preferences.setdefault(key, cache_data)
+        migrated.append(legacy_file)
+    for legacy_file in migrated:
+        try:
+            legacy_file.unlink()
+        except OSError as e:
+            log.debug(f"Could not remove migrated UI preference file {legacy_file}: {e}")
+    return bool(migrated)
+
+
+def _read_ui_state(workspace_id: str, ui_cache_dir: Path) -> Dict[str, Any]:
+    """Read ui_state.json from disk and cache it. Caller holds _UI_STATE_LOCK."""
+    state_file = ui_cache_dir / UI_STATE_FILENAME
+    signature = _file_signature(state_file)
+    preferences: Dict[str, Any] = {}
+    if signature is not None:
+        try:
+            state = _load_json_bytes(state_file.read_bytes())
+            preferences = state.get("preferences", {}) if isinstance(state, dict) else {}
+        except FileNotFoundError:
+            signature = None
+        except Exception as e:
+            log.warning(f"Invalid UI state file for {workspace_id}: {e}, starting empty")
+    _UI_STATE_CACHE[workspace_id] = (time.monotonic(), signature, preferences)
+    return preferences
+
+
+def _load_ui_state(workspace_id: str, ui_cache_dir: Path) -> Dict[str, Any]:
+    """
+    Return the `{key: {"updated_at", "data"}}` mapping stored in ui_state.json.
+
+    Served from memory while the file is unchanged and the entry is within
+    CACHE_TTL. Must be called with _UI_STATE_LOCK held; the returned dict is the
+    cached object and is only mutated through _write_ui_state.
+    """
+    if workspace_id not in _UI_STATE_MIGRATED:
+        with _file_lock(ui_cache_dir / _UI_STATE_LOCK_FILENAME):
+            preferences = _read_ui_state(workspace_id, ui_cache_dir)
+            if _migrate_legacy_preferences(ui_cache_dir, preferences):
+                _write_ui_state(workspace_id, ui_cache_dir, preferences)
+                log.info(f"Migrated legacy UI preference files into {UI_STATE_FILENAME} for {workspace_id}")
+        _UI_STATE_MIGRATED.add(workspace_id)
+        return preferences
+
+    cached = _UI_STATE_CACHE.get(workspace_id)
+    if (
+        cached is not None
+        and time.monotonic() - cached[0] < CACHE_TTL
+        and cached[1] == _file_signature(ui_cache_dir / UI_STATE_FILENAME)
+    ):
+        return cached[2]
+    return _read_ui_state(workspace_id, ui_cache_dir)
+
+
+@contextmanager
+def _locked_ui_state(workspace_id: str, ui_cache_dir: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Holds _UI_STATE_LOCK and the cross-process ui_state.json lock for a whole
+    load/merge/write, yielding the preferences freshly read from disk. Both MCP
+    servers write this file, so neither may merge into a cached copy.
+    """
+    with _UI_STATE_LOCK, _file_lock(ui_cache_dir / _UI_STATE_LOCK_FILENAME):
+        if workspace_id in _UI_STATE_MIGRATED:
+            yield _read_ui_state(workspace_id, ui_cache_dir)
+        else:
+            yield _load_ui_state(workspace_id, ui_cache_dir)
+
+
+def _write_ui_state(workspace_id: str, ui_cache_dir: Path, preferences: Dict[str, Any]) -> None:
+    """
+    Atomically replace ui_state.json and refresh the in-memory copy. Caller holds
+    _UI_STATE_LOCK and the ui_state.json file lock.
+    """
+    state_file = ui_cache_dir / UI_STATE_FILENAME
+    _atomic_write_bytes(state_file, _dump_json_bytes({"preferences": preferences}))
+    _UI_STATE_CACHE[workspace_id] = (time.monotonic(), _file_signature(state_file), preferences)
+
+
 def save_ui_preference(workspace_id: str, preference_key: str, preference_value: Any) -> None:
     """
-    Save a UI preference to the cache file.
+    Save a UI preference to the workspace UI cache.
     
     Args:
         workspace_id: The workspace identifier
@@ -58,17 +277,31 @@ def save_ui_preference(workspace_id: str, preference_key: str, preference_value:
     """
     try:
         ui_cache_dir = get_ui_cache_dir(workspace_id)
-        cache_file = ui_cache_dir / f"{preference_key}.json"
         
         # Prepare the cache data with metadata
         cache_data = {
             "updated_at": datetime.utcnow().isoformat(),
             "data": preference_value
         }
+
+        if preference_key not in _STANDALONE_PREFERENCES:
+            with _locked_ui_state(workspace_id, ui_cache_dir) as current:
+                preferences = dict(current)
+                preferences[preference_key] = cache_data
+                _write_ui_state(workspace_id, ui_cache_dir, preferences)
+            log.debug(f"Saved UI preference {preference_key} for workspace {workspace_id}")
+            return
+
+        cache_file = _preference_file(ui_cache_dir, preference_key)
         
         # Write to file with pretty formatting for debugging
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            json.dump(cache_data, f, indent=2, ensure_ascii=False)
+        with open(cache_file, 'wb') as f:
+            f.write(_dump_json_bytes(cache_data))
+
+        # Write-through so the next load is served from memory
+        mtime = os.stat(cache_file).st_mtime
+        with _PREFERENCE_CACHE_LOCK:
+            _PREFERENCE_CACHE[(workspace_id, preference_key)] = (time.monotonic(), mtime, preference_value)
             
         log.debug(f"Saved UI preference {preference_key} for workspace {workspace_id}")
         
@@ -79,7 +312,7 @@ def save_ui_preference(workspace_id: str, preference_key: str, preference_value:
 
 def load_ui_preference(workspace_id: str, preference_key: str, default: Any = None) -> Any:
     """
-    Load a UI preference from the cache file.
+    Load a UI preference from the workspace UI cache.
     
     Args:
         workspace_id: The workspace identifier
@@ -87,24 +320,45 @@ def load_ui_preference(workspace_id: str, preference_key: str, default: Any = No
         default: Default value to return if preference doesn't exist
         
     Returns:
-        The preference value or default if not found
+        The preference value or default if not found. Loaded values are shared with
+        the in-memory cache: treat them as read-only and copy before making changes.
     """
     try:
         ui_cache_dir = get_ui_cache_dir(workspace_id)
-        cache_file = ui_cache_dir / f"{preference_key}.json"
-        
-        if not cache_file.exists():
-            log.debug(f"UI preference {preference_key} not found for workspace {workspace_id}, returning default")
-            return default
+
+        if preference_key not in _STANDALONE_PREFERENCES:
+            with _UI_STATE_LOCK:
+                cache_data = _load_ui_state(workspace_id, ui_cache_dir).get(preference_key)
+            if not isinstance(cache_data, dict) or "data" not in cache_data:
+                log.debug(f"UI preference {preference_key} not found for workspace {workspace_id}, returning default")
+                return default
+            return cache_data["data"]
+
+        cache_file = _preference_file(ui_cache_dir, preference_key)
+
+        # Serve from memory while the file is unchanged and the entry is fresh.
+        # EAFP: the stat doubles as the existence check.
+        mtime = os.stat(cache_file).st_mtime
+        now = time.monotonic()
+        with _PREFERENCE_CACHE_LOCK:
+            cached = _PREFERENCE_CACHE.get((workspace_id, preference_key))
+        if cached is not None and cached[1] == mtime and now - cached[0] < CACHE_TTL:
+            return cached[2]
             
-        with open(cache_file, 'r', encoding='utf-8') as f:
-            cache_data = json.load(f)
+        cache_data = _load_json_bytes(cache_file.read_bytes())
             
         # Return the data portion, ignoring metadata
-        preference_value = cache_data.get("data", default)
+        if "data" not in cache_data:
+            return default
+        preference_value = cache_data["data"]
+        with _PREFERENCE_CACHE_LOCK:
+            _PREFERENCE_CACHE[(workspace_id, preference_key)] = (now, mtime, preference_value)
         log.debug(f"Loaded UI preference {preference_key} for workspace {workspace_id}")
         return preference_value
         
+    except FileNotFoundError:
+        log.debug(f"UI preference {preference_key} not found for workspace {workspace_id}, returning default")
+        return default
     except (json.JSONDecodeError, KeyError) as e:
         log.warning(f"Invalid UI preference file {preference_key} for {workspace_id}: {e}, returning default")
         return default
@@ -115,18 +369,32 @@ def load_ui_preference(workspace_id: str, preference_key: str, default: Any = No
 
 def delete_ui_preference(workspace_id: str, preference_key: str) -> bool:
     """
-    Delete a UI preference cache file.
+    Delete a UI preference from the workspace UI cache.
     
     Args:
         workspace_id: The workspace identifier
         preference_key: The preference key to delete
         
     Returns:
-        True if deleted successfully, False if file didn't exist
+        True if deleted successfully, False if the preference didn't exist
     """
     try:
         ui_cache_dir = get_ui_cache_dir(workspace_id)
-        cache_file = ui_cache_dir / f"{preference_key}.json"
+
+        if preference_key not in _STANDALONE_PREFERENCES:
+            with _locked_ui_state(workspace_id, ui_cache_dir) as preferences:
+                if preference_key not in preferences:
+                    log.debug(f"UI preference {preference_key} not found for workspace {workspace_id}")
+                    return False
+                preferences = {k: v for k, v in preferences.items() if k != preference_key}
+                _write_ui_state(workspace_id, ui_cache_dir, preferences)
+            log.debug(f"Deleted UI preference {preference_key} for workspace {workspace_id}")
+            return True
+
+        cache_file = _preference_file(ui_cache_dir, preference_key)
+
+        with _PREFERENCE_CACHE_LOCK:
+            _PREFERENCE_CACHE.pop((workspace_id, preference_key), None)
         
         if cache_file.exists():
             cache_file.unlink()
@@ -231,7 +499,8 @@ def update_workspace_env_var(workspace_id: str, key: str, value: Any) -> None:
         key: Environment variable key
         value: Environment variable value
     """
-    current_env = load_workspace_env_vars(workspace_id)
+    # The loaded dict is shared with the preference cache; change a copy
+    current_env = dict(load_workspace_env_vars(workspace_id))
     current_env[key] = value
     save_workspace_env_vars(workspace_id, current_env)
 
@@ -239,18 +508,28 @@ def update_workspace_env_var(workspace_id: str, key: str, value: Any) -> None:
 # ==================== CENTRAL PORT MAPPING FUNCTIONS ====================
 # These manage a shared mapping of UI ports to workspace IDs for multi-workspace support
 
-def get_central_ui_cache_dir() -> Path:
-    """Get the central UI cache directory path."""
+def _resolve_installed_ui_cache_dir() -> Optional[Path]:
+    """Locate the central ui-cache next to the installed package, or None."""
     try:
         import importlib.util
         spec = importlib.util.find_spec("context_portal_mcp")
         if spec and spec.origin:
             # Navigate from module to installation root, then to ui-cache
             module_path = Path(spec.origin).resolve()
-            central_path = module_path.parent.parent.parent / "context_portal_aimed" / "ui-cache"
-            return central_path
+            return module_path.parent.parent.parent / "context_portal_aimed" / "ui-cache"
     except Exception:
         pass
+    return None
+
+
+# The installation root does not move after start-up, so resolve it once
+_CENTRAL_UI_CACHE_DIR: Optional[Path] = _resolve_installed_ui_cache_dir()
+
+
+def get_central_ui_cache_dir() -> Path:
+    """Get the central UI cache directory path."""
+    if _CENTRAL_UI_CACHE_DIR is not None:
+        return _CENTRAL_UI_CACHE_DIR
     
     # Fallback: assume we're in a context-portal workspace
     current_dir = Path.cwd()
@@ -260,48 +539,104 @@ def get_central_ui_cache_dir() -> Path:
     # Final fallback: use current directory
     return Path.cwd() / "context_portal_aimed" / "ui-cache"
 
+# (mapping_file, file signature, mapping) for the last load/save of port_workspace_mapping.json
+_PORT_MAPPING_CACHE: Optional[Tuple[Path, Tuple[int, int, int], Dict[str, str]]] = None
+_PORT_MAPPING_LOCK = threading.RLock()
+
+
+def _central_port_mapping_file() -> Path:
+    return get_central_ui_cache_dir() / "port_workspace_mapping.json"
+
+
+def _port_mapping_lock(mapping_file: Path):
+    """The file lock the launcher also takes around its updates of the mapping file."""
+    return _file_lock(mapping_file.with_name(mapping_file.name + ".lock"))
+
+
 def load_central_port_mapping() -> Dict[str, str]:
     """Load the central port-to-workspace mapping."""
+    global _PORT_MAPPING_CACHE
     try:
-        mapping_file = get_central_ui_cache_dir() / "port_workspace_mapping.json"
-        if mapping_file.exists():
-            with open(mapping_file, 'r') as f:
-                mapping = json.load(f)
-                log.debug(f"Loaded central port mapping: {mapping}")
-                return mapping
+        mapping_file = _central_port_mapping_file()
+        with _PORT_MAPPING_LOCK:
+            signature = _file_signature(mapping_file)
+            if signature is None:
+                return {}
+            cached = _PORT_MAPPING_CACHE
+            if cached is not None and cached[0] == mapping_file and cached[1] == signature:
+                return dict(cached[2])
+            with open(mapping_file, 'rb') as f:
+                mapping = _load_json_bytes(f.read())
+            _PORT_MAPPING_CACHE = (mapping_file, signature, mapping)
+            log.debug(f"Loaded central port mapping: {mapping}")
+            # Callers mutate the result before saving it back
+            return dict(mapping)
+    except FileNotFoundError:
+        pass
     except Exception as e:
         log.debug(f"Failed to load central port mapping: {e}")
     return {}
 
+def _write_central_port_mapping(mapping_file: Path, mapping: Dict[str, str]) -> None:
+    """
+    Atomically replace the mapping file with compact JSON, as the launcher writes it.
+    Caller holds _PORT_MAPPING_LOCK and the mapping file lock.
+    """
+    global _PORT_MAPPING_CACHE
+    _atomic_write_bytes(mapping_file, json.dumps(mapping, separators=(",", ":")).encode("utf-8"))
+    _PORT_MAPPING_CACHE = (mapping_file, _file_signature(mapping_file), dict(mapping))
+
 def save_central_port_mapping(mapping: Dict[str, str]) -> bool:
     """Save the central port-to-workspace mapping."""
     try:
-        mapping_file = get_central_ui_cache_dir() / "port_workspace_mapping.json"
+        mapping_file = _central_port_mapping_file()
         mapping_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(mapping_file, 'w') as f:
-            json.dump(mapping, f, indent=2)
+        with _PORT_MAPPING_LOCK, _port_mapping_lock(mapping_file):
+            _write_central_port_mapping(mapping_file, mapping)
         log.debug(f"Saved central port mapping: {mapping}")
         return True
     except Exception as e:
         log.warning(f"Failed to save central port mapping: {e}")
         return False
 
+def _update_central_port_mapping(update: Callable[[Dict[str, str]], bool]) -> Optional[Dict[str, str]]:
+    """
+    Applies `update(mapping)` (which edits the dict in place and returns True if it
+    changed anything) to the current mapping under the launcher's file lock, so
+    concurrent launcher and server updates cannot overwrite each other. Returns the
+    mapping as it was before the update, or None if it could not be saved.
+    """
+    try:
+        mapping_file = _central_port_mapping_file()
+        mapping_file.parent.mkdir(parents=True, exist_ok=True)
+        with _PORT_MAPPING_LOCK, _port_mapping_lock(mapping_file):
+            before = load_central_port_mapping()
+            mapping = dict(before)
+            if update(mapping):
+                _write_central_port_mapping(mapping_file, mapping)
+                log.debug(f"Saved central port mapping: {mapping}")
+        return before
+    except Exception as e:
+        log.warning(f"Failed to save central port mapping: {e}")
+        return None
+
 def register_workspace_ui_port(ui_port: int, workspace_id: str) -> bool:
     """Register that a UI port belongs to a workspace."""
-    mapping = load_central_port_mapping()
-    
-    # Clean up any stale mapping for this port
     port_str = str(ui_port)
-    if port_str in mapping:
-        old_workspace = mapping[port_str]
-        if old_workspace != workspace_id:
-            log.info(f"Port {ui_port} was mapped to {old_workspace}, updating to {workspace_id}")
-    
-    mapping[port_str] = workspace_id
-    success = save_central_port_mapping(mapping)
-    if success:
-        log.info(f"Registered UI port {ui_port} → workspace {workspace_id}")
-    return success
+
+    def assign(mapping: Dict[str, str]) -> bool:
+        mapping[port_str] = workspace_id
+        return True
+
+    before = _update_central_port_mapping(assign)
+    if before is None:
+        return False
+    # Note any stale mapping this replaced
+    old_workspace = before.get(port_str)
+    if old_workspace is not None and old_workspace != workspace_id:
+        log.info(f"Port {ui_port} was mapped to {old_workspace}, updating to {workspace_id}")
+    log.info(f"Registered UI port {ui_port} → workspace {workspace_id}")
+    return True
 
 def lookup_workspace_by_ui_port(ui_port: int) -> Optional[str]:
     """Find which workspace is using the given UI port."""
@@ -315,12 +650,16 @@ def lookup_workspace_by_ui_port(ui_port: int) -> Optional[str]:
 
 def cleanup_workspace_ui_port(ui_port: int) -> bool:
     """Remove mapping when port is no longer in use."""
-    mapping = load_central_port_mapping()
     port_str = str(ui_port)
-    if port_str in mapping:
-        workspace_id = mapping.pop(port_str)
-        success = save_central_port_mapping(mapping)
-        if success:
-            log.info(f"Cleaned up port mapping: {ui_port} was {workspace_id}")
-        return success
+    if port_str not in load_central_port_mapping():
+        return True
+
+    def remove(mapping: Dict[str, str]) -> bool:
+        return mapping.pop(port_str, None) is not None
+
+    before = _update_central_port_mapping(remove)
+    if before is None:
+        return False
+    if port_str in before:
+        log.info(f"Cleaned up port mapping: {ui_port} was {before[port_str]}")
     return True
\ No newline at end of file
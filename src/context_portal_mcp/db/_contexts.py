@@ -1,199 +1,250 @@
 """CRUD operations for Product, Active and any other future Contexts."""
 
+import itertools
+import logging
 import sqlite3
+import sys
 import json
 from datetime import datetime, timezone
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 
 from ..core.exceptions import DatabaseError
-from . import models
+from . import models, _json, _sql
+# database.py defines get_connection_pool before it imports this module for re-export
+from .database import get_connection_pool
 
-# --- Helper functions for history ---
+log = logging.getLogger(__name__)
 
-def _get_latest_context_version(cursor: sqlite3.Cursor, table_name: str) -> int:
-    """Retrieves the latest version number from a history table."""
+# Returned by _loads_or_invalid for content that is not valid JSON
+_INVALID = object()
+
+# Patch value that removes a key. Checked with `type(value) is str` first so a
+# large dict/list patch value is never compared element-wise against it.
+_DELETE_SENTINEL = sys.intern("__DELETE__")
+
+# --- Static SQL ---
+# Table names come from a fixed set, so every statement is built once here rather
+# than formatted per call.
+
+_CONTEXT_HISTORY_TABLES = {
+    "product_context": "product_context_history",
+    "active_context": "active_context_history",
+}
+
+# context table -> INSERT ... SELECT that copies the live row into history as the
+# next version and hands the copied (pre-update) content back via RETURNING
+_LOG_HISTORY_SQL = {
+    context_table: f"""
+        INSERT INTO {history_table} (timestamp, version, content, change_source)
+        SELECT ?, COALESCE((SELECT MAX(version) FROM {history_table}), 0) + 1, content, ?
+        FROM {context_table} WHERE id = 1
+        RETURNING content
+    """
+    for context_table, history_table in _CONTEXT_HISTORY_TABLES.items()
+}
+
+def _build_history_sql(history_table: str, by_version: bool, before: bool, after: bool, limited: bool) -> str:
+    sql = f'SELECT id, timestamp, version, content AS "content [JSON]", change_source FROM {history_table}'
+    conditions = []
+    if by_version:
+        conditions.append("version = ?")
+    if before:
+        conditions.append("timestamp < ?")
+    if after:
+        conditions.append("timestamp > ?")
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY version DESC, timestamp DESC" # Most recent version/timestamp first
+    if limited:
+        sql += " LIMIT ?"
+    return sql
+
+# item_type -> point lookup of a single version (versions are unique per history table)
+_VERSION_LOOKUP_SQL = {
+    item_type: f'SELECT id, timestamp, version, content AS "content [JSON]", change_source FROM {history_table} WHERE version = ? LIMIT 1'
+    for item_type, history_table in _CONTEXT_HISTORY_TABLES.items()
+}
+
+# (item_type, by_version, before, after, limited) -> SELECT for get_item_history
+_ITEM_HISTORY_SQL = {
+    (item_type, *flags): _build_history_sql(history_table, *flags)
+    for item_type, history_table in _CONTEXT_HISTORY_TABLES.items()
+    for flags in itertools.product((False, True), repeat=4)
+}
+
+def _build_context_fts_sql(filtered: bool, limited: bool) -> str:
+    # Base SQL for context FTS search
+    sql = "SELECT rowid, context_type, content_text FROM context_fts WHERE context_fts MATCH ?"
+    if filtered:
+        sql += " AND context_type = ?"
+    sql += " ORDER BY rank"
+    if limited:
+        sql += " LIMIT ?"
+    return sql
+
+# (has context_type_filter, has limit) -> SELECT for search_context_fts
+_CONTEXT_FTS_SQL = {
+    flags: _build_context_fts_sql(*flags)
+    for flags in itertools.product((False, True), repeat=2)
+}
+
+# --- Helper functions ---
+
+def _loads_or_invalid(text: str) -> Any:
+    """Decodes JSON content, returning _INVALID (and logging) instead of raising."""
     try:
-        cursor.execute(f"SELECT MAX(version) FROM {table_name}")
-        row = cursor.fetchone()
-        return row[0] if row and row[0] is not None else 0
-    except sqlite3.Error as e:
-        # Log this error appropriately in a real application
-        print(f"Error getting latest version from {table_name}: {e}")
-        return 0 # Default to 0 if error or no versions found
-
-def _add_context_history_entry(
-    cursor: sqlite3.Cursor,
-    history_table_name: str,
-    version: int,
-    content_dict: Dict[str, Any],
+        return _json.loads(text)
+    except json.JSONDecodeError as e:
+        log.warning(f"Failed to decode JSON for context search result: {e}")
+        return _INVALID
+
+def _snippet(text: str, max_len: int = 200) -> str:
+    return text if len(text) <= max_len else f"{text[:max_len]}..."
+
+
+def _log_context_history(
+    cur: sqlite3.Cursor,
+    context_table_name: str,
     change_source: Optional[str]
-) -> None:
-    """Adds an entry to the specified context history table."""
-    content_json = json.dumps(content_dict)
-    timestamp = datetime.now(timezone.utc)
+) -> str:
+    """
+    Copies the current row of a context table into its history table as the next version
+    and returns the copied (pre-update) content JSON.
+
+    Reading the current content and computing MAX(version) + 1 both happen inside
+    the INSERT, so this is one statement. Raises DatabaseError if the context row
+    is missing.
+    """
     try:
-        cursor.execute(
-            f"""
-            INSERT INTO {history_table_name} (timestamp, version, content, change_source)
-            VALUES (?, ?, ?, ?)
-            """,
-            (timestamp, version, content_json, change_source)
-        )
+        cur.execute(_LOG_HISTORY_SQL[context_table_name], (datetime.now(timezone.utc), change_source))
+        row = cur.fetchone()
     except sqlite3.Error as e:
         # This error should be handled by the calling function's rollback
-        raise DatabaseError(f"Failed to add entry to {history_table_name}: {e}")
+        raise DatabaseError(f"Failed to add entry to {_CONTEXT_HISTORY_TABLES[context_table_name]}: {e}")
+    if row is None:
+        raise DatabaseError(f"{context_table_name} row not found for updating (cannot log history).")
+    return row['content']
+
+def _json_patch_sql(context_table_name: str, patch_content: Dict[str, Any]) -> Optional[Tuple[str, List[Any]]]:
+    """
+    Builds an UPDATE that applies `patch_content` to the stored content with JSON1
+    (json_set for new values, json_remove for "__DELETE__"), so the content never
+    round-trips through Python. Keys are replaced shallowly, as in the Python merge.
+
+    Returns None if a key cannot be expressed as a JSON path (it contains '"').
+    """
+    set_params: List[Any] = []
+    remove_params: List[str] = []
+    for key, value in patch_content.items():
+        if '"' in key:
+            return None
+        path = f'$."{key}"'
+        if type(value) is str and value == _DELETE_SENTINEL:
+            remove_params.append(path)
+        else:
+            set_params.extend((path, _json.dumps(value)))
+
+    expr = "content"
+    if set_params:
+        expr = f"json_set({expr}, {', '.join(['?, json(?)'] * (len(set_params) // 2))})"
+    if remove_params:
+        expr = f"json_remove({expr}, {', '.join(['?'] * len(remove_params))})"
+    return f"UPDATE {context_table_name} SET content = {expr} WHERE id = 1", set_params + remove_params
+
+def _apply_context_update(
+    cur: sqlite3.Cursor,
+    context_table_name: str,
+    update_args: models.UpdateContextArgs,
+    current_content_json: str
+) -> None:
+    """Writes the new content for a context row from either full content or a patch."""
+    if update_args.content is not None:
+        cur.execute(f"UPDATE {context_table_name} SET content = ? WHERE id = 1", (_json.dumps(update_args.content),))
+        return
+
+    patch_sql = _json_patch_sql(context_table_name, update_args.patch_content)
+    if patch_sql is not None:
+        cur.execute(*patch_sql)
+        return
+
+    # Fallback: merge in Python
+    new_final_content = _json.loads(current_content_json)
+    # Iterate over patch_content to handle __DELETE__ sentinel
+    for key, value in update_args.patch_content.items():
+        if type(value) is str and value == _DELETE_SENTINEL:
+            new_final_content.pop(key, None)  # Remove key, do nothing if key not found
+        else:
+            new_final_content[key] = value
+    cur.execute(f"UPDATE {context_table_name} SET content = ? WHERE id = 1", (_json.dumps(new_final_content),))
 
 # --- CRUD Operations ---
 
 def get_product_context(workspace_id: str) -> models.ProductContext:
     """Retrieves the product context."""
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None # Initialize cursor for finally block
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, content FROM product_context WHERE id = 1")
-        row = cursor.fetchone()
-        if row:
-            content_dict = json.loads(row['content'])
-            return models.ProductContext(id=row['id'], content=content_dict)
-        else:
-            # Should not happen if initialized correctly, but handle defensively
-            raise DatabaseError("Product context row not found.")
-    except (sqlite3.Error, json.JSONDecodeError) as e:
-        raise DatabaseError(f"Failed to retrieve product context: {e}")
-    finally:
-        if cursor:
-            cursor.close()
+    with get_connection_pool(workspace_id).reader() as conn:
+        try:
+            with _sql.cursor(conn, 'SELECT id, content AS "content [JSON]" FROM product_context WHERE id = 1') as cur:
+                row = cur.fetchone()
+            if row:
+                return models.ProductContext(id=row['id'], content=row['content'])
+            else:
+                # Should not happen if initialized correctly, but handle defensively
+                raise DatabaseError("Product context row not found.")
+        except (sqlite3.Error, json.JSONDecodeError) as e:
+            raise DatabaseError(f"Failed to retrieve product context: {e}")
 
 def update_product_context(workspace_id: str, update_args: models.UpdateContextArgs) -> None:
     """Updates the product context using either full content or a patch."""
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None # Initialize cursor for finally block
+    if update_args.content is None and update_args.patch_content is None:
+        # This case should be prevented by Pydantic model validation, but handle defensively
+        raise ValueError("No content or patch_content provided for update.")
+
     try:
-        cursor = conn.cursor()
-        # Fetch current content to log to history
-        cursor.execute("SELECT content FROM product_context WHERE id = 1")
-        current_row = cursor.fetchone()
-        if not current_row:
-            raise DatabaseError("Product context row not found for updating (cannot log history).")
-        current_content_dict = json.loads(current_row['content'])
-
-        # Determine new content
-        new_final_content = {}
-        if update_args.content is not None:
-            new_final_content = update_args.content
-        elif update_args.patch_content is not None:
-            # Apply patch to a copy of current_content_dict for the new state
-            new_final_content = current_content_dict.copy()
-            # Iterate over patch_content to handle __DELETE__ sentinel
-            for key, value in update_args.patch_content.items():
-                if value == "__DELETE__":
-                    new_final_content.pop(key, None)  # Remove key, do nothing if key not found
-                else:
-                    new_final_content[key] = value
-        else:
-            # This case should be prevented by Pydantic model validation, but handle defensively
-            raise ValueError("No content or patch_content provided for update.")
-
-        # Log previous version to history
-        latest_version = _get_latest_context_version(cursor, "product_context_history")
-        new_version = latest_version + 1
-        _add_context_history_entry(
-            cursor,
-            "product_context_history",
-            new_version,
-            current_content_dict, # Log the content *before* the update
-            "update_product_context" # Basic change source
-        )
-
-        # Update the main product_context table
-        new_content_json = json.dumps(new_final_content)
-        cursor.execute("UPDATE product_context SET content = ? WHERE id = 1", (new_content_json,))
+        with get_connection_pool(workspace_id).transaction() as conn:
+            with _sql.cursor(conn) as cur:
+                # History + update share the one write transaction
+                # Log previous version to history (the content *before* the update);
+                # the same statement returns that content for the Python patch fallback
+                current_content_json = _log_context_history(cur, "product_context", "update_product_context")
+
+                # Update the main product_context table
+                _apply_context_update(cur, "product_context", update_args, current_content_json)
         
-        conn.commit()
-        # No need to check rowcount here as history is logged regardless of content identity
     except (sqlite3.Error, TypeError, json.JSONDecodeError, DatabaseError) as e: # Added DatabaseError
-        conn.rollback()
         raise DatabaseError(f"Failed to update product_context: {e}")
-    finally:
-        if cursor:
-            cursor.close()
 
-            
 def get_active_context(workspace_id: str) -> models.ActiveContext:
     """Retrieves the active context."""
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None # Initialize cursor for finally block
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, content FROM active_context WHERE id = 1")
-        row = cursor.fetchone()
-        if row:
-            content_dict = json.loads(row['content'])
-            return models.ActiveContext(id=row['id'], content=content_dict)
-        else:
-            raise DatabaseError("Active context row not found.")
-    except (sqlite3.Error, json.JSONDecodeError) as e:
-        raise DatabaseError(f"Failed to retrieve active context: {e}")
-    finally:
-        if cursor:
-            cursor.close()
+    with get_connection_pool(workspace_id).reader() as conn:
+        try:
+            with _sql.cursor(conn, 'SELECT id, content AS "content [JSON]" FROM active_context WHERE id = 1') as cur:
+                row = cur.fetchone()
+            if row:
+                return models.ActiveContext(id=row['id'], content=row['content'])
+            else:
+                raise DatabaseError("Active context row not found.")
+        except (sqlite3.Error, json.JSONDecodeError) as e:
+            raise DatabaseError(f"Failed to retrieve active context: {e}")
 
 def update_active_context(workspace_id: str, update_args: models.UpdateContextArgs) -> None:
     """Updates the active context using either full content or a patch."""
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None # Initialize cursor for finally block
+    if update_args.content is None and update_args.patch_content is None:
+        # This case should be prevented by Pydantic model validation, but handle defensively
+        raise ValueError("No content or patch_content provided for update.")
+
     try:
-        cursor = conn.cursor()
-        # Fetch current content to log to history
-        cursor.execute("SELECT content FROM active_context WHERE id = 1")
-        current_row = cursor.fetchone()
-        if not current_row:
-            raise DatabaseError("Active context row not found for updating (cannot log history).")
-        current_content_dict = json.loads(current_row['content'])
-
-        # Determine new content
-        new_final_content = {}
-        if update_args.content is not None:
-            new_final_content = update_args.content
-        elif update_args.patch_content is not None:
-            new_final_content = current_content_dict.copy()
-            # Iterate over patch_content to handle __DELETE__ sentinel
-            for key, value in update_args.patch_content.items():
-                if value == "__DELETE__":
-                    new_final_content.pop(key, None)  # Remove key, do nothing if key not found
-                else:
-                    new_final_content[key] = value
-        else:
-            # This case should be prevented by Pydantic model validation, but handle defensively
-            raise ValueError("No content or patch_content provided for update.")
-
-        # Log previous version to history
-        latest_version = _get_latest_context_version(cursor, "active_context_history")
-        new_version = latest_version + 1
-        _add_context_history_entry(
-            cursor,
-            "active_context_history",
-            new_version,
-            current_content_dict, # Log the content *before* the update
-            "update_active_context" # Basic change source
-        )
-
-        # Update the main active_context table
-        new_content_json = json.dumps(new_final_content)
-        cursor.execute("UPDATE active_context SET content = ? WHERE id = 1", (new_content_json,))
+        with get_connection_pool(workspace_id).transaction() as conn:
+            with _sql.cursor(conn) as cur:
+                # History + update share the one write transaction
+                # Log previous version to history (the content *before* the update);
+                # the same statement returns that content for the Python patch fallback
+                current_content_json = _log_context_history(cur, "active_context", "update_active_context")
+
+                # Update the main active_context table
+                _apply_context_update(cur, "active_context", update_args, current_content_json)
         
-        conn.commit()
     except (sqlite3.Error, TypeError, json.JSONDecodeError, DatabaseError) as e: # Added DatabaseError
-        conn.rollback()
         raise DatabaseError(f"Failed to update active context: {e}")
-    finally:
-        if cursor:
-            cursor.close()
 
 def search_context_fts(
     workspace_id: str,
@@ -202,118 +253,83 @@ def search_context_fts(
     limit: Optional[int] = 10
 ) -> List[Dict[str, Any]]:
     """Searches contexts (product and active) using FTS5 for the given query term."""
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None # Initialize cursor for finally block
-    
-    # Base SQL for context FTS search
-    sql = "SELECT rowid, context_type, content_text FROM context_fts WHERE context_fts MATCH ?"
-    params_list = [query_term]
-    
-    if context_type_filter:
-        sql += " AND context_type = ?"
-        params_list.append(context_type_filter)
-    
-    sql += " ORDER BY rank"
-    
-    if limit is not None and limit > 0:
-        sql += " LIMIT ?"
-        params_list.append(limit)
+    with get_connection_pool(workspace_id).reader() as conn:
+        params_list = [query_term]
+        if context_type_filter:
+            params_list.append(context_type_filter)
+        limited = limit is not None and limit > 0
+        if limited:
+            params_list.append(limit)
+        sql = _CONTEXT_FTS_SQL[(bool(context_type_filter), limited)]
 
-    try:
-        cursor = conn.cursor()
-        cursor.execute(sql, tuple(params_list))
-        rows = cursor.fetchall()
+        try:
+            with _sql.cursor(conn, sql, params_list) as cur:
+                rows = cur.fetchall()
         
-        results = []
-        for row in rows:
-            # Parse the JSON content
-            try:
-                content_dict = json.loads(row['content_text'])
-                results.append({
+            # Parse the JSON content, skipping rows that fail to decode
+            decoded = [(row, _loads_or_invalid(row['content_text'])) for row in rows]
+            results = [
+                {
                     'id': row['rowid'],
                     'context_type': row['context_type'],
                     'content': content_dict,
-                    'content_text_snippet': row['content_text'][:200] + '...' if len(row['content_text']) > 200 else row['content_text']
-                })
-            except json.JSONDecodeError as e:
-                log.warning(f"Failed to decode JSON for context search result: {e}")
-                continue
-                
-        return results
-    except sqlite3.Error as e:
-        raise DatabaseError(f"Failed FTS search on contexts for term '{query_term}': {e}")
-    finally:
-        if cursor:
-            cursor.close()
+                    'content_text_snippet': _snippet(row['content_text'])
+                }
+                for row, content_dict in decoded
+                if content_dict is not _INVALID
+            ]
+            return results
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Failed FTS search on contexts for term '{query_term}': {e}")
 
 def get_item_history(
     workspace_id: str,
     args: models.GetItemHistoryArgs
 ) -> List[Dict[str, Any]]: # Returning list of dicts for now, could be Pydantic models
     """Retrieves history for product_context or active_context."""
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None # Initialize cursor for finally block
-
-    if args.item_type == "product_context":
-        history_table_name = "product_context_history"
-        # history_model = models.ProductContextHistory # If returning Pydantic models
-    elif args.item_type == "active_context":
-        history_table_name = "active_context_history"
-        # history_model = models.ActiveContextHistory # If returning Pydantic models
-    else:
-        # This should be caught by Pydantic validation in GetItemHistoryArgs
-        raise ValueError("Invalid item_type for history retrieval.")
-
-    sql = f"SELECT id, timestamp, version, content, change_source FROM {history_table_name}"
-    conditions = []
-    params_list = []
+    with get_connection_pool(workspace_id).reader() as conn:
+        if args.item_type not in _CONTEXT_HISTORY_TABLES:
+            # This should be caught by Pydantic validation in GetItemHistoryArgs
+            raise ValueError("Invalid item_type for history retrieval.")
 
-    if args.version is not None:
-        conditions.append("version = ?")
-        params_list.append(args.version)
-    if args.before_timestamp:
-        conditions.append("timestamp < ?")
-        params_list.append(args.before_timestamp)
-    if args.after_timestamp:
-        conditions.append("timestamp > ?")
-        params_list.append(args.after_timestamp)
-    
-    # Add workspace_id filter if it were part of the history table (it's not currently)
-    # conditions.append("workspace_id = ?")
-    # params_list.append(workspace_id)
-
-    if conditions:
-        sql += " WHERE " + " AND ".join(conditions)
-
-    sql += " ORDER BY version DESC, timestamp DESC" # Most recent version/timestamp first
-
-    if args.limit is not None and args.limit > 0:
-        sql += " LIMIT ?"
-        params_list.append(args.limit)
+        if args.version is not None and not args.before_timestamp and not args.after_timestamp:
+            # At most one row: skip ORDER BY and the general LIMIT entirely
+            sql = _VERSION_LOOKUP_SQL[args.item_type]
+            params_list = [args.version]
+        else:
+            params_list = []
+            if args.version is not None:
+                params_list.append(args.version)
+            if args.before_timestamp:
+                params_list.append(args.before_timestamp)
+            if args.after_timestamp:
+                params_list.append(args.after_timestamp)
+            limited = args.limit is not None and args.limit > 0
+            if limited:
+                params_list.append(args.limit)
 
-    params = tuple(params_list)
+            sql = _ITEM_HISTORY_SQL[(
+                args.item_type,
+                args.version is not None,
+                bool(args.before_timestamp),
+                bool(args.after_timestamp),
+                limited,
+            )]
 
-    try:
-        cursor = conn.cursor()
-        cursor.execute(sql, params)
-        rows = cursor.fetchall()
-        history_entries = []
-        for row in rows:
-            content_dict = json.loads(row['content'])
-            history_entries.append({
-                "id": row['id'],
-                "timestamp": row['timestamp'], # Already datetime object
-                "version": row['version'],
-                "content": content_dict,
-                "change_source": row['change_source']
-            })
-            # Or if using Pydantic models:
-            # history_entries.append(history_model(id=row['id'], timestamp=row['timestamp'], ...))
-        return history_entries
-    except (sqlite3.Error, json.JSONDecodeError) as e:
-        raise DatabaseError(f"Failed to retrieve history for {args.item_type}: {e}")
-    finally:
-        if cursor:
-            cursor.close()
\ No newline at end of file
+        try:
+            with _sql.cursor(conn, sql, params_list) as cur:
+                rows = cur.fetchall()
+            history_entries = []
+            for row in rows:
+                history_entries.append({
+                    "id": row['id'],
+                    "timestamp": row['timestamp'], # Already datetime object
+                    "version": row['version'],
+                    "content": row['content'], # Already decoded by the JSON converter
+                    "change_source": row['change_source']
+                })
+                # Or if using Pydantic models:
+                # history_entries.append(history_model(id=row['id'], timestamp=row['timestamp'], ...))
+            return history_entries
+        except (sqlite3.Error, json.JSONDecodeError) as e:
+            raise DatabaseError(f"Failed to retrieve history for {args.item_type}: {e}")
\ No newline at end of file
@@ -1,68 +1,129 @@
 """CRUD operations for Custom Data."""
 
+import itertools
+import logging
 import sqlite3
 import json
-from typing import List, Optional
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 from ..core.exceptions import DatabaseError
-from . import models
+from . import models, _json, _sql
+# database.py defines get_connection_pool before it imports this module for re-export
+from .database import get_connection_pool
+
+log = logging.getLogger(__name__)
+
+# Running count of stored values that failed to decode (for observability)
+_decode_failures = itertools.count(1)
+
+def _log_decode_failure(label: str, item_id: Any, error: Exception) -> None:
+    # Lazy %-formatting: nothing is formatted when WARNING is filtered out
+    log.warning("Failed to decode JSON for %s id=%s: %s (decode failures so far: %d)", label, item_id, error, next(_decode_failures))
+
+# Returned by _loads_value_or_invalid for values that are not valid JSON
+_INVALID = object()
+
+def _loads_value_or_invalid(row: sqlite3.Row, label: str = "custom_data") -> object:
+    """Decodes a row's JSON `value`, returning _INVALID (with a warning) instead of raising."""
+    try:
+        return _json.loads(row['value'])
+    except json.JSONDecodeError as e:
+        _log_decode_failure(label, row['id'], e)
+        return _INVALID
+
+def _rows_to_custom_data(rows: Iterable[sqlite3.Row], label: str = "custom_data") -> Iterator[models.CustomData]:
+    """
+    Yields CustomData for custom_data rows, skipping rows whose JSON is invalid.
+
+    Uses model_construct: these values were validated when they were written, so
+    re-running Pydantic validation on every read is skipped. Rows without a
+    `timestamp` column (FTS-only selects) get the model default.
+    """
+    construct = models.CustomData.model_construct
+    columns = None
+    for row in rows:
+        value_data = _loads_value_or_invalid(row, label)
+        if value_data is _INVALID:
+            continue # Skip this row
+        if columns is None:
+            columns = row.keys()
+        fields = dict(zip(columns, row))
+        fields['value'] = value_data
+        yield construct(**fields)
+
+# Use atomic INSERT ... ON CONFLICT to avoid race conditions
+# Same category+key = UPDATE (preserves ID and links)
+# New category+key = INSERT new record (old record stays intact with links)
+_UPSERT_CUSTOM_DATA_SQL = """
+    INSERT INTO custom_data (timestamp, category, key, value)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(category, key) DO UPDATE SET
+        timestamp = excluded.timestamp,
+        value = excluded.value
+    RETURNING id
+"""
 
 def log_custom_data(workspace_id: str, data: models.CustomData) -> models.CustomData:
     """Logs or updates a custom data entry. Uses atomic INSERT ON CONFLICT to preserve IDs and links."""
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None # Initialize cursor for finally block
-    
-    # Ensure value is serialized to JSON string
-    value_json = json.dumps(data.value)
-    
-    # Use atomic INSERT ... ON CONFLICT to avoid race conditions
-    # Same category+key = UPDATE (preserves ID and links)
-    # New category+key = INSERT new record (old record stays intact with links)
-    sql = """
-        INSERT INTO custom_data (timestamp, category, key, value)
-        VALUES (?, ?, ?, ?)
-        ON CONFLICT(category, key) DO UPDATE SET
-            timestamp = excluded.timestamp,
-            value = excluded.value
-        RETURNING id
+    return log_custom_data_many(workspace_id, [data])[0]
+
+def log_custom_data_many(workspace_id: str, items: List[models.CustomData]) -> List[models.CustomData]:
     """
-    
+    Logs or updates several custom data entries in a single transaction (one commit
+    instead of one per entry). Each entry gets its `id` set as in `log_custom_data`;
+    if any entry fails, none are written.
+    """
+    if not items:
+        return items
+
+    # Ensure values are serialized to JSON strings before taking the write lock
+    current = items[0]
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql, (
-            data.timestamp,
-            data.category,
-            data.key,
-            value_json
-        ))
-        
-        # Get the ID from the RETURNING clause
-        row = cursor.fetchone()
-        if row:
-            data.id = row['id']
-        
-        conn.commit()
-        return data
-    except (sqlite3.Error, TypeError) as e: # TypeError for json.dumps
-        conn.rollback()
-        raise DatabaseError(f"Failed to log custom data for '{data.category}/{data.key}': {e}")
-    finally:
-        if cursor:
-            cursor.close()
+        rows = []
+        for current in items:
+            rows.append((current.timestamp, current.category, current.key, _json.dumps(current.value)))
+    except TypeError as e:
+        raise DatabaseError(f"Failed to log custom data for '{current.category}/{current.key}': {e}")
 
-def get_custom_data(
+    ids: List[Optional[int]] = []
+    try:
+        with get_connection_pool(workspace_id).transaction() as conn:
+            with _sql.cursor(conn) as cur:
+                # executemany cannot return the RETURNING rows, so execute per entry
+                # inside the one transaction; the statement is prepared once and cached.
+                for current, params in zip(items, rows):
+                    cur.execute(_UPSERT_CUSTOM_DATA_SQL, params)
+                    # Get the ID from the RETURNING clause
+                    row = cur.fetchone()
+                    ids.append(row['id'] if row else None)
+    except sqlite3.Error as e:
+        raise DatabaseError(f"Failed to log custom data for '{current.category}/{current.key}': {e}")
+
+    # Only hand out ids once the transaction has committed
+    for item, item_id in zip(items, ids):
+        if item_id is not None:
+            item.id = item_id
+    return items
+
+def _iter_custom_data(workspace_id: str, sql: str, params: Sequence[Any], error_message: str) -> Iterator[models.CustomData]:
+    """Runs a custom_data SELECT and yields decoded entries batch by batch, skipping rows with invalid JSON."""
+    with get_connection_pool(workspace_id).reader() as conn:
+        try:
+            with _sql.cursor(conn, sql, params) as cur:
+                # Rows are pulled from SQLite in batches and decoded lazily
+                yield from _rows_to_custom_data(_sql.iter_rows(cur))
+        except sqlite3.Error as e:
+            raise DatabaseError(f"{error_message}: {e}")
+
+def get_custom_data_iter(
     workspace_id: str,
     category: Optional[str] = None,
     key: Optional[str] = None
-) -> List[models.CustomData]:
-    """Retrieves custom data entries, optionally filtered by category and/or key."""
+) -> Iterator[models.CustomData]:
+    """Lazily yields custom data entries, optionally filtered by category and/or key."""
     if key and not category:
         raise ValueError("Cannot filter by key without specifying a category.")
 
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None # Initialize cursor for finally block
     sql = "SELECT id, timestamp, category, key, value FROM custom_data"
     conditions = []
     params_list = []
@@ -78,175 +139,103 @@ def get_custom_data(
         sql += " WHERE " + " AND ".join(conditions)
 
     sql += " ORDER BY category ASC, key ASC" # Consistent ordering
-    params = tuple(params_list)
+    return _iter_custom_data(workspace_id, sql, params_list, "Failed to retrieve custom data")
 
-    try:
-        cursor = conn.cursor()
-        cursor.execute(sql, params)
-        rows = cursor.fetchall()
-        custom_data_list = []
-        for row in rows:
-            try:
-                # Deserialize value from JSON string
-                value_data = json.loads(row['value'])
-                custom_data_list.append(
-                    models.CustomData(
-                        id=row['id'],
-                        timestamp=row['timestamp'],
-                        category=row['category'],
-                        key=row['key'],
-                        value=value_data
-                    )
-                )
-            except json.JSONDecodeError as e:
-                # Log or handle error for specific row if JSON is invalid
-                print(f"Warning: Failed to decode JSON for custom_data id={row['id']}: {e}") # Replace with proper logging
-                continue # Skip this row
-        return custom_data_list
-    except sqlite3.Error as e:
-        raise DatabaseError(f"Failed to retrieve custom data: {e}")
-    finally:
-        if cursor:
-            cursor.close()
+def get_custom_data(
+    workspace_id: str,
+    category: Optional[str] = None,
+    key: Optional[str] = None
+) -> List[models.CustomData]:
+    """Retrieves custom data entries, optionally filtered by category and/or key."""
+    return list(get_custom_data_iter(workspace_id, category, key))
 
 def get_custom_data_by_id(workspace_id: str, custom_data_id: int) -> Optional[models.CustomData]:
     """Retrieves a specific custom data entry by its numeric ID."""
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None
-    sql = "SELECT id, timestamp, category, key, value FROM custom_data WHERE id = ?"
+    with get_connection_pool(workspace_id).reader() as conn:
+        sql = "SELECT id, timestamp, category, key, value FROM custom_data WHERE id = ?"
     
-    try:
-        cursor = conn.cursor()
-        cursor.execute(sql, (custom_data_id,))
-        row = cursor.fetchone()
+        try:
+            with _sql.cursor(conn, sql, (custom_data_id,)) as cur:
+                row = cur.fetchone()
         
-        if row:
-            try:
-                value_data = json.loads(row['value'])
-                return models.CustomData(
-                    id=row['id'],
-                    timestamp=row['timestamp'],
-                    category=row['category'],
-                    key=row['key'],
-                    value=value_data
-                )
-            except json.JSONDecodeError as e:
-                print(f"Warning: Failed to decode JSON for custom_data id={custom_data_id}: {e}")
-                return None
-        return None
-    except sqlite3.Error as e:
-        raise DatabaseError(f"Failed to retrieve custom data by ID {custom_data_id}: {e}")
-    finally:
-        if cursor:
-            cursor.close()
+            if row:
+                return next(_rows_to_custom_data((row,)), None)
+            return None
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Failed to retrieve custom data by ID {custom_data_id}: {e}")
 
-def get_all_custom_data_by_id_desc(workspace_id: str, limit: Optional[int] = None) -> List[models.CustomData]:
-    """Retrieves all custom data entries sorted by ID descending (most recent first) for UI display."""
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None
+def get_all_custom_data_by_id_desc_iter(workspace_id: str, limit: Optional[int] = None) -> Iterator[models.CustomData]:
+    """Lazily yields all custom data entries sorted by ID descending (most recent first)."""
     sql = "SELECT id, timestamp, category, key, value FROM custom_data ORDER BY id DESC"
     params_list = []
-    
+
     if limit is not None and limit > 0:
         sql += " LIMIT ?"
         params_list.append(limit)
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute(sql, tuple(params_list))
-        rows = cursor.fetchall()
-        custom_data_list = []
-        for row in rows:
-            try:
-                value_data = json.loads(row['value'])
-                custom_data_list.append(
-                    models.CustomData(
-                        id=row['id'],
-                        timestamp=row['timestamp'],
-                        category=row['category'],
-                        key=row['key'],
-                        value=value_data
-                    )
-                )
-            except json.JSONDecodeError as e:
-                print(f"Warning: Failed to decode JSON for custom_data id={row['id']}: {e}")
-                continue
-        return custom_data_list
-    except sqlite3.Error as e:
-        raise DatabaseError(f"Failed to retrieve custom data sorted by ID: {e}")
-    finally:
-        if cursor:
-            cursor.close()
+
+    return _iter_custom_data(workspace_id, sql, params_list, "Failed to retrieve custom data sorted by ID")
+
+def get_all_custom_data_by_id_desc(workspace_id: str, limit: Optional[int] = None) -> List[models.CustomData]:
+    """Retrieves all custom data entries sorted by ID descending (most recent first) for UI display."""
+    return list(get_all_custom_data_by_id_desc_iter(workspace_id, limit))
 
 def delete_custom_data(workspace_id: str, category: str, key: str) -> bool:
     """Deletes a specific custom data entry by category and key. Returns True if deleted, False otherwise."""
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None # Initialize cursor for finally block
     sql = "DELETE FROM custom_data WHERE category = ? AND key = ?"
     params = (category, key)
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql, params)
-        conn.commit()
-        return cursor.rowcount > 0 # Return True if one row was deleted
+        with get_connection_pool(workspace_id).transaction() as conn:
+            with _sql.cursor(conn, sql, params) as cur:
+                deleted = cur.rowcount > 0 # True if one row was deleted
+            return deleted
     except sqlite3.Error as e:
-        conn.rollback()
         raise DatabaseError(f"Failed to delete custom data for '{category}/{key}': {e}")
-    finally:
-        if cursor:
-            cursor.close()
 
-def search_project_glossary_fts(workspace_id: str, query_term: str, limit: Optional[int] = 10) -> List[models.CustomData]:
-    """Searches ProjectGlossary entries in custom_data using FTS5."""
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None # Initialize cursor for finally block
-    # Updated to use the new general custom_data_fts table structure
-    sql = """
-        SELECT cd.id, cd.category, cd.key, cd.value
-        FROM custom_data_fts fts
-        JOIN custom_data cd ON fts.rowid = cd.id
-        WHERE fts.custom_data_fts MATCH ? AND fts.category = 'ProjectGlossary'
-        ORDER BY rank
+def delete_custom_data_many(workspace_id: str, pairs: List[Tuple[str, str]]) -> int:
     """
-    # The MATCH query will search category, key, and value_text.
-    # We explicitly filter for ProjectGlossary category after the FTS match.
-    # Note: The MATCH query will search across 'term' and 'definition_text' columns in custom_data_fts
-    params_list = [query_term]
-
-    if limit is not None and limit > 0:
-        sql += " LIMIT ?"
-        params_list.append(limit)
+    Deletes several custom data entries, given as (category, key) pairs, in a single
+    transaction. Returns the number of rows deleted.
+    """
+    if not pairs:
+        return 0
 
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql, tuple(params_list))
-        rows = cursor.fetchall()
-        glossary_entries = []
-        for row in rows:
-            try:
-                value_data = json.loads(row['value'])
-                glossary_entries.append(
-                    models.CustomData(
-                        id=row['id'],
-                        category=row['category'],
-                        key=row['key'],
-                        value=value_data
-                    )
-                )
-            except json.JSONDecodeError as e:
-                # Log or handle error for specific row if JSON is invalid
-                print(f"Warning: Failed to decode JSON for glossary item id={row['id']}: {e}") # Replace with proper logging
-                continue # Skip this row
-        return glossary_entries
+        with get_connection_pool(workspace_id).transaction() as conn:
+            with _sql.cursor(conn) as cur:
+                cur.executemany("DELETE FROM custom_data WHERE category = ? AND key = ?", pairs)
+                deleted = cur.rowcount
+            return deleted
     except sqlite3.Error as e:
-        raise DatabaseError(f"Failed FTS search on ProjectGlossary for term '{query_term}': {e}")
-    finally:
-        if cursor:
-            cursor.close()
+        raise DatabaseError(f"Failed to delete {len(pairs)} custom data entries: {e}")
+
+def search_project_glossary_fts(workspace_id: str, query_term: str, limit: Optional[int] = 10) -> List[models.CustomData]:
+    """Searches ProjectGlossary entries in custom_data using FTS5."""
+    with get_connection_pool(workspace_id).reader() as conn:
+        # custom_data_fts is an external-content table (content="custom_data"), so it
+        # can return category/key/value itself; no JOIN back to custom_data is needed.
+        sql = """
+            SELECT rowid AS id, category, key, value
+            FROM custom_data_fts
+            WHERE custom_data_fts MATCH ? AND category = 'ProjectGlossary'
+            ORDER BY rank
+        """
+        # The MATCH query will search category, key, and value_text.
+        # We explicitly filter for ProjectGlossary category after the FTS match.
+        # Note: The MATCH query will search across 'term' and 'definition_text' columns in custom_data_fts
+        params_list = [query_term]
+
+        if limit is not None and limit > 0:
+            sql += " LIMIT ?"
+            params_list.append(limit)
+
+        try:
+            with _sql.cursor(conn, sql, params_list) as cur:
+                rows = cur.fetchall()
+            # Skip rows whose JSON is invalid
+            glossary_entries = list(_rows_to_custom_data(rows, "glossary item"))
+            return glossary_entries
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Failed FTS search on ProjectGlossary for term '{query_term}': {e}")
 
 def search_custom_data_value_fts(
     workspace_id: str,
@@ -256,52 +245,32 @@ def search_custom_data_value_fts(
 ) -> List[models.CustomData]:
     """Searches all custom_data entries using FTS5 on category, key, and value.
        Optionally filters by category after FTS."""
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None # Initialize cursor for finally block
+    with get_connection_pool(workspace_id).reader() as conn:
     
-    sql = """
-        SELECT cd.id, cd.timestamp, cd.category, cd.key, cd.value
-        FROM custom_data_fts fts
-        JOIN custom_data cd ON fts.rowid = cd.id
-        WHERE fts.custom_data_fts MATCH ?
-    """
-    params_list = [query_term]
+        # Joined to custom_data only because timestamp is not an FTS column
+        sql = """
+            SELECT cd.id, cd.timestamp, cd.category, cd.key, cd.value
+            FROM custom_data_fts fts
+            JOIN custom_data cd ON fts.rowid = cd.id
+            WHERE fts.custom_data_fts MATCH ?
+        """
+        params_list = [query_term]
 
-    if category_filter:
-        sql += " AND fts.category = ?" # Filter by category on the FTS table
-        params_list.append(category_filter)
+        if category_filter:
+            sql += " AND fts.category = ?" # Filter by category on the FTS table
+            params_list.append(category_filter)
         
-    sql += " ORDER BY rank"
+        sql += " ORDER BY rank"
 
-    if limit is not None and limit > 0:
-        sql += " LIMIT ?"
-        params_list.append(limit)
+        if limit is not None and limit > 0:
+            sql += " LIMIT ?"
+            params_list.append(limit)
 
-    try:
-        cursor = conn.cursor()
-        cursor.execute(sql, tuple(params_list))
-        rows = cursor.fetchall()
-        results = []
-        for row in rows:
-            try:
-                cursor = conn.cursor()
-                value_data = json.loads(row['value'])
-                results.append(
-                    models.CustomData(
-                        id=row['id'],
-                        timestamp=row['timestamp'],
-                        category=row['category'],
-                        key=row['key'],
-                        value=value_data
-                    )
-                )
-            except json.JSONDecodeError as e:
-                print(f"Warning: Failed to decode JSON for custom_data id={row['id']} (search_custom_data_value_fts): {e}")
-                continue
-        return results
-    except sqlite3.Error as e:
-        raise DatabaseError(f"Failed FTS search on custom_data for term '{query_term}': {e}")
-    finally:
-        if cursor:
-            cursor.close()
\ No newline at end of file
+        try:
+            with _sql.cursor(conn, sql, params_list) as cur:
+                rows = cur.fetchall()
+            # Skip rows whose JSON is invalid
+            results = list(_rows_to_custom_data(rows, "custom_data (search_custom_data_value_fts)"))
+            return results
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Failed FTS search on custom_data for term '{query_term}': {e}")
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""JSON encode/decode helpers for values stored in SQLite TEXT columns.
+
+Uses orjson when it is installed and falls back to the stdlib otherwise.
+`dumps` always returns `str` so stored values stay TEXT (the FTS triggers and
+JSON1 functions read them as such). orjson's errors subclass the stdlib ones
+(JSONDecodeError -> json.JSONDecodeError, JSONEncodeError -> TypeError), so
+callers can keep catching `json.JSONDecodeError` / `TypeError`.
+"""
+
+import json
+from typing import Any, Union
+
+try:  # Optional C JSON encoder/decoder; stdlib json is used when it is not installed
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+JSONDecodeError = json.JSONDecodeError
+
+
+def dumps(obj: Any) -> str:
+    """Serialize `obj` to a JSON string."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except TypeError:
+            pass  # e.g. ints wider than 64 bits; let the stdlib encoder decide
+    return json.dumps(obj)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Deserialize a JSON string or bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
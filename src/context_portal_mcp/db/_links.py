@@ -1,162 +1,210 @@
 """CRUD operations for Context Links."""
 
 import sqlite3
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from ..core.exceptions import DatabaseError
+from . import _sql
+# database.py defines get_connection_pool before it imports this module for re-export
+from .database import get_connection_pool
 from . import models
 
+_INSERT_CONTEXT_LINK_SQL = """
+    INSERT INTO context_links (
+        workspace_id, source_item_type, source_item_id,
+        target_item_type, target_item_id, relationship_type, description, timestamp
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    RETURNING id
+"""
+
+_SELECT_CONTEXT_LINKS_SQL = """
+    SELECT id, timestamp, workspace_id, source_item_type, source_item_id,
+           target_item_type, target_item_id, relationship_type, description
+    FROM context_links
+"""
+
+_DELETE_CONTEXT_LINK_SQL = "DELETE FROM context_links WHERE id = ? AND workspace_id = ?"
+
+# Prefixed to a parenthesized context_links SELECT so SQLite returns its rows as one JSON array text
+_CONTEXT_LINKS_JSON_SELECT = (
+    "SELECT json_group_array(json_object("
+    f"'id', id, 'timestamp', {_sql.json_timestamp('timestamp')}, "
+    "'source_item_type', source_item_type, 'source_item_id', source_item_id, "
+    "'target_item_type', target_item_type, 'target_item_id', target_item_id, "
+    "'relationship_type', relationship_type, 'description', description)) FROM "
+)
+
 def log_context_link(workspace_id: str, link_data: models.ContextLink) -> models.ContextLink:
     """Logs a new context link."""
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None # Initialize cursor for finally block
-    sql = """
-        INSERT INTO context_links (
-            workspace_id, source_item_type, source_item_id,
-            target_item_type, target_item_id, relationship_type, description, timestamp
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    return log_context_links_many(workspace_id, [link_data])[0]
+
+def log_context_links_many(workspace_id: str, links: List[models.ContextLink]) -> List[models.ContextLink]:
     """
+    Logs several context links in a single transaction (one commit instead of one per
+    link). Each link gets its new `id` set; if any insert fails, none are written.
+    """
+    if not links:
+        return links
+
     # Use link_data.timestamp if provided (e.g. from an import), else it defaults in DB
     # However, our Pydantic model ContextLink has default_factory=datetime.utcnow for timestamp
     # So, link_data.timestamp will always be populated.
-    params = (
-        workspace_id, # Storing workspace_id explicitly in the table
-        link_data.source_item_type,
-        str(link_data.source_item_id), # Ensure IDs are stored as text
-        link_data.target_item_type,
-        str(link_data.target_item_id), # Ensure IDs are stored as text
-        link_data.relationship_type,
-        link_data.description,
-        link_data.timestamp # Pydantic model ensures this is set
-    )
+    rows = [
+        (
+            workspace_id, # Storing workspace_id explicitly in the table
+            link_data.source_item_type,
+            str(link_data.source_item_id), # Ensure IDs are stored as text
+            link_data.target_item_type,
+            str(link_data.target_item_id), # Ensure IDs are stored as text
+            link_data.relationship_type,
+            link_data.description,
+            link_data.timestamp # Pydantic model ensures this is set
+        ) for link_data in links
+    ]
+
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql, params)
-        link_id = cursor.lastrowid
-        conn.commit()
-        link_data.id = link_id
-        # The timestamp from the DB default might be slightly different if we didn't pass it,
-        # but since our Pydantic model sets it, what we have in link_data.timestamp is accurate.
-        return link_data
+        with get_connection_pool(workspace_id).transaction() as conn:
+            with _sql.cursor(conn) as cur:
+                # executemany cannot return the RETURNING rows, so execute per link
+                # inside the one transaction; the statement is prepared once and cached.
+                ids = [cur.execute(_INSERT_CONTEXT_LINK_SQL, params).fetchone()[0] for params in rows]
     except sqlite3.Error as e:
-        conn.rollback()
         raise DatabaseError(f"Failed to log context link: {e}")
-    finally:
-        if cursor:
-            cursor.close()
 
-def get_context_links(
+    # Only hand out ids once the transaction has committed. The timestamp from the DB
+    # default might differ if we didn't pass it, but since our Pydantic model sets it,
+    # what we have in link_data.timestamp is accurate.
+    for link_data, link_id in zip(links, ids):
+        link_data.id = link_id
+    return links
+
+def _context_links_query(
     workspace_id: str,
     item_type: str,
     item_id: str,
     relationship_type_filter: Optional[str] = None,
     linked_item_type_filter: Optional[str] = None,
     limit: Optional[int] = None
-) -> List[models.ContextLink]:
+) -> Tuple[str, str, Dict[str, Any]]:
     """
-    Retrieves links for a given item, with optional filters.
-    Finds links where the given item is EITHER the source OR the target.
-    For custom_data, supports both numeric ID and category:key format.
+    Builds the get_context_links query as (WITH prefix, SELECT, named parameters).
+    The prefix is empty unless a custom_data alias has to be resolved.
     """
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None # Initialize cursor for finally block
-    
-    # Ensure item_id is treated as string for consistent querying with TEXT columns
-    str_item_id = str(item_id)
-    
-    # For custom_data, also check category:key format if item_id is numeric
-    search_item_ids = [str_item_id]
-    if item_type == 'custom_data' and item_id.isdigit():
-        try:
-            # Import here to avoid circular import
-            from ._custom_data import get_custom_data_by_id
-            custom_data_item = get_custom_data_by_id(workspace_id, int(item_id))
-            if custom_data_item:
-                category_key_id = f"{custom_data_item.category}:{custom_data_item.key}"
-                search_item_ids.append(category_key_id)
-        except Exception as e:
-            # If lookup fails, just use the original numeric ID
-            pass
-
-    base_sql = """
-        SELECT id, timestamp, workspace_id, source_item_type, source_item_id,
-               target_item_type, target_item_id, relationship_type, description
-        FROM context_links
-    """
-    conditions = []
-    params_list = []
-
-    # Main condition: item is either source or target
-    # For custom_data, search all possible ID formats
-    if len(search_item_ids) > 1:  # Multiple ID formats to check (numeric + category:key)
-        id_conditions = []
-        for search_id in search_item_ids:
-            id_conditions.append("(source_item_type = ? AND source_item_id = ?)")
-            id_conditions.append("(target_item_type = ? AND target_item_id = ?)")
-            params_list.extend([item_type, search_id, item_type, search_id])
-        conditions.append("(" + " OR ".join(id_conditions) + ")")
-    else:  # Single ID format (normal case for decisions/progress/patterns)
-        conditions.append(
-            "((source_item_type = ? AND source_item_id = ?) OR (target_item_type = ? AND target_item_id = ?))"
+    # Ensure item_id is treated as string for consistent querying with TEXT columns.
+    # Values are bound by name, so each is passed once however often the SQL uses it.
+    params: Dict[str, Any] = {
+        'workspace_id': workspace_id,
+        'item_type': item_type,
+        'item_id': str(item_id),
+    }
+
+    if item_type == 'custom_data' and params['item_id'].isdigit():
+        # A numeric custom_data ID may also be linked via its category:key form;
+        # resolve that alias inside the same query rather than with a separate lookup.
+        ids_cte = (
+            "WITH ids(item_id) AS (SELECT :item_id UNION ALL "
+            "SELECT category || ':' || key FROM custom_data WHERE id = CAST(:item_id AS INTEGER)) "
         )
-        params_list.extend([item_type, str_item_id, item_type, str_item_id])
-    
+        id_set = "(SELECT item_id FROM ids)"
+    else:
+        ids_cte, id_set = "", "(:item_id)"
+
+    # The item may be either end of a link. Rather than one OR predicate (which
+    # lets the planner use at most one side's index), each end gets its own
+    # indexed SELECT and the two are combined with UNION ALL. The target arm
+    # skips rows the source arm already matched, so self-links appear once.
+    # All filters are applied inside the arms, so each row is checked once.
+    source_match = f"source_item_type = :item_type AND source_item_id IN {id_set}"
+    target_match = f"target_item_type = :item_type AND target_item_id IN {id_set}"
     # Add workspace_id filter for safety, though connection is already workspace-specific
-    conditions.append("workspace_id = ?")
-    params_list.append(workspace_id)
-
+    common = " AND workspace_id = :workspace_id"
     if relationship_type_filter:
-        conditions.append("relationship_type = ?")
-        params_list.append(relationship_type_filter)
-    
+        common += " AND relationship_type = :relationship_type"
+        params['relationship_type'] = relationship_type_filter
+
+    source_sql = f"{_SELECT_CONTEXT_LINKS_SQL} WHERE {source_match}{common}"
+    target_sql = f"{_SELECT_CONTEXT_LINKS_SQL} WHERE {target_match} AND NOT ({source_match}){common}"
+
     if linked_item_type_filter:
         # This filter applies to the "other end" of the link
-        conditions.append(
-            "((source_item_type = ? AND source_item_id = ? AND target_item_type = ?) OR " +
-            "(target_item_type = ? AND target_item_id = ? AND source_item_type = ?))"
-        )
-        params_list.extend([item_type, str_item_id, linked_item_type_filter,
-                            item_type, str_item_id, linked_item_type_filter])
+        source_sql += " AND target_item_type = :linked_item_type"
+        target_sql += " AND source_item_type = :linked_item_type"
+        params['linked_item_type'] = linked_item_type_filter
 
-    if conditions:
-        sql = base_sql + " WHERE " + " AND ".join(conditions)
-    else: # Should not happen due to main condition and workspace_id
-        sql = base_sql
-
-    sql += " ORDER BY timestamp DESC"
+    # id breaks timestamp ties so the merged arms come back in a stable order
+    sql = f"SELECT * FROM ({source_sql} UNION ALL {target_sql}) ORDER BY timestamp DESC, id DESC"
 
     if limit is not None and limit > 0:
-        sql += " LIMIT ?"
-        params_list.append(limit)
-    
-    params = tuple(params_list)
+        sql += " LIMIT :limit"
+        params['limit'] = limit
 
-    try:
-        cursor = conn.cursor()
-        cursor.execute(sql, params)
-        rows = cursor.fetchall()
-        links = [
-            models.ContextLink(
-                id=row['id'],
-                timestamp=row['timestamp'],
-                # workspace_id=row['workspace_id'], # Not part of ContextLink Pydantic model
-                source_item_type=row['source_item_type'],
-                source_item_id=row['source_item_id'],
-                target_item_type=row['target_item_type'],
-                target_item_id=row['target_item_id'],
-                relationship_type=row['relationship_type'],
-                description=row['description']
-            ) for row in rows
-        ]
-        return links
-    except sqlite3.Error as e:
-        raise DatabaseError(f"Failed to retrieve context links: {e}")
-    finally:
-        if cursor:
-            cursor.close()
+    return ids_cte, sql, params
+
+def get_context_links(
+    workspace_id: str,
+    item_type: str,
+    item_id: str,
+    relationship_type_filter: Optional[str] = None,
+    linked_item_type_filter: Optional[str] = None,
+    limit: Optional[int] = None
+) -> List[models.ContextLink]:
+    """
+    Retrieves links for a given item, with optional filters.
+    Finds links where the given item is EITHER the source OR the target.
+    For custom_data, supports both numeric ID and category:key format.
+    """
+    ids_cte, sql, params_list = _context_links_query(
+        workspace_id, item_type, item_id, relationship_type_filter, linked_item_type_filter, limit
+    )
+
+    with get_connection_pool(workspace_id).reader() as conn:
+        try:
+            with _sql.cursor(conn, ids_cte + sql, params_list) as cur:
+                rows = cur.fetchall()
+            # model_construct: rows were validated when written, so skip re-validation
+            construct = models.ContextLink.model_construct
+            links = [
+                construct(
+                    id=row['id'],
+                    timestamp=row['timestamp'],
+                    # workspace_id=row['workspace_id'], # Not part of ContextLink Pydantic model
+                    source_item_type=row['source_item_type'],
+                    source_item_id=row['source_item_id'],
+                    target_item_type=row['target_item_type'],
+                    target_item_id=row['target_item_id'],
+                    relationship_type=row['relationship_type'],
+                    description=row['description']
+                ) for row in rows
+            ]
+            return links
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Failed to retrieve context links: {e}")
+
+def get_context_links_json(
+    workspace_id: str,
+    item_type: str,
+    item_id: str,
+    relationship_type_filter: Optional[str] = None,
+    linked_item_type_filter: Optional[str] = None,
+    limit: Optional[int] = None
+) -> str:
+    """
+    Same as `get_context_links`, but SQLite builds the result as a JSON array text
+    (matching `ContextLink.model_dump(mode='json')` per item), skipping Python row
+    and model construction.
+    """
+    ids_cte, sql, params_list = _context_links_query(
+        workspace_id, item_type, item_id, relationship_type_filter, linked_item_type_filter, limit
+    )
+    sql = f"{ids_cte}{_CONTEXT_LINKS_JSON_SELECT}({sql})"
+
+    with get_connection_pool(workspace_id).reader() as conn:
+        try:
+            with _sql.cursor(conn, sql, params_list) as cur:
+                return cur.fetchone()[0]
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Failed to retrieve context links: {e}")
 
 def update_context_link(
     workspace_id: str,
@@ -170,51 +218,36 @@ def update_context_link(
     if relationship_type is None and description is None:
         raise ValueError("At least one of 'relationship_type' or 'description' must be provided for update.")
 
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None
     try:
-        fields: List[str] = []
-        params: List[any] = []
-
-        if relationship_type is not None:
-            fields.append("relationship_type = ?")
-            params.append(relationship_type)
-        if description is not None:
-            fields.append("description = ?")
-            params.append(description)
-
-        sql = f"UPDATE context_links SET {', '.join(fields)} WHERE id = ? AND workspace_id = ?"
-        params.extend([link_id, workspace_id])
-
-        cursor = conn.cursor()
-        cursor.execute(sql, tuple(params))
-        conn.commit()
-        return cursor.rowcount > 0
+        with get_connection_pool(workspace_id).transaction() as conn:
+            fields: List[str] = []
+            params: List[any] = []
+
+            if relationship_type is not None:
+                fields.append("relationship_type = ?")
+                params.append(relationship_type)
+            if description is not None:
+                fields.append("description = ?")
+                params.append(description)
+
+            sql = f"UPDATE context_links SET {', '.join(fields)} WHERE id = ? AND workspace_id = ?"
+            params.extend([link_id, workspace_id])
+
+            with _sql.cursor(conn, sql, params) as cur:
+                updated = cur.rowcount > 0
+            return updated
     except sqlite3.Error as e:
-        conn.rollback()
         raise DatabaseError(f"Failed to update context link ID {link_id}: {e}")
-    finally:
-        if cursor:
-            cursor.close()
 
 
 def delete_context_link_by_id(workspace_id: str, link_id: int) -> bool:
     """
     Deletes a context link by its ID. Returns True if deleted, False otherwise.
     """
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None
-    sql = "DELETE FROM context_links WHERE id = ? AND workspace_id = ?"
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql, (link_id, workspace_id))
-        conn.commit()
-        return cursor.rowcount > 0
+        with get_connection_pool(workspace_id).transaction() as conn:
+            with _sql.cursor(conn, _DELETE_CONTEXT_LINK_SQL, (link_id, workspace_id)) as cur:
+                deleted = cur.rowcount > 0
+            return deleted
     except sqlite3.Error as e:
-        conn.rollback()
-        raise DatabaseError(f"Failed to delete context link with ID {link_id}: {e}")
-    finally:
-        if cursor:
-            cursor.close()
\ No newline at end of file
+        raise DatabaseError(f"Failed to delete context link with ID {link_id}: {e}")
\ No newline at end of file
@@ -2,84 +2,150 @@
 
 import sqlite3
 import json
-from typing import List, Optional
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
 
 from ..core.exceptions import DatabaseError
+from . import _sql
+# database.py defines get_connection_pool before it imports this module for re-export
+from .database import get_connection_pool
 from . import models
+from ._tags import canonical_tags, encode_canonical_tags, parse_tags, tag_filter_conditions, tags_json_sql
 
-def _parse_tags_safely(tags_value: str) -> Optional[List[str]]:
+# Use atomic INSERT ... ON CONFLICT to avoid race conditions
+# Same name = UPDATE (preserves ID and links)
+# New name = INSERT new record (old record stays intact with links)
+_UPSERT_SYSTEM_PATTERN_SQL = """
+    INSERT INTO system_patterns (timestamp, name, description, tags)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(name) DO UPDATE SET
+        timestamp = excluded.timestamp,
+        description = excluded.description,
+        tags = excluded.tags
+    RETURNING id
+"""
+
+_SELECT_SYSTEM_PATTERNS_SQL = "SELECT id, timestamp, name, description, tags FROM system_patterns"
+
+_DELETE_SYSTEM_PATTERN_SQL = "DELETE FROM system_patterns WHERE id = ?"
+
+# Prefixed to a parenthesized system_patterns SELECT so SQLite returns its rows as one JSON array text
+_SYSTEM_PATTERNS_JSON_SELECT = (
+    "SELECT json_group_array(json_object("
+    f"'id', id, 'timestamp', {_sql.json_timestamp('timestamp')}, "
+    "'name', name, 'description', description, "
+    f"'tags', {tags_json_sql('tags')})) FROM "
+)
+
+# bm25() ranks by relevance (lower is better), weighting name over description over tags
+_SEARCH_SYSTEM_PATTERNS_FTS_SQL = """
+    SELECT sp.id, sp.timestamp, sp.name, sp.description, sp.tags
+    FROM system_patterns_fts f
+    JOIN system_patterns sp ON f.rowid = sp.id
+    WHERE f.system_patterns_fts MATCH ?
+    ORDER BY bm25(f.system_patterns_fts, 10.0, 5.0, 1.0)
+"""
+
+def _rows_to_system_patterns(rows: Iterable[sqlite3.Row]) -> Iterator[models.SystemPattern]:
     """
-    Safely parse tags from database, handling both JSON arrays and comma-separated strings.
-    
-    Handles:
-    - None/empty: returns None
-    - JSON array: '["tag1", "tag2"]' -> ["tag1", "tag2"]
-    - Comma-separated: 'tag1,tag2' -> ["tag1", "tag2"]
-    - Empty JSON array: '[]' -> []
+    Builds SystemPattern objects from system_patterns rows.
+
+    Uses model_construct: these values were validated when they were written, so
+    re-running Pydantic validation on every read is skipped.
     """
-    if not tags_value:
-        return None
-        
-    # Try JSON parsing first (proper format)
-    try:
-        parsed = json.loads(tags_value)
-        if isinstance(parsed, list):
-            return parsed
-        # If it's not a list, fall through to comma-separated handling
-    except (json.JSONDecodeError, ValueError):
-        pass
-    
-    # Handle legacy comma-separated format
-    if isinstance(tags_value, str):
-        # Split by comma and strip whitespace
-        tags = [tag.strip() for tag in tags_value.split(',') if tag.strip()]
-        return tags if tags else None
-        
-    return None
+    construct = models.SystemPattern.model_construct
+    return (
+        construct(
+            id=row['id'],
+            timestamp=row['timestamp'],
+            name=row['name'],
+            description=row['description'],
+            tags=parse_tags(row['tags'])
+        ) for row in rows
+    )
 
 def log_system_pattern(workspace_id: str, pattern_data: models.SystemPattern) -> models.SystemPattern:
     """Logs or updates a system pattern. Uses atomic INSERT ON CONFLICT to preserve IDs and links."""
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None # Initialize cursor for finally block
-    
-    tags_json = json.dumps(pattern_data.tags) if pattern_data.tags is not None else None
-    
-    # Use atomic INSERT ... ON CONFLICT to avoid race conditions
-    # Same name = UPDATE (preserves ID and links)
-    # New name = INSERT new record (old record stays intact with links)
-    sql = """
-        INSERT INTO system_patterns (timestamp, name, description, tags)
-        VALUES (?, ?, ?, ?)
-        ON CONFLICT(name) DO UPDATE SET
-            timestamp = excluded.timestamp,
-            description = excluded.description,
-            tags = excluded.tags
-        RETURNING id
+    return log_system_patterns_many(workspace_id, [pattern_data])[0]
+
+def log_system_patterns_many(workspace_id: str, patterns: List[models.SystemPattern]) -> List[models.SystemPattern]:
+    """
+    Logs or updates several system patterns in a single transaction (one commit instead
+    of one per pattern). Each pattern gets its `id` set as in `log_system_pattern`;
+    if any pattern fails, none are written.
     """
-    
+    if not patterns:
+        return patterns
+
+    # Tags are stored in canonical form; the returned patterns carry the same form
+    tags = [canonical_tags(p.tags) for p in patterns]
+    rows = [
+        (
+            p.timestamp,
+            p.name,
+            p.description,
+            encode_canonical_tags(pattern_tags)
+        ) for p, pattern_tags in zip(patterns, tags)
+    ]
+
+    current = patterns[0]
+    ids: List[Optional[int]] = []
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql, (
-            pattern_data.timestamp,
-            pattern_data.name,
-            pattern_data.description,
-            tags_json
-        ))
-        
-        # Get the ID from the RETURNING clause
-        row = cursor.fetchone()
-        if row:
-            pattern_data.id = row['id']
-        
-        conn.commit()
-        return pattern_data
+        with get_connection_pool(workspace_id).transaction() as conn:
+            with _sql.cursor(conn) as cur:
+                # executemany cannot return the RETURNING rows, so execute per pattern
+                # inside the one transaction; the statement is prepared once and cached.
+                for current, params in zip(patterns, rows):
+                    cur.execute(_UPSERT_SYSTEM_PATTERN_SQL, params)
+                    # Get the ID from the RETURNING clause
+                    row = cur.fetchone()
+                    ids.append(row['id'] if row else None)
     except sqlite3.Error as e:
-        conn.rollback()
-        raise DatabaseError(f"Failed to log system pattern '{pattern_data.name}': {e}")
-    finally:
-        if cursor:
-            cursor.close()
+        raise DatabaseError(f"Failed to log system pattern '{current.name}': {e}")
+
+    # Only hand out ids once the transaction has committed
+    for pattern, pattern_id, pattern_tags in zip(patterns, ids, tags):
+        if pattern_id is not None:
+            pattern.id = pattern_id
+            pattern.tags = pattern_tags
+    return patterns
+
+def _system_patterns_query(
+    tags_filter_include_all: Optional[List[str]],
+    tags_filter_include_any: Optional[List[str]]
+) -> Tuple[str, List[Any]]:
+    """Builds the get_system_patterns SELECT and its parameters."""
+    order_by_clause = " ORDER BY name ASC"
+    # limit_clause = ""
+    # if limit is not None and limit > 0:
+    #     limit_clause = " LIMIT ?"
+    #     params_list.append(limit)
+
+    # Tag filters run inside SQLite (system_pattern_tags side table) rather than over every decoded row.
+    conditions, params_list = tag_filter_conditions(
+        "system_pattern_tags", "pattern_id", "system_patterns.id",
+        tags_filter_include_all, tags_filter_include_any
+    )
+
+    sql = _SELECT_SYSTEM_PATTERNS_SQL
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    return sql + order_by_clause, params_list # + limit_clause
+
+def get_system_patterns_iter(
+    workspace_id: str,
+    tags_filter_include_all: Optional[List[str]] = None,
+    tags_filter_include_any: Optional[List[str]] = None
+    # limit: Optional[int] = None, # Add if pagination is desired
+) -> Iterator[models.SystemPattern]:
+    """Lazily yields system patterns; see `get_system_patterns`. Rows are fetched from SQLite in batches."""
+    sql, params_list = _system_patterns_query(tags_filter_include_all, tags_filter_include_any)
+
+    with get_connection_pool(workspace_id).reader() as conn:
+        try:
+            with _sql.cursor(conn, sql, params_list) as cur:
+                yield from _rows_to_system_patterns(_sql.iter_rows(cur))
+        except (sqlite3.Error, json.JSONDecodeError) as e: # Added JSONDecodeError
+            raise DatabaseError(f"Failed to retrieve system patterns: {e}")
 
 def get_system_patterns(
     workspace_id: str,
@@ -88,105 +154,52 @@ def get_system_patterns(
     # limit: Optional[int] = None, # Add if pagination is desired
 ) -> List[models.SystemPattern]:
     """Retrieves system patterns, optionally filtered by tags."""
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None # Initialize cursor for finally block
-    
-    base_sql = "SELECT id, timestamp, name, description, tags FROM system_patterns"
-    order_by_clause = " ORDER BY name ASC"
-    # params_list: List[Any] = [] # Not used for SQL filtering of tags for now
-    # limit_clause = ""
-    # if limit is not None and limit > 0:
-    #     limit_clause = " LIMIT ?"
-    #     params_list.append(limit)
-
-    sql = base_sql + order_by_clause # + limit_clause
-    # params_tuple = tuple(params_list)
+    return list(get_system_patterns_iter(workspace_id, tags_filter_include_all, tags_filter_include_any))
 
-    try:
-        cursor = conn.cursor()
-        cursor.execute(sql) #, params_tuple)
-        rows = cursor.fetchall()
-        patterns = [
-            models.SystemPattern(
-                id=row['id'],
-                timestamp=row['timestamp'],
-                name=row['name'],
-                description=row['description'],
-                tags=_parse_tags_safely(row['tags'])
-            ) for row in rows
-        ]
-
-        # Python-based filtering for tags
-        if tags_filter_include_all:
-            patterns = [
-                p for p in patterns if p.tags and all(tag in p.tags for tag in tags_filter_include_all)
-            ]
-        
-        if tags_filter_include_any:
-            patterns = [
-                p for p in patterns if p.tags and any(tag in p.tags for tag in tags_filter_include_any)
-            ]
+def get_system_patterns_json(
+    workspace_id: str,
+    tags_filter_include_all: Optional[List[str]] = None,
+    tags_filter_include_any: Optional[List[str]] = None
+) -> str:
+    """
+    Same as `get_system_patterns`, but SQLite builds the result as a JSON array text
+    (matching `SystemPattern.model_dump(mode='json')` per item), skipping Python row
+    and model construction.
+    """
+    sql, params_list = _system_patterns_query(tags_filter_include_all, tags_filter_include_any)
+    sql = f"{_SYSTEM_PATTERNS_JSON_SELECT}({sql})"
 
-        return patterns
-    except (sqlite3.Error, json.JSONDecodeError) as e: # Added JSONDecodeError
-        raise DatabaseError(f"Failed to retrieve system patterns: {e}")
-    finally:
-        if cursor:
-            cursor.close()
+    with get_connection_pool(workspace_id).reader() as conn:
+        try:
+            with _sql.cursor(conn, sql, params_list) as cur:
+                return cur.fetchone()[0]
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Failed to retrieve system patterns: {e}")
 
 def delete_system_pattern_by_id(workspace_id: str, pattern_id: int) -> bool:
     """Deletes a system pattern by its ID. Returns True if deleted, False otherwise."""
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None # Initialize cursor for finally block
-    sql = "DELETE FROM system_patterns WHERE id = ?"
     # Note: System patterns do not currently have an FTS table, so no trigger concerns here.
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql, (pattern_id,))
-        conn.commit()
-        return cursor.rowcount > 0
+        with get_connection_pool(workspace_id).transaction() as conn:
+            with _sql.cursor(conn, _DELETE_SYSTEM_PATTERN_SQL, (pattern_id,)) as cur:
+                deleted = cur.rowcount > 0
+            return deleted
     except sqlite3.Error as e:
-        conn.rollback()
         raise DatabaseError(f"Failed to delete system pattern with ID {pattern_id}: {e}")
-    finally:
-        if cursor:
-            cursor.close()
 
 def search_system_patterns_fts(workspace_id: str, query_term: str, limit: Optional[int] = 10) -> List[models.SystemPattern]:
     """Searches system patterns using FTS5 for the given query term."""
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None # Initialize cursor for finally block
-    sql = """
-        SELECT sp.id, sp.timestamp, sp.name, sp.description, sp.tags
-        FROM system_patterns_fts f
-        JOIN system_patterns sp ON f.rowid = sp.id
-        WHERE f.system_patterns_fts MATCH ? ORDER BY rank
-    """
-    params_list = [query_term]
+    with get_connection_pool(workspace_id).reader() as conn:
+        sql = _SEARCH_SYSTEM_PATTERNS_FTS_SQL
+        params_list = [query_term]
 
-    if limit is not None and limit > 0:
-        sql += " LIMIT ?"
-        params_list.append(limit)
+        if limit is not None and limit > 0:
+            sql += " LIMIT ?"
+            params_list.append(limit)
 
-    try:
-        cursor = conn.cursor()
-        cursor.execute(sql, tuple(params_list))
-        rows = cursor.fetchall()
-        patterns = [
-            models.SystemPattern(
-                id=row['id'],
-                timestamp=row['timestamp'],
-                name=row['name'],
-                description=row['description'],
-                tags=_parse_tags_safely(row['tags'])
-            ) for row in rows
-        ]
-        return patterns
-    except sqlite3.Error as e:
-        raise DatabaseError(f"Failed FTS search on system patterns for term '{query_term}': {e}")
-    finally:
-        if cursor:
-            cursor.close()
\ No newline at end of file
+        try:
+            rows = _sql.fetch_fts(conn, sql, params_list)
+            patterns = list(_rows_to_system_patterns(rows))
+            return patterns
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Failed FTS search on system patterns for term '{query_term}': {e}")
\ No newline at end of file
@@ -2,40 +2,129 @@
 
 import sqlite3
 from datetime import datetime
-from typing import List, Optional
+from itertools import product
+from typing import Iterable, Iterator, List, Optional
 
 from ..core.exceptions import DatabaseError
+from . import _sql
+# database.py defines get_connection_pool before it imports this module for re-export
+from .database import get_connection_pool
 from . import models
 
+# SQL is kept in module-level constants so every call passes the same statement text
+# and hits the connection's prepared-statement cache (see _CACHED_STATEMENTS).
+_INSERT_PROGRESS_SQL = """
+    INSERT INTO progress_entries (timestamp, status, description, parent_id)
+    VALUES (?, ?, ?, ?)
+    RETURNING id
+"""
+
+_SELECT_PROGRESS_SQL = "SELECT id, timestamp, status, description, parent_id FROM progress_entries"
+
+def _build_get_progress_sql(by_status: bool, by_parent: bool, limited: bool) -> str:
+    """Builds the get_progress statement for one combination of filters (newest first)."""
+    conditions = []
+    if by_status:
+        conditions.append("status = ?")
+    if by_parent:
+        conditions.append("parent_id = ?")
+    # Add more filters if needed (e.g., date range)
+
+    sql = _SELECT_PROGRESS_SQL
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY timestamp DESC" # Default order: newest first
+    if limited:
+        sql += " LIMIT ?"
+    return sql
+
+# (filter by status, filter by parent_id, limited) -> statement; parameters follow that order
+_GET_PROGRESS_SQL = {
+    flags: _build_get_progress_sql(*flags) for flags in product((False, True), repeat=3)
+}
+
+# One statement shape for every combination of updated fields: each odd parameter
+# flags whether the following value replaces the column.
+_UPDATE_PROGRESS_SQL = """
+    UPDATE progress_entries
+    SET status = CASE WHEN ?1 THEN ?2 ELSE status END,
+        description = CASE WHEN ?3 THEN ?4 ELSE description END,
+        parent_id = CASE WHEN ?5 THEN ?6 ELSE parent_id END
+    WHERE id = ?7
+"""
+
+_DELETE_PROGRESS_SQL = "DELETE FROM progress_entries WHERE id = ?"
+
+# has limit -> SELECT for search_progress_fts. The MATCH, ranking and LIMIT run on
+# the FTS table alone, where FTS5 sorts by its `rank` column internally and keeps
+# only the top rows; rank is configured as bm25 weighting description over status.
+# Only the surviving rowids are then joined to progress_entries.
+_SEARCH_PROGRESS_FTS_SQL = {
+    limited: f"""
+    SELECT p.id, p.timestamp, p.status, p.description, p.parent_id
+    FROM (
+        SELECT rowid, rank FROM progress_entries_fts
+        WHERE progress_entries_fts MATCH ? AND rank MATCH 'bm25(1.0, 5.0)'
+        ORDER BY rank{" LIMIT ?" if limited else ""}
+    ) f
+    JOIN progress_entries p ON p.id = f.rowid
+    ORDER BY f.rank
+"""
+    for limited in (False, True)
+}
+
+def _rows_to_progress_entries(rows: Iterable[sqlite3.Row]) -> Iterator[models.ProgressEntry]:
+    """
+    Builds ProgressEntry objects from progress_entries rows.
+
+    Uses model_construct: these values were validated when they were written, so
+    re-running Pydantic validation on every read is skipped.
+    """
+    construct = models.ProgressEntry.model_construct
+    return (
+        construct(
+            id=row['id'],
+            timestamp=row['timestamp'],
+            status=row['status'],
+            description=row['description'],
+            parent_id=row['parent_id']
+        ) for row in rows
+    )
+
 def log_progress(workspace_id: str, progress_data: models.ProgressEntry) -> models.ProgressEntry:
     """Logs a new progress entry."""
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None # Initialize cursor for finally block
-    sql = """
-        INSERT INTO progress_entries (timestamp, status, description, parent_id)
-        VALUES (?, ?, ?, ?)
+    return log_progress_many(workspace_id, [progress_data])[0]
+
+def log_progress_many(workspace_id: str, entries: List[models.ProgressEntry]) -> List[models.ProgressEntry]:
     """
-    params = (
-        progress_data.timestamp,
-        progress_data.status,
-        progress_data.description,
-        progress_data.parent_id
-    )
+    Logs several progress entries in a single transaction (one commit instead of one
+    per entry). Each entry gets its new `id` set; if any insert fails, none are written.
+    """
+    if not entries:
+        return entries
+
+    rows = [
+        (
+            entry.timestamp,
+            entry.status,
+            entry.description,
+            entry.parent_id
+        ) for entry in entries
+    ]
+
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql, params)
-        progress_id = cursor.lastrowid
-        conn.commit()
-        progress_data.id = progress_id
-        return progress_data
+        with get_connection_pool(workspace_id).transaction() as conn, _sql.cursor(conn) as cur:
+            # executemany cannot return the RETURNING rows, so execute per entry
+            # inside the one transaction; the statement is prepared once and cached.
+            ids = [cur.execute(_INSERT_PROGRESS_SQL, params).fetchone()[0] for params in rows]
     except sqlite3.Error as e:
-        conn.rollback()
         # Consider checking for foreign key constraint errors if parent_id is invalid
         raise DatabaseError(f"Failed to log progress entry: {e}")
-    finally:
-        if cursor:
-            cursor.close()
+
+    # Only hand out ids once the transaction has committed
+    for entry, entry_id in zip(entries, ids):
+        entry.id = entry_id
+    return entries
 
 def get_progress(
     workspace_id: str,
@@ -44,101 +133,60 @@ def get_progress(
     limit: Optional[int] = None
 ) -> List[models.ProgressEntry]:
     """Retrieves progress entries, optionally filtered and limited."""
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None # Initialize cursor for finally block
-    sql = "SELECT id, timestamp, status, description, parent_id FROM progress_entries"
-    conditions = []
-    params_list = []
+    by_status = bool(status_filter)
+    by_parent = parent_id_filter is not None # Check for None explicitly as 0 could be a valid parent_id
+    limited = limit is not None and limit > 0
+    sql = _GET_PROGRESS_SQL[by_status, by_parent, limited]
 
-    if status_filter:
-        conditions.append("status = ?")
+    params_list = []
+    if by_status:
         params_list.append(status_filter)
-    if parent_id_filter is not None: # Check for None explicitly as 0 could be a valid parent_id
-        conditions.append("parent_id = ?")
+    if by_parent:
         params_list.append(parent_id_filter)
-    # Add more filters if needed (e.g., date range)
-
-    if conditions:
-        sql += " WHERE " + " AND ".join(conditions)
-
-    sql += " ORDER BY timestamp DESC" # Default order: newest first
-
-    if limit is not None and limit > 0:
-        sql += " LIMIT ?"
+    if limited:
         params_list.append(limit)
-
     params = tuple(params_list)
 
-    try:
-        cursor = conn.cursor()
-        cursor.execute(sql, params)
-        rows = cursor.fetchall()
-        progress_entries = [
-            models.ProgressEntry(
-                id=row['id'],
-                timestamp=row['timestamp'],
-                status=row['status'],
-                description=row['description'],
-                parent_id=row['parent_id']
-            ) for row in rows
-        ]
-        # progress_entries.reverse() # Optional: uncomment to return oldest first
-        return progress_entries
-    except sqlite3.Error as e:
-        raise DatabaseError(f"Failed to retrieve progress entries: {e}")
-    finally:
-        if cursor:
-            cursor.close()
+    with get_connection_pool(workspace_id).reader() as conn:
+        try:
+            # Rows are consumed straight from the cursor as SQLite steps through them
+            progress_entries = list(_rows_to_progress_entries(conn.execute(sql, params)))
+            # progress_entries.reverse() # Optional: uncomment to return oldest first
+            return progress_entries
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Failed to retrieve progress entries: {e}")
 
 def update_progress_entry(workspace_id: str, update_args: models.UpdateProgressArgs) -> bool:
     """
     Updates an existing progress entry by its ID.
     Returns True if the entry was found and updated, False otherwise.
     """
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None # Initialize cursor for finally block
-    
-    sql = "UPDATE progress_entries SET"
-    updates = []
-    params_list: List[any] = []
-
-    if update_args.status is not None:
-        updates.append("status = ?")
-        params_list.append(update_args.status)
-    if update_args.description is not None:
-        updates.append("description = ?")
-        params_list.append(update_args.description)
+    update_status = update_args.status is not None
+    update_description = update_args.description is not None
     # Handle parent_id update, including setting to NULL if explicitly None is intended (though Pydantic allows Optional[int])
     # If parent_id is provided as 0 or a positive int, update it.
     # If parent_id is provided as None, set the DB column to NULL.
     # If parent_id is NOT provided in args (remains default None), do not include in update.
     # The Pydantic model check_at_least_one_field ensures at least one field is provided,
-    # so we don't need to worry about an empty updates list here.
-    if 'parent_id' in update_args.model_fields_set: # Check if parent_id was explicitly set in the input args
-         updates.append("parent_id = ?")
-         params_list.append(update_args.parent_id) # SQLite handles Python None as NULL
+    # so we don't need to worry about an empty update here.
+    update_parent = 'parent_id' in update_args.model_fields_set # Check if parent_id was explicitly set in the input args
 
-    if not updates:
+    if not (update_status or update_description or update_parent):
          # This case should be prevented by Pydantic model validation, but as a safeguard
          raise ValueError("No fields provided for update.")
 
-    sql += " " + ", ".join(updates) + " WHERE id = ?"
-    params_list.append(update_args.progress_id)
-    params = tuple(params_list)
+    params = (
+        update_status, update_args.status,
+        update_description, update_args.description,
+        update_parent, update_args.parent_id, # SQLite handles Python None as NULL
+        update_args.progress_id
+    )
 
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql, params)
-        conn.commit()
-        return cursor.rowcount > 0 # Return True if one row was updated
+        with get_connection_pool(workspace_id).transaction() as conn:
+            return conn.execute(_UPDATE_PROGRESS_SQL, params).rowcount > 0 # Return True if one row was updated
     except sqlite3.Error as e:
-        conn.rollback()
         raise DatabaseError(f"Failed to update progress entry with ID {update_args.progress_id}: {e}")
-    finally:
-        if cursor:
-            cursor.close()
 
 def delete_progress_entry_by_id(workspace_id: str, progress_id: int) -> bool:
     """
@@ -146,55 +194,24 @@ def delete_progress_entry_by_id(workspace_id: str, progress_id: int) -> bool:
     Note: This will also set the parent_id of any child tasks to NULL due to FOREIGN KEY ON DELETE SET NULL.
     Returns True if deleted, False otherwise.
     """
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None # Initialize cursor for finally block
-    sql = "DELETE FROM progress_entries WHERE id = ?"
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql, (progress_id,))
-        conn.commit()
-        return cursor.rowcount > 0 # Return True if one row was deleted
+        with get_connection_pool(workspace_id).transaction() as conn:
+            return conn.execute(_DELETE_PROGRESS_SQL, (progress_id,)).rowcount > 0 # Return True if one row was deleted
     except sqlite3.Error as e:
-        conn.rollback()
         raise DatabaseError(f"Failed to delete progress entry with ID {progress_id}: {e}")
-    finally:
-        if cursor:
-            cursor.close()
 
 def search_progress_fts(workspace_id: str, query_term: str, limit: Optional[int] = 10) -> List[models.ProgressEntry]:
     """Searches progress entries using FTS5 for the given query term."""
-    from .database import get_db_connection
-    conn = get_db_connection(workspace_id)
-    cursor = None # Initialize cursor for finally block
-    sql = """
-        SELECT p.id, p.timestamp, p.status, p.description, p.parent_id
-        FROM progress_entries_fts f
-        JOIN progress_entries p ON f.rowid = p.id
-        WHERE f.progress_entries_fts MATCH ? ORDER BY rank
-    """
     params_list = [query_term]
 
-    if limit is not None and limit > 0:
-        sql += " LIMIT ?"
+    limited = limit is not None and limit > 0
+    if limited:
         params_list.append(limit)
 
-    try:
-        cursor = conn.cursor()
-        cursor.execute(sql, tuple(params_list))
-        rows = cursor.fetchall()
-        progress_entries = [
-            models.ProgressEntry(
-                id=row['id'],
-                timestamp=row['timestamp'],
-                status=row['status'],
-                description=row['description'],
-                parent_id=row['parent_id']
-            ) for row in rows
-        ]
-        return progress_entries
-    except sqlite3.Error as e:
-        raise DatabaseError(f"Failed FTS search on progress entries for term '{query_term}': {e}")
-    finally:
-        if cursor:
-            cursor.close()
\ No newline at end of file
+    with get_connection_pool(workspace_id).reader() as conn:
+        try:
+            rows = _sql.fetch_fts(conn, _SEARCH_PROGRESS_FTS_SQL[limited], params_list)
+            progress_entries = list(_rows_to_progress_entries(rows))
+            return progress_entries
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Failed FTS search on progress entries for term '{query_term}': {e}")
\ No newline at end of file
@@ -1,50 +1,147 @@
 """Aggregated reporting and reference retrieval helpers for ConPort DB.
 
 Note:
-- All DB access is performed through database.py via local imports inside functions
-  to avoid circular imports and to keep a single connection orchestration point.
+- All DB access goes through database.py's connection pool, the single connection
+  orchestration point.
 """
 
-from typing import Dict, Any, Optional, List
+from typing import Callable, Dict, Any, Mapping, Optional, List
 from datetime import datetime, timedelta, timezone
 import sqlite3
-import json
 import logging
 
-from . import models
+from . import models, _json, _sql
+from ._tags import parse_tags, tags_json_sql
 from ..core.exceptions import DatabaseError
+# database.py defines get_connection_pool before it imports this module for re-export
+from .database import get_connection_pool
 
-def _parse_tags_safely(tags_value: str) -> Optional[List[str]]:
-    """
-    Safely parse tags from database, handling both JSON arrays and comma-separated strings.
-    
-    Handles:
-    - None/empty: returns None
-    - JSON array: '["tag1", "tag2"]' -> ["tag1", "tag2"]
-    - Comma-separated: 'tag1,tag2' -> ["tag1", "tag2"]
-    - Empty JSON array: '[]' -> []
-    """
-    if not tags_value:
-        return None
-        
-    # Try JSON parsing first (proper format)
+log = logging.getLogger(__name__)
+
+# Row -> dict helpers. Each returns the same dict as the matching model's
+# model_dump(mode='json'), built directly: stored rows were validated when they were
+# written, so re-validating them through Pydantic just to serialize them is skipped.
+# `row` is any mapping of column name to value (sqlite3.Row or dict); its timestamp is
+# already the JSON string, selected as `_TIMESTAMP_JSON_SQL AS timestamp`.
+
+def _decision_row_to_dict(row: Mapping[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": row["id"], "timestamp": row["timestamp"], "summary": row["summary"],
+        "rationale": row["rationale"], "implementation_details": row["implementation_details"],
+        "tags": parse_tags(row["tags"]),
+    }
+
+def _progress_row_to_dict(row: Mapping[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": row["id"], "timestamp": row["timestamp"], "status": row["status"],
+        "description": row["description"], "parent_id": row["parent_id"],
+    }
+
+def _system_pattern_row_to_dict(row: Mapping[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": row["id"], "timestamp": row["timestamp"], "name": row["name"],
+        "description": row["description"], "tags": parse_tags(row["tags"]),
+    }
+
+def _custom_data_row_to_dict(row: Mapping[str, Any]) -> Dict[str, Any]:
     try:
-        parsed = json.loads(tags_value)
-        if isinstance(parsed, list):
-            return parsed
-        # If it's not a list, fall through to comma-separated handling
-    except (json.JSONDecodeError, ValueError):
-        pass
-    
-    # Handle legacy comma-separated format
-    if isinstance(tags_value, str):
-        # Split by comma and strip whitespace
-        tags = [tag.strip() for tag in tags_value.split(',') if tag.strip()]
-        return tags if tags else None
-        
-    return None
+        value = _json.loads(row["value"])
+    except _json.JSONDecodeError:
+        value = row["value"]
+    return {
+        "id": row["id"], "timestamp": row["timestamp"], "category": row["category"],
+        "key": row["key"], "value": value,
+    }
 
-log = logging.getLogger(__name__)
+def _context_row_to_dict(row: Mapping[str, Any]) -> Dict[str, Any]:
+    try:
+        content = _json.loads(row["content"])
+    except _json.JSONDecodeError:
+        content = {}
+    return {"id": row["id"], "content": content}
+
+# Stored timestamps rendered by SQLite exactly as Pydantic writes them to JSON, so
+# report rows skip the datetime parse (converter) and isoformat() round trip
+_TIMESTAMP_JSON_SQL = _sql.json_timestamp("timestamp")
+
+# SQL is kept in module-level constants so every call passes the same statement text
+# and hits the connection's prepared-statement cache (see _CACHED_STATEMENTS).
+
+# Recent-activity report: for each (result key, table, JSON fields), the rows at or after
+# :since, newest first, at most :limit of them. SQLite aggregates each arm into one JSON
+# array shaped like the models' model_dump(mode='json'); the six arrays come back as the
+# columns of a single row, so the whole report is one fetchone() and one decode per arm.
+_CONTEXT_HISTORY_JSON_FIELDS = (
+    ("id", "id"), ("timestamp", _TIMESTAMP_JSON_SQL), ("version", "version"),
+    ("content", "json(content)"), ("change_source", "change_source"),
+)
+_RECENT_ACTIVITY_ARMS = (
+    ("recent_decisions", "decisions", (
+        ("id", "id"), ("timestamp", _TIMESTAMP_JSON_SQL), ("summary", "summary"),
+        ("rationale", "rationale"), ("implementation_details", "implementation_details"),
+        ("tags", tags_json_sql("tags")),
+    )),
+    ("recent_progress_entries", "progress_entries", (
+        ("id", "id"), ("timestamp", _TIMESTAMP_JSON_SQL), ("status", "status"),
+        ("description", "description"), ("parent_id", "parent_id"),
+    )),
+    ("recent_product_context_updates", "product_context_history", _CONTEXT_HISTORY_JSON_FIELDS),
+    ("recent_active_context_updates", "active_context_history", _CONTEXT_HISTORY_JSON_FIELDS),
+    ("recent_links_created", "context_links", (
+        ("id", "id"), ("timestamp", _TIMESTAMP_JSON_SQL),
+        ("source_item_type", "source_item_type"), ("source_item_id", "source_item_id"),
+        ("target_item_type", "target_item_type"), ("target_item_id", "target_item_id"),
+        ("relationship_type", "relationship_type"), ("description", "description"),
+    )),
+    ("recent_system_patterns", "system_patterns", (
+        ("id", "id"), ("timestamp", _TIMESTAMP_JSON_SQL), ("name", "name"),
+        ("description", "description"), ("tags", tags_json_sql("tags")),
+    )),
+)
+
+def _build_recent_activity_sql() -> str:
+    """Builds the single-row statement for `_RECENT_ACTIVITY_ARMS` (one JSON array column per arm)."""
+    arms = []
+    for key, table, fields in _RECENT_ACTIVITY_ARMS:
+        json_fields = ", ".join(f"'{name}', {expr}" for name, expr in fields)
+        arms.append(
+            f"(SELECT json_group_array(json_object({json_fields})) FROM "
+            f"(SELECT * FROM {table} WHERE timestamp >= :since ORDER BY timestamp DESC LIMIT :limit)) AS {key}"
+        )
+    return "SELECT " + ", ".join(arms)
+
+_RECENT_ACTIVITY_SQL = _build_recent_activity_sql()
+# Result keys, in the statement's column order
+_RECENT_ACTIVITY_KEYS = tuple(key for key, _, _ in _RECENT_ACTIVITY_ARMS)
+
+# Lookups used by get_items_by_references. The *_BY_IDS statements take every wanted
+# id as one JSON array parameter, so a single cached statement serves any number of ids.
+_DECISIONS_BY_IDS_SQL = (
+    f"SELECT id, {_TIMESTAMP_JSON_SQL} AS timestamp, summary, rationale, implementation_details, tags FROM decisions "
+    "WHERE id IN (SELECT value FROM json_each(?))"
+)
+_PROGRESS_BY_IDS_SQL = (
+    f"SELECT id, {_TIMESTAMP_JSON_SQL} AS timestamp, status, description, parent_id FROM progress_entries "
+    "WHERE id IN (SELECT value FROM json_each(?))"
+)
+_SYSTEM_PATTERNS_BY_IDS_SQL = (
+    f"SELECT id, {_TIMESTAMP_JSON_SQL} AS timestamp, name, description, tags FROM system_patterns "
+    "WHERE id IN (SELECT value FROM json_each(?))"
+)
+_CUSTOM_DATA_BY_IDS_SQL = (
+    f"SELECT id, {_TIMESTAMP_JSON_SQL} AS timestamp, category, key, value FROM custom_data "
+    "WHERE id IN (SELECT value FROM json_each(?))"
+)
+_PRODUCT_CONTEXT_SQL = "SELECT id, content FROM product_context WHERE id = 1"
+_ACTIVE_CONTEXT_SQL = "SELECT id, content FROM active_context WHERE id = 1"
+_CUSTOM_DATA_BY_CATEGORY_KEY_SQL = (
+    f"SELECT id, {_TIMESTAMP_JSON_SQL} AS timestamp, category, key, value FROM custom_data "
+    "WHERE category = ? AND key = ? ORDER BY custom_data.timestamp DESC LIMIT 1"
+)
+_CUSTOM_DATA_BY_KEY_SQL = (
+    f"SELECT id, {_TIMESTAMP_JSON_SQL} AS timestamp, category, key, value FROM custom_data "
+    "WHERE key = ? ORDER BY custom_data.timestamp DESC LIMIT 1"
+)
 
 
 def get_recent_activity_summary_data(
@@ -56,11 +153,6 @@ def get_recent_activity_summary_data(
     """
     Retrieves a summary of recent activity across various ConPort items.
     """
-    # Import locally to avoid circular import at module load
-    from .database import get_db_connection
-
-    conn = get_db_connection(workspace_id)
-    cursor: Optional[sqlite3.Cursor] = None
     summary_results: Dict[str, Any] = {
         "recent_decisions": [],
         "recent_progress_entries": [],
@@ -83,116 +175,17 @@ def get_recent_activity_summary_data(
 
     summary_results["summary_period_start"] = start_datetime.isoformat()
 
-    try:
-        cursor = conn.cursor()
-
-        # Recent Decisions
-        cursor.execute(
-            """
-            SELECT id, timestamp, summary, rationale, implementation_details, tags
-            FROM decisions WHERE timestamp >= ? ORDER BY timestamp DESC LIMIT ?
-            """,
-            (start_datetime, limit_per_type)
-        )
-        rows = cursor.fetchall()
-        summary_results["recent_decisions"] = [
-            models.Decision(
-                id=row['id'], timestamp=row['timestamp'], summary=row['summary'],
-                rationale=row['rationale'], implementation_details=row['implementation_details'],
-                tags=_parse_tags_safely(row['tags'])
-            ).model_dump(mode='json') for row in rows
-        ]
-
-        # Recent Progress Entries
-        cursor.execute(
-            """
-            SELECT id, timestamp, status, description, parent_id
-            FROM progress_entries WHERE timestamp >= ? ORDER BY timestamp DESC LIMIT ?
-            """,
-            (start_datetime, limit_per_type)
-        )
-        rows = cursor.fetchall()
-        summary_results["recent_progress_entries"] = [
-            models.ProgressEntry(
-                id=row['id'], timestamp=row['timestamp'], status=row['status'],
-                description=row['description'], parent_id=row['parent_id']
-            ).model_dump(mode='json') for row in rows
-        ]
-
-        # Recent Product Context Updates (from history)
-        cursor.execute(
-            """
-            SELECT id, timestamp, version, content, change_source
-            FROM product_context_history WHERE timestamp >= ? ORDER BY timestamp DESC LIMIT ?
-            """,
-            (start_datetime, limit_per_type)
-        )
-        rows = cursor.fetchall()
-        summary_results["recent_product_context_updates"] = [
-            models.ProductContextHistory(
-                id=row['id'], timestamp=row['timestamp'], version=row['version'],
-                content=json.loads(row['content']), change_source=row['change_source']
-            ).model_dump(mode='json') for row in rows
-        ]
-
-        # Recent Active Context Updates (from history)
-        cursor.execute(
-            """
-            SELECT id, timestamp, version, content, change_source
-            FROM active_context_history WHERE timestamp >= ? ORDER BY timestamp DESC LIMIT ?
-            """,
-            (start_datetime, limit_per_type)
-        )
-        rows = cursor.fetchall()
-        summary_results["recent_active_context_updates"] = [
-            models.ActiveContextHistory(
-                id=row['id'], timestamp=row['timestamp'], version=row['version'],
-                content=json.loads(row['content']), change_source=row['change_source']
-            ).model_dump(mode='json') for row in rows
-        ]
-
-        # Recent Links Created
-        cursor.execute(
-            """
-            SELECT id, timestamp, source_item_type, source_item_id, target_item_type, target_item_id, relationship_type, description
-            FROM context_links WHERE timestamp >= ? ORDER BY timestamp DESC LIMIT ?
-            """,
-            (start_datetime, limit_per_type)
-        )
-        rows = cursor.fetchall()
-        summary_results["recent_links_created"] = [
-            models.ContextLink(
-                id=row['id'], timestamp=row['timestamp'], source_item_type=row['source_item_type'],
-                source_item_id=row['source_item_id'], target_item_type=row['target_item_type'],
-                target_item_id=row['target_item_id'], relationship_type=row['relationship_type'],
-                description=row['description']
-            ).model_dump(mode='json') for row in rows
-        ]
-
-        # Recent System Patterns
-        cursor.execute(
-            """
-            SELECT id, timestamp, name, description, tags
-            FROM system_patterns WHERE timestamp >= ? ORDER BY timestamp DESC LIMIT ?
-            """,
-            (start_datetime, limit_per_type)
-        )
-        rows = cursor.fetchall()
-        summary_results["recent_system_patterns"] = [
-            models.SystemPattern(
-                id=row['id'], timestamp=row['timestamp'], name=row['name'],
-                description=row['description'], tags=_parse_tags_safely(row['tags'])
-            ).model_dump(mode='json') for row in rows
-        ]
+    with get_connection_pool(workspace_id).reader() as conn:
+        try:
+            row = conn.execute(_RECENT_ACTIVITY_SQL, {"since": start_datetime, "limit": limit_per_type}).fetchone()
+            for key, items_json in zip(_RECENT_ACTIVITY_KEYS, row):
+                summary_results[key] = _json.loads(items_json)
 
-        return summary_results
+            return summary_results
 
-    except (sqlite3.Error, json.JSONDecodeError) as e:
-        log.error(f"Failed to retrieve recent activity summary: {e}", exc_info=True)
-        raise DatabaseError(f"Failed to retrieve recent activity summary: {e}")
-    finally:
-        if cursor:
-            cursor.close()
+        except (sqlite3.Error, _json.JSONDecodeError) as e:
+            log.error(f"Failed to retrieve recent activity summary: {e}", exc_info=True)
+            raise DatabaseError(f"Failed to retrieve recent activity summary: {e}")
 
 
 def get_items_by_references(
@@ -255,41 +248,58 @@ def get_items_by_references(
     if (references is None) == (linked_items_result is None):
         raise ValueError("Provide either 'references' or 'linked_items_result', not both or neither")
     
-    # Import locally to avoid circular import at module load
-    from .database import get_db_connection
-    
-    conn = get_db_connection(workspace_id)
-    cursor: Optional[sqlite3.Cursor] = None
     results: List[Dict[str, Any]] = []
     
-    try:
-        cursor = conn.cursor()
-        
-        # Method 2: Parse linked_items_result to extract references
-        if linked_items_result is not None:
-            references = _extract_references_from_links(linked_items_result)
-            log.debug(f"Extracted {len(references)} references from linked_items_result: {references}")
+    with get_connection_pool(workspace_id).reader() as conn, _sql.cursor(conn) as cursor:
+        try:
+            # Method 2: Parse linked_items_result to extract references
+            if linked_items_result is not None:
+                references = _extract_references_from_links(linked_items_result)
+                log.debug(f"Extracted {len(references)} references from linked_items_result: {references}")
         
-        # Process references with deduplication
-        seen_refs = set()
-        for ref in references or []:
-            if not ref or not hasattr(ref, 'type') or not hasattr(ref, 'id'):
-                continue
-                
-            # Create reference dict for consistent structure
-            ref_dict = {"type": ref.type, "id": ref.id}
-            ref_key = (ref.type.lower(), str(ref.id))
-            
-            # Skip duplicates
-            if ref_key in seen_refs:
-                continue
-            seen_refs.add(ref_key)
+            # Deduplicate, then look the items up with one query per item type
+            unique_refs: List[models.ItemReference] = []
+            refs_by_type: Dict[str, List[models.ItemReference]] = {}
+            seen_refs = set()
+            for ref in references or []:
+                if not isinstance(ref, models.ItemReference):
+                    continue
+
+                ref_key = ref.key
             
-            # Retrieve item with comprehensive error handling
-            try:
-                item_data = _retrieve_single_item(cursor, ref.type, ref.id)
-                
-                if item_data is not None:
+                # Skip duplicates
+                if ref_key in seen_refs:
+                    continue
+                seen_refs.add(ref_key)
+                unique_refs.append(ref)
+                refs_by_type.setdefault(ref_key[0], []).append(ref)
+
+            # (type, id) -> item dict, None (not found) or the exception raised looking it up
+            found: Dict[Any, Any] = {}
+            for item_type_lower, refs in refs_by_type.items():
+                try:
+                    items = _retrieve_items_of_type(cursor, item_type_lower, refs)
+                except sqlite3.Error as e:
+                    items = {ref.id: e for ref in refs}
+                for ref in refs:
+                    found[ref.key] = items.get(ref.id)
+
+            # Emit results in the order the references were given
+            for ref in unique_refs:
+                # Create reference dict for consistent structure
+                ref_dict = {"type": ref.type, "id": ref.id}
+                item_data = found[ref.key]
+
+                if isinstance(item_data, Exception):
+                    # Database error retrieving specific item
+                    results.append({
+                        "reference": ref_dict,
+                        "success": False,
+                        "item": None,
+                        "error": f"Database error retrieving {ref.type} ID {ref.id}: {item_data}"
+                    })
+                    log.warning(f"Error retrieving {ref.type} ID {ref.id}: {item_data}")
+                elif item_data is not None:
                     results.append({
                         "reference": ref_dict,
                         "success": True,
@@ -304,26 +314,13 @@ def get_items_by_references(
                         "item": None,
                         "error": _format_not_found_error(ref.type, ref.id)
                     })
-                    
-            except Exception as e:
-                # Database error retrieving specific item
-                results.append({
-                    "reference": ref_dict,
-                    "success": False,
-                    "item": None,
-                    "error": f"Database error retrieving {ref.type} ID {ref.id}: {e}"
-                })
-                log.warning(f"Error retrieving {ref.type} ID {ref.id}: {e}")
         
-        log.info(f"Retrieved {len(results)} items by references ({len([r for r in results if r['success']])} successful)")
-        return results
+            log.info(f"Retrieved {len(results)} items by references ({len([r for r in results if r['success']])} successful)")
+            return results
         
-    except sqlite3.Error as e:
-        log.error(f"SQLite error in get_items_by_references: {e}", exc_info=True)
-        raise DatabaseError(f"Database error in get_items_by_references: {e}")
-    finally:
-        if cursor:
-            cursor.close()
+        except sqlite3.Error as e:
+            log.error(f"SQLite error in get_items_by_references: {e}", exc_info=True)
+            raise DatabaseError(f"Database error in get_items_by_references: {e}")
 
 
 def _extract_references_from_links(linked_items_result: List[Dict[str, Any]]) -> List[models.ItemReference]:
@@ -342,10 +339,9 @@ def _extract_references_from_links(linked_items_result: List[Dict[str, Any]]) ->
                 type=link['source_item_type'],
                 id=link['source_item_id']
             )
-            source_key = (source_ref.type.lower(), str(source_ref.id))
-            if source_key not in seen:
+            if source_ref.key not in seen:
                 references.append(source_ref)
-                seen.add(source_key)
+                seen.add(source_ref.key)
         
         # Extract target item reference
         if link.get('target_item_type') and link.get('target_item_id'):
@@ -353,156 +349,137 @@ def _extract_references_from_links(linked_items_result: List[Dict[str, Any]]) ->
                 type=link['target_item_type'],
                 id=link['target_item_id']
             )
-            target_key = (target_ref.type.lower(), str(target_ref.id))
-            if target_key not in seen:
+            if target_ref.key not in seen:
                 references.append(target_ref)
-                seen.add(target_key)
+                seen.add(target_ref.key)
     
     return references
 
 
-def _retrieve_single_item(cursor: sqlite3.Cursor, item_type: str, item_id: str) -> Optional[Dict[str, Any]]:
+def _retrieve_items_of_type(
+    cursor: sqlite3.Cursor,
+    item_type_lower: str,
+    refs: List[models.ItemReference]
+) -> Dict[str, Any]:
     """
-    Retrieves a single item by type and ID with robust error handling.
-    
-    Returns None if item not found, raises exception for database errors.
+    Retrieves the items of one type for the given references.
+
+    Returns a dict of ref id -> item dict, None if the item was not found, or the
+    exception (invalid ID format, unsupported type) that prevented its lookup.
+    Database errors are raised.
     """
-    item_type_lower = item_type.lower()
-    
-    try:
-        if item_type_lower == "decision":
-            decision_id = int(item_id)
-            cursor.execute(
-                "SELECT id, timestamp, summary, rationale, implementation_details, tags FROM decisions WHERE id = ?",
-                (decision_id,)
-            )
-            row = cursor.fetchone()
-            if row:
-                return models.Decision(
-                    id=row["id"], timestamp=row["timestamp"], summary=row["summary"],
-                    rationale=row["rationale"], implementation_details=row["implementation_details"],
-                    tags=_parse_tags_safely(row["tags"])
-                ).model_dump(mode="json")
-                
-        elif item_type_lower == "progress_entry":
-            progress_id = int(item_id)
-            cursor.execute(
-                "SELECT id, timestamp, status, description, parent_id FROM progress_entries WHERE id = ?",
-                (progress_id,)
-            )
-            row = cursor.fetchone()
-            if row:
-                return models.ProgressEntry(
-                    id=row["id"], timestamp=row["timestamp"], status=row["status"],
-                    description=row["description"], parent_id=row["parent_id"]
-                ).model_dump(mode="json")
-                
-        elif item_type_lower == "system_pattern":
-            pattern_id = int(item_id)
-            cursor.execute(
-                "SELECT id, timestamp, name, description, tags FROM system_patterns WHERE id = ?",
-                (pattern_id,)
-            )
-            row = cursor.fetchone()
-            if row:
-                return models.SystemPattern(
-                    id=row["id"], timestamp=row["timestamp"], name=row["name"],
-                    description=row["description"], tags=_parse_tags_safely(row["tags"])
-                ).model_dump(mode="json")
-                
-        elif item_type_lower == "custom_data":
-            return _retrieve_custom_data_item(cursor, item_id)
-            
-        elif item_type_lower == "product_context":
-            cursor.execute("SELECT id, content FROM product_context WHERE id = 1")
-            row = cursor.fetchone()
-            if row:
-                try:
-                    content_dict = json.loads(row["content"])
-                except json.JSONDecodeError:
-                    content_dict = {}
-                return models.ProductContext(id=row["id"], content=content_dict).model_dump(mode="json")
-                
-        elif item_type_lower == "active_context":
-            cursor.execute("SELECT id, content FROM active_context WHERE id = 1")
-            row = cursor.fetchone()
-            if row:
-                try:
-                    content_dict = json.loads(row["content"])
-                except json.JSONDecodeError:
-                    content_dict = {}
-                return models.ActiveContext(id=row["id"], content=content_dict).model_dump(mode="json")
-        
-        else:
-            raise ValueError(f"Unsupported item type: {item_type}")
-            
-    except ValueError as e:
-        # Re-raise validation errors (invalid ID format, unsupported type)
-        raise e
-    except sqlite3.Error as e:
-        # Re-raise database errors
-        raise e
-    except Exception as e:
-        # Convert other errors to database errors
-        raise sqlite3.Error(f"Unexpected error retrieving {item_type} {item_id}: {e}")
-    
-    return None
+    handler = _TYPE_HANDLERS.get(item_type_lower)
+    if handler is None:
+        return {ref.id: ValueError(f"Unsupported item type: {ref.type}") for ref in refs}
+    return handler(cursor, [ref.id for ref in refs])
+
+
+def _retrieve_decisions(cursor: sqlite3.Cursor, item_ids: List[str]) -> Dict[str, Any]:
+    return _retrieve_rows_by_ids(cursor, _DECISIONS_BY_IDS_SQL, _decision_row_to_dict, item_ids)
+
+
+def _retrieve_progress_entries(cursor: sqlite3.Cursor, item_ids: List[str]) -> Dict[str, Any]:
+    return _retrieve_rows_by_ids(cursor, _PROGRESS_BY_IDS_SQL, _progress_row_to_dict, item_ids)
+
+
+def _retrieve_system_patterns(cursor: sqlite3.Cursor, item_ids: List[str]) -> Dict[str, Any]:
+    return _retrieve_rows_by_ids(cursor, _SYSTEM_PATTERNS_BY_IDS_SQL, _system_pattern_row_to_dict, item_ids)
+
+
+def _retrieve_custom_data(cursor: sqlite3.Cursor, item_ids: List[str]) -> Dict[str, Any]:
+    # Numeric IDs are looked up together; key-based forms are resolved one by one
+    numeric_ids = [item_id for item_id in item_ids if item_id.isdigit()]
+    items = _retrieve_rows_by_ids(cursor, _CUSTOM_DATA_BY_IDS_SQL, _custom_data_row_to_dict, numeric_ids)
+    for item_id in item_ids:
+        if not item_id.isdigit():
+            items[item_id] = _retrieve_custom_data_item(cursor, item_id)
+    return items
+
+
+def _retrieve_context_row(cursor: sqlite3.Cursor, sql: str, item_ids: List[str]) -> Dict[str, Any]:
+    # Single-row tables: every reference resolves to the one row, whatever its ID
+    cursor.execute(sql)
+    row = cursor.fetchone()
+    item = _context_row_to_dict(row) if row else None
+    return {item_id: item for item_id in item_ids}
+
+
+def _retrieve_product_context(cursor: sqlite3.Cursor, item_ids: List[str]) -> Dict[str, Any]:
+    return _retrieve_context_row(cursor, _PRODUCT_CONTEXT_SQL, item_ids)
+
+
+def _retrieve_active_context(cursor: sqlite3.Cursor, item_ids: List[str]) -> Dict[str, Any]:
+    return _retrieve_context_row(cursor, _ACTIVE_CONTEXT_SQL, item_ids)
+
+
+# Lowercased item type -> batch lookup: (cursor, ref ids) -> {ref id: item dict | None | exception}
+_TYPE_HANDLERS: Dict[str, Callable[[sqlite3.Cursor, List[str]], Dict[str, Any]]] = {
+    "decision": _retrieve_decisions,
+    "progress_entry": _retrieve_progress_entries,
+    "system_pattern": _retrieve_system_patterns,
+    "custom_data": _retrieve_custom_data,
+    "product_context": _retrieve_product_context,
+    "active_context": _retrieve_active_context,
+}
+
+
+def _retrieve_rows_by_ids(
+    cursor: sqlite3.Cursor,
+    sql: str,
+    row_to_dict: Callable[[sqlite3.Row], Dict[str, Any]],
+    item_ids: List[str]
+) -> Dict[str, Any]:
+    """
+    Runs one of the *_BY_IDS statements for the given string IDs.
+
+    Returns a dict of ID -> item dict, None if no row has that ID, or the ValueError
+    for an ID that is not an integer.
+    """
+    results: Dict[str, Any] = {}
+    wanted: Dict[str, int] = {}
+    for item_id in item_ids:
+        try:
+            wanted[item_id] = int(item_id)
+        except ValueError as e:
+            results[item_id] = e
+
+    if wanted:
+        cursor.execute(sql, (_json.dumps(list(set(wanted.values()))),))
+        by_id = {row["id"]: row_to_dict(row) for row in cursor}
+        for item_id, row_id in wanted.items():
+            results[item_id] = by_id.get(row_id)
+    return results
 
 
 def _retrieve_custom_data_item(cursor: sqlite3.Cursor, item_id: str) -> Optional[Dict[str, Any]]:
     """
-    Retrieves custom_data item with flexible ID matching.
+    Retrieves a custom_data item by a key-based (non-numeric) ID; numeric IDs are
+    looked up in batches by `_retrieve_items_of_type`.
     
     Supports:
-    - Numeric ID: "123"
     - Category::Key format: "ProjectGlossary::term1"
     - Category/Key format: "config/setting"
     - Key-only fallback: "setting" -> latest entry with that key
     """
-    row = None
+    # Try structured formats
+    category = None
+    key_part = None
     
-    # Try numeric ID first
-    if item_id.isdigit():
-        cursor.execute(
-            "SELECT id, timestamp, category, key, value FROM custom_data WHERE id = ?",
-            (int(item_id),)
-        )
-        row = cursor.fetchone()
+    if "::" in item_id:
+        category, key_part = item_id.split("::", 1)
+    elif "/" in item_id:
+        category, key_part = item_id.split("/", 1)
+    
+    if category and key_part:
+        # Category and key specified
+        cursor.execute(_CUSTOM_DATA_BY_CATEGORY_KEY_SQL, (category, key_part))
     else:
-        # Try structured formats
-        category = None
-        key_part = None
-        
-        if "::" in item_id:
-            category, key_part = item_id.split("::", 1)
-        elif "/" in item_id:
-            category, key_part = item_id.split("/", 1)
-        
-        if category and key_part:
-            # Category and key specified
-            cursor.execute(
-                "SELECT id, timestamp, category, key, value FROM custom_data WHERE category = ? AND key = ? ORDER BY timestamp DESC LIMIT 1",
-                (category, key_part)
-            )
-            row = cursor.fetchone()
-        else:
-            # Fallback: search by key only (latest)
-            cursor.execute(
-                "SELECT id, timestamp, category, key, value FROM custom_data WHERE key = ? ORDER BY timestamp DESC LIMIT 1",
-                (item_id,)
-            )
-            row = cursor.fetchone()
+        # Fallback: search by key only (latest)
+        cursor.execute(_CUSTOM_DATA_BY_KEY_SQL, (item_id,))
+    row = cursor.fetchone()
     
     if row:
-        try:
-            value_data = json.loads(row["value"])
-        except json.JSONDecodeError:
-            value_data = row["value"]
-        
-        return models.CustomData(
-            id=row["id"], timestamp=row["timestamp"], category=row["category"],
-            key=row["key"], value=value_data
-        ).model_dump(mode="json")
+        return _custom_data_row_to_dict(row)
     
     return None
 
@@ -0,0 +1,67 @@
+"""Small sqlite3 helpers shared by the CRUD submodules."""
+
+import sqlite3
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Sequence, Any
+
+
+@contextmanager
+def cursor(
+    conn: sqlite3.Connection,
+    sql: Optional[str] = None,
+    params: Sequence[Any] = ()
+) -> Iterator[sqlite3.Cursor]:
+    """
+    Yields a cursor that is closed on exit.
+
+    With `sql`, the statement is executed first (`conn.execute(sql, params)`);
+    without it, a bare cursor is yielded for multi-statement work.
+    """
+    cur = conn.cursor() if sql is None else conn.execute(sql, params)
+    try:
+        yield cur
+    finally:
+        cur.close()
+
+
+# Rows are pulled from SQLite in batches of this size by the lazy readers
+FETCH_BATCH_SIZE = 500
+
+
+def iter_rows(cur: sqlite3.Cursor, batch_size: int = FETCH_BATCH_SIZE) -> Iterator[sqlite3.Row]:
+    """Yields a cursor's remaining rows, fetching them `batch_size` at a time."""
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def fts_phrase(query_term: str) -> str:
+    """Quotes `query_term` as one FTS5 string, so none of its characters are read as query syntax."""
+    return '"' + query_term.replace('"', '""') + '"'
+
+
+def fetch_fts(conn: sqlite3.Connection, sql: str, params: Sequence[Any]) -> List[sqlite3.Row]:
+    """
+    Runs an FTS5 MATCH query whose first parameter is the user's search term and
+    returns all rows. Valid FTS5 syntax (prefix*, OR, column:term, ...) is honoured;
+    if FTS5 rejects the term (e.g. 'c++' or 'what?'), it is retried as a literal phrase.
+    """
+    try:
+        with cursor(conn, sql, params) as cur:
+            return cur.fetchall()
+    except sqlite3.OperationalError as e:
+        message = str(e)
+        if not (message.startswith("fts5:") or message.startswith("no such column")):
+            raise
+    with cursor(conn, sql, [fts_phrase(params[0]), *params[1:]]) as cur:
+        return cur.fetchall()
+
+
+def json_timestamp(column: str) -> str:
+    """
+    SQL rendering a stored timestamp column as Pydantic serializes a UTC datetime
+    to JSON ('2025-01-01T12:00:00Z'), for use inside json_object(...).
+    """
+    return f"strftime('%Y-%m-%dT%H:%M:%SZ', {column})"
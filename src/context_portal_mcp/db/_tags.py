@@ -0,0 +1,173 @@
+"""Helpers for the `tags` column shared by decisions and system patterns.
+
+Tags are stored as a canonical JSON array of strings (see `encode_tags`). Older
+rows may still hold the legacy comma-separated form ('tag1, tag2'), which the
+readers accept too.
+"""
+
+import sys
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+
+from . import _json
+
+
+# Stored tag values shorter than this are decoded through the `_decode_tags_cached` LRU cache
+_CACHED_TAGS_MAX_LEN = 256
+
+
+def parse_tags(tags_value: Optional[str]) -> Optional[List[str]]:
+    """
+    Parses a stored tags value, handling both JSON arrays and comma-separated strings.
+
+    Handles:
+    - None/empty: returns None
+    - JSON array: '["tag1", "tag2"]' -> ["tag1", "tag2"]
+    - Comma-separated: 'tag1,tag2' -> ["tag1", "tag2"]
+    - Empty JSON array: '[]' -> []
+
+    Each call returns a new list, so callers may mutate it.
+    """
+    if not tags_value:
+        return None
+    if len(tags_value) < _CACHED_TAGS_MAX_LEN:
+        tags = _decode_tags_cached(tags_value)
+        return None if tags is None else list(tags)
+    return _decode_tags(tags_value)
+
+
+@lru_cache(maxsize=8192)
+def _decode_tags_cached(tags_value: str) -> Optional[Tuple[Any, ...]]:
+    """
+    `_decode_tags` for short values, memoized. The tag vocabulary is small and the
+    same stored values repeat across rows, so decoded tags are kept as interned
+    strings and every row with that value shares the same str objects.
+    """
+    tags = _decode_tags(tags_value)
+    if tags is None:
+        return None
+    return tuple(sys.intern(tag) if type(tag) is str else tag for tag in tags)
+
+
+def _decode_tags(tags_value: str) -> Optional[List[Any]]:
+    """Decodes a non-empty stored tags value; see `parse_tags`."""
+    # Only values that look like a JSON array are worth handing to the decoder;
+    # anything else can only be the legacy comma-separated format. Stored values
+    # start with '[' directly, so lstrip() only runs for unusual leading blanks.
+    first = tags_value[0]
+    if first == "[" or (first.isspace() and tags_value.lstrip()[:1] == "["):
+        try:
+            parsed = _json.loads(tags_value)
+        except ValueError:
+            parsed = None
+        if isinstance(parsed, list):
+            return parsed
+
+    # Handle legacy comma-separated format: split by comma and strip whitespace
+    return [tag for tag in map(str.strip, tags_value.split(',')) if tag] or None
+
+
+# Stored form of an empty tag list; written without invoking the JSON encoder
+_EMPTY_TAGS_JSON = "[]"
+
+
+def canonical_tags(tags: Optional[List[str]]) -> Optional[List[str]]:
+    """
+    Returns tags in their stored (canonical) form: stripped, de-duplicated and sorted,
+    so equal tag sets are always stored the same way. None stays None.
+    """
+    if tags is None:
+        return None
+    if not tags:
+        return []
+    cleaned = {tag.strip() for tag in tags if tag}
+    cleaned.discard("")
+    return sorted(cleaned)
+
+
+def encode_canonical_tags(tags: Optional[List[str]]) -> Optional[str]:
+    """Encodes a list already returned by `canonical_tags` for storage. None stays NULL."""
+    if tags is None:
+        return None
+    return _json.dumps(tags) if tags else _EMPTY_TAGS_JSON
+
+
+def encode_tags(tags: Optional[List[str]]) -> Optional[str]:
+    """Encodes tags for storage as canonical JSON (see `canonical_tags`). None stays NULL."""
+    return encode_canonical_tags(canonical_tags(tags))
+
+
+def _tags_array_sql(column: str) -> str:
+    """
+    SQL expression yielding `column` as a JSON array.
+
+    JSON arrays pass through unchanged; anything else is treated as legacy
+    comma-separated text and rewritten into an array of its (untrimmed) parts,
+    escaping the characters JSON does not allow raw in a string. (The same
+    expression is used by the tag side-table triggers.)
+    """
+    legacy = (
+        f"'[\"' || replace(replace(replace(replace(replace(replace({column}, "
+        "char(92), char(92) || char(92)), char(34), char(92) || char(34)), "
+        "char(9), char(92) || 't'), char(10), char(92) || 'n'), "
+        "char(13), char(92) || 'r'), ',', '\",\"') || '\"]'"
+    )
+    return (
+        f"CASE WHEN NOT json_valid({column}) THEN {legacy} "
+        f"WHEN json_type({column}) = 'array' THEN {column} "
+        f"ELSE {legacy} END"
+    )
+
+
+def tags_json_sql(column: str) -> str:
+    """
+    SQL expression yielding what `parse_tags` returns for `column`, as JSON (or
+    NULL), for embedding in json_object(...).
+    """
+    trimmed = "trim(value, ' ' || char(9) || char(10) || char(13))"
+    return (
+        f"json(CASE WHEN {column} IS NULL OR {column} = '' THEN NULL "
+        f"WHEN json_valid({column}) AND json_type({column}) = 'array' THEN {column} "
+        f"ELSE (SELECT NULLIF(json_group_array({trimmed}), '[]') "
+        f"FROM json_each({_tags_array_sql(column)}) WHERE {trimmed} != '') END)"
+    )
+
+
+def tag_filter_conditions(
+    tag_table: str,
+    owner_column: str,
+    id_column: str,
+    include_all: Optional[List[str]] = None,
+    include_any: Optional[List[str]] = None
+) -> Tuple[List[str], List[Any]]:
+    """
+    Builds WHERE conditions (and their parameters) matching rows whose tags contain
+    every tag in `include_all` and at least one tag in `include_any`.
+
+    Tags are looked up in the trigger-maintained side table `tag_table`
+    (`owner_column`, tag), whose (tag, owner) index turns each filter into an
+    index seek; `id_column` is the filtered table's id. LIMIT therefore applies
+    to the filtered rows rather than to the raw table.
+    """
+    conditions: List[str] = []
+    params: List[Any] = []
+
+    if include_all:
+        wanted = list(dict.fromkeys(include_all))
+        placeholders = ", ".join("?" * len(wanted))
+        # (owner, tag) is the side table's primary key, so COUNT(*) counts distinct tags
+        conditions.append(
+            f"{id_column} IN (SELECT {owner_column} FROM {tag_table} "
+            f"WHERE tag IN ({placeholders}) GROUP BY {owner_column} HAVING COUNT(*) = ?)"
+        )
+        params.extend(wanted)
+        params.append(len(wanted))
+
+    if include_any:
+        placeholders = ", ".join("?" * len(include_any))
+        conditions.append(
+            f"{id_column} IN (SELECT {owner_column} FROM {tag_table} WHERE tag IN ({placeholders}))"
+        )
+        params.extend(include_any)
+
+    return conditions, params
@@ -3,8 +3,11 @@
 import sqlite3
 import json
 import os
+import queue
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Optional, Dict, Any, Tuple
+from typing import Iterator, List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta, timezone
 
 from alembic.config import Config
@@ -14,6 +17,7 @@ import logging
 from ..core.config import get_database_path
 from ..core.exceptions import DatabaseError, ConfigurationError
 from . import models # Import models from the same directory
+from . import _json
 import shutil # For copying directories
 import inspect
 
@@ -41,6 +45,8 @@ def _convert_datetime(b: bytes) -> datetime:
 sqlite3.register_adapter(datetime, _adapt_datetime)
 sqlite3.register_converter("DATETIME", _convert_datetime)
 sqlite3.register_converter("TIMESTAMP", _convert_datetime)
+# Columns selected as `col AS "col [JSON]"` come back already decoded (PARSE_COLNAMES)
+sqlite3.register_converter("JSON", _json.loads)
 
 # --- Alembic File Content Constants ---
 
@@ -377,11 +383,170 @@ def downgrade() -> None:
 """
  
 # Import templates from separate file to keep database.py manageable
-from .templates import LAUNCHER_PY_TEMPLATE, KILLER_PY_TEMPLATE, ADD_MISSING_FTS_TABLES_CONTENT, FTS_ROWID_CONFLICT_FIX_CONTENT, LINK_CLEANUP_TRIGGERS_CONTENT, FIX_CUSTOM_DATA_FTS_COLUMN_CONTENT
+from .templates import LAUNCHER_PY_TEMPLATE, KILLER_PY_TEMPLATE, ADD_MISSING_FTS_TABLES_CONTENT, FTS_ROWID_CONFLICT_FIX_CONTENT, LINK_CLEANUP_TRIGGERS_CONTENT, FIX_CUSTOM_DATA_FTS_COLUMN_CONTENT, ADD_CONTEXT_HISTORY_INDEXES_CONTENT, ADD_CONTEXT_LINK_INDEXES_CONTENT, ADD_TAG_SIDE_TABLES_CONTENT, NORMALIZE_LEGACY_TAGS_CONTENT, ADD_TIMESTAMP_INDEXES_CONTENT
  
 # --- Connection Handling ---
  
 _connections: Dict[str, sqlite3.Connection] = {}
+_pools: Dict[str, "ConnectionPool"] = {}
+_pools_lock = threading.Lock()
+
+# Per-connection tuning applied to the writer and every pooled reader:
+# keep sort/temp b-trees in memory, read the database file through mmap (256 MiB)
+# and allow a 64 MiB page cache (negative cache_size is in KiB).
+_PERFORMANCE_PRAGMAS = (
+    "PRAGMA temp_store=MEMORY;",
+    "PRAGMA mmap_size=268435456;",
+    "PRAGMA cache_size=-65536;",
+)
+
+# Per-connection prepared-statement cache size (sqlite3 default is 128). The CRUD
+# modules keep their SQL as module-level constants so repeat calls hit this cache.
+# The stdlib module prepares statements without SQLITE_PREPARE_PERSISTENT (it does
+# not expose sqlite3_prepare_v3 flags); cached statements are reused rather than
+# re-prepared, so the flag would only change where their memory is allocated.
+_CACHED_STATEMENTS = 256
+
+# Upper bound on idle read-only connections kept per workspace
+MAX_READ_CONNECTIONS = int(os.getenv("CONPORT_MAX_READ_CONNECTIONS", "4"))
+
+
+class ConnectionPool:
+    """
+    Per-workspace SQLite connections: the single read/write connection returned by
+    get_db_connection(), plus a bounded set of read-only connections.
+
+    WAL mode lets readers run alongside the writer, so read paths check out their
+    own connection instead of queueing behind writes. Writes are serialized on the
+    writer lock.
+
+    All connections are in autocommit mode (isolation_level=None). Writes go through
+    transaction(), which wraps them in BEGIN IMMEDIATE ... COMMIT; nested
+    transaction() blocks join the outermost one, so several writes can be grouped
+    into a single commit. While a thread has a transaction open, its reader()
+    checkouts get the writer, so reads inside the block see its uncommitted writes.
+    """
+
+    def __init__(self, db_path: Path, writer: sqlite3.Connection, max_readers: int = MAX_READ_CONNECTIONS):
+        self.db_path = db_path
+        self._writer = writer
+        self._writer_lock = threading.RLock()
+        self._readers: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=max(max_readers, 1))
+        self._closed = False
+        # Thread id of the transaction() holder, if a transaction is open
+        self._transaction_owner: Optional[int] = None
+
+    def _open_reader(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"{Path(self.db_path).as_uri()}?mode=ro",
+            uri=True,
+            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+            timeout=30.0,
+            check_same_thread=False,
+            cached_statements=_CACHED_STATEMENTS,
+            isolation_level=None,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA busy_timeout=30000;")
+        for pragma in _PERFORMANCE_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Check out the read/write connection (exclusive while held)."""
+        with self._writer_lock:
+            yield self._writer
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Check out the writer inside a write transaction: BEGIN IMMEDIATE on entry,
+        COMMIT on normal exit, ROLLBACK if an exception escapes. If the writer is
+        already in a transaction (an enclosing transaction() on this thread), the
+        block joins it and the outermost block commits or rolls back.
+        """
+        with self.writer() as conn:
+            if conn.in_transaction:
+                yield conn
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            self._transaction_owner = threading.get_ident()
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self._transaction_owner = None
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """
+        Check out a read-only connection, opening one if none is idle. Inside this
+        thread's transaction() the writer is yielded instead, so the block's own
+        uncommitted writes are visible.
+        """
+        if self._transaction_owner == threading.get_ident():
+            with self.writer() as conn:
+                yield conn
+            return
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = self._open_reader()
+        try:
+            yield conn
+        finally:
+            if self._closed:
+                conn.close()
+            else:
+                try:
+                    self._readers.put_nowait(conn)
+                except queue.Full:
+                    conn.close()
+
+    def close(self) -> None:
+        """Close the idle read-only connections. The writer is closed by close_db_connection."""
+        self._closed = True
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def get_connection_pool(workspace_id: str) -> ConnectionPool:
+    """Gets or creates the connection pool for the given workspace (initializing the workspace if needed)."""
+    pool = _pools.get(workspace_id)
+    if pool is not None:
+        return pool
+    conn = get_db_connection(workspace_id)
+    with _pools_lock:
+        pool = _pools.get(workspace_id)
+        if pool is None:
+            pool = ConnectionPool(get_database_path(workspace_id), conn)
+            _pools[workspace_id] = pool
+    return pool
+
+
+@contextmanager
+def transactional(workspace_id: str) -> Iterator[sqlite3.Connection]:
+    """
+    Groups several writes to a workspace into one transaction with a single commit:
+
+        with transactional(workspace_id):
+            log_progress(workspace_id, entry)
+            update_progress_entry(workspace_id, args)
+
+    Everything is rolled back if an exception escapes the block. Reads made inside the
+    block on the same thread go to the writer and see its uncommitted writes; other
+    threads and processes only see them after the commit. See ConnectionPool.transaction().
+    """
+    with get_connection_pool(workspace_id).transaction() as conn:
+        yield conn
+
  
 def get_db_connection(workspace_id: str) -> sqlite3.Connection:
     """
@@ -403,7 +568,11 @@ def get_db_connection(workspace_id: str) -> sqlite3.Connection:
 
     # 4. Establish and cache the database connection.
     try:
-        conn = sqlite3.connect(db_path, detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES, timeout=30.0)
+        # check_same_thread=False: the connection may be checked out via
+        # ConnectionPool.writer() from worker threads; access is serialized by its lock.
+        # isolation_level=None: autocommit. sqlite3 no longer wraps each statement in an
+        # implicit transaction; multi-statement writes open theirs with BEGIN IMMEDIATE.
+        conn = sqlite3.connect(db_path, detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES, timeout=30.0, check_same_thread=False, cached_statements=_CACHED_STATEMENTS, isolation_level=None)
         conn.row_factory = sqlite3.Row # Access columns by name
         
         # Enable WAL mode for concurrent access between MCP and HTTP servers
@@ -411,6 +580,8 @@ def get_db_connection(workspace_id: str) -> sqlite3.Connection:
         cursor.execute("PRAGMA journal_mode=WAL;")
         cursor.execute("PRAGMA busy_timeout=30000;")  # 30 second timeout for lock contention
         cursor.execute("PRAGMA synchronous=NORMAL;")  # Faster writes while maintaining safety
+        for pragma in _PERFORMANCE_PRAGMAS:
+            cursor.execute(pragma)
         conn.commit()
         log.info(f"Enabled WAL mode for concurrent database access: {db_path}")
         
@@ -425,7 +596,10 @@ def get_db_connection(workspace_id: str) -> sqlite3.Connection:
         raise DatabaseError(f"Failed to connect to database for {workspace_id} at {db_path}: {e}")
 
 def close_db_connection(workspace_id: str):
-    """Closes the database connection for the given workspace, if open."""
+    """Closes the database connection (and any pooled read connections) for the given workspace, if open."""
+    pool = _pools.pop(workspace_id, None)
+    if pool is not None:
+        pool.close()
     if workspace_id in _connections:
         _connections[workspace_id].close()
         del _connections[workspace_id]
@@ -537,6 +711,66 @@ def ensure_alembic_files_exist(workspace_id: str):
             log.error(f"Failed to create custom data FTS column fix migration at {fix_custom_data_fts_path}: {e}")
             raise DatabaseError(f"Could not create custom data FTS column fix migration: {e}")
 
+    # Check for context history version indexes migration
+    history_indexes_path = alembic_versions_path / "2025_11_01_add_context_history_indexes.py"
+    if not history_indexes_path.exists():
+        log.info(f"Context history indexes migration not found. Creating at {history_indexes_path}")
+        try:
+            os.makedirs(alembic_versions_path, exist_ok=True)
+            with open(history_indexes_path, 'w') as f:
+                f.write(ADD_CONTEXT_HISTORY_INDEXES_CONTENT)
+        except OSError as e:
+            log.error(f"Failed to create context history indexes migration at {history_indexes_path}: {e}")
+            raise DatabaseError(f"Could not create context history indexes migration: {e}")
+
+    # Check for context_links composite indexes migration
+    link_indexes_path = alembic_versions_path / "2025_11_08_add_context_link_indexes.py"
+    if not link_indexes_path.exists():
+        log.info(f"Context link indexes migration not found. Creating at {link_indexes_path}")
+        try:
+            os.makedirs(alembic_versions_path, exist_ok=True)
+            with open(link_indexes_path, 'w') as f:
+                f.write(ADD_CONTEXT_LINK_INDEXES_CONTENT)
+        except OSError as e:
+            log.error(f"Failed to create context link indexes migration at {link_indexes_path}: {e}")
+            raise DatabaseError(f"Could not create context link indexes migration: {e}")
+
+    # Check for decision/system pattern tag side tables migration
+    tag_tables_path = alembic_versions_path / "2025_11_15_add_tag_side_tables.py"
+    if not tag_tables_path.exists():
+        log.info(f"Tag side tables migration not found. Creating at {tag_tables_path}")
+        try:
+            os.makedirs(alembic_versions_path, exist_ok=True)
+            with open(tag_tables_path, 'w') as f:
+                f.write(ADD_TAG_SIDE_TABLES_CONTENT)
+        except OSError as e:
+            log.error(f"Failed to create tag side tables migration at {tag_tables_path}: {e}")
+            raise DatabaseError(f"Could not create tag side tables migration: {e}")
+
+    # Check for legacy tags normalization migration
+    normalize_tags_path = alembic_versions_path / "2025_11_22_normalize_legacy_tags.py"
+    if not normalize_tags_path.exists():
+        log.info(f"Legacy tags normalization migration not found. Creating at {normalize_tags_path}")
+        try:
+            os.makedirs(alembic_versions_path, exist_ok=True)
+            with open(normalize_tags_path, 'w') as f:
+                f.write(NORMALIZE_LEGACY_TAGS_CONTENT)
+        except OSError as e:
+            log.error(f"Failed to create legacy tags normalization migration at {normalize_tags_path}: {e}")
+            raise DatabaseError(f"Could not create legacy tags normalization migration: {e}")
+
+    # Check for timestamp indexes migration
+    timestamp_indexes_path = alembic_versions_path / "2025_11_29_add_timestamp_indexes.py"
+    if not timestamp_indexes_path.exists():
+        log.info(f"Timestamp indexes migration not found. Creating at {timestamp_indexes_path}")
+        try:
+            os.makedirs(alembic_versions_path, exist_ok=True)
+            with open(timestamp_indexes_path, 'w') as f:
+                f.write(ADD_TIMESTAMP_INDEXES_CONTENT)
+        except OSError as e:
+            log.error(f"Failed to create timestamp indexes migration at {timestamp_indexes_path}: {e}")
+            raise DatabaseError(f"Could not create timestamp indexes migration: {e}")
+
     # Ensure portal_launcher.py exists and is valid (not empty or corrupted)
     launcher_path = conport_db_dir / "portal_launcher.py"
     launcher_needs_creation = True
@@ -862,13 +1096,17 @@ from ._contexts import (
 )
 from ._decisions import (
     log_decision,
+    log_decisions_many,
     get_decisions,
+    get_decisions_iter,
+    get_decisions_json,
     search_decisions_fts,
     update_decision_by_id,
     delete_decision_by_id,
 )
 from ._progress import (
     log_progress,
+    log_progress_many,
     get_progress,
     update_progress_entry,
     delete_progress_entry_by_id,
@@ -876,22 +1114,31 @@ from ._progress import (
 )
 from ._patterns import (
     log_system_pattern,
+    log_system_patterns_many,
     get_system_patterns,
+    get_system_patterns_iter,
+    get_system_patterns_json,
     delete_system_pattern_by_id,
     search_system_patterns_fts,
 )
 from ._custom_data import (
     log_custom_data,
+    log_custom_data_many,
     get_custom_data,
+    get_custom_data_iter,
     get_custom_data_by_id,
     get_all_custom_data_by_id_desc,
+    get_all_custom_data_by_id_desc_iter,
     delete_custom_data,
+    delete_custom_data_many,
     search_project_glossary_fts,
     search_custom_data_value_fts,
 )
 from ._links import (
     log_context_link,
+    log_context_links_many,
     get_context_links,
+    get_context_links_json,
     update_context_link,
     delete_context_link_by_id,
 )
@@ -1,8 +1,9 @@
 """Pydantic models for data validation and structure, mirroring the database schema."""
 
 from pydantic import BaseModel, Field, Json, model_validator
-from typing import Optional, Dict, Any, List, Annotated, ClassVar, Set
+from typing import Optional, Dict, Any, List, Annotated, ClassVar, Set, Tuple
 from datetime import datetime, timezone
+from functools import cached_property
 
 # --- Base Models ---
 
@@ -526,6 +527,11 @@ class ItemReference(BaseModel):
     type: str = Field(..., description="Type of the item (e.g., 'decision', 'progress_entry', 'system_pattern', 'custom_data', 'product_context', 'active_context')")
     id: str = Field(..., description="ID of the item (string to accommodate custom_data keys)")
 
+    @cached_property
+    def key(self) -> Tuple[str, str]:
+        """(lowercased type, id): identifies the referenced item, for de-duplicating references."""
+        return (self.type.lower(), self.id)
+
 class GetItemsByReferencesArgs(BaseArgs):
     """Arguments for retrieving multiple items by type/id references."""
     references: Optional[List[ItemReference]] = Field(None, description="List of item type/id pairs to retrieve")
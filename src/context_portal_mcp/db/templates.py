@@ -7,6 +7,8 @@ to keep the main database.py file more manageable.
 # Template for auto-generated portal launcher script
 LAUNCHER_PY_TEMPLATE = """#!/usr/bin/env python3
 import argparse
+import functools
+import json
 import os
 import sys
 import subprocess
@@ -32,6 +34,18 @@ os.environ.setdefault("CONPORT_UI_ABS_DIR", AIMED_UI_PATH)
 # This ensures HTTP MCP server uses the same Python environment
 CENTRAL_PYTHON_PATH = r"{conport_python_path}"  # Will be populated by database.py when creating launcher
 
+# Central ConPort installation (the parent of the UI directory) and its UI port mapping file
+CENTRAL_CONPORT_PATH = os.path.dirname(os.path.normpath(AIMED_UI_PATH)) if AIMED_UI_PATH else None
+CENTRAL_MAPPING_FILE = (
+    os.path.join(CENTRAL_CONPORT_PATH, 'context_portal_aimed', 'ui-cache', 'port_workspace_mapping.json')
+    if CENTRAL_CONPORT_PATH else None
+)
+
+# Host platform facts; they cannot change while the launcher runs, so they are read once
+PLATFORM_SYSTEM = platform.system()
+IS_LINUX = PLATFORM_SYSTEM.lower() == "linux"
+IS_WSL = ("microsoft" in platform.uname().release.lower()) or bool(os.environ.get("WSL_DISTRO_NAME"))
+
 # stderr helper
 def eprint(*a, **k): print(*a, file=sys.stderr, **k)
 
@@ -43,14 +57,17 @@ def debug_print(message, level="INFO"):
 def debug_environment():
     \"\"\"Print environment debug information\"\"\"
     debug_print("=== DEBUG ENVIRONMENT ===", "DEBUG")
-    debug_print(f"Platform: {platform.system()} {platform.release()}", "DEBUG")
+    debug_print(f"Platform: {PLATFORM_SYSTEM} {platform.release()}", "DEBUG")
     debug_print(f"Python: {sys.executable}", "DEBUG")
     debug_print(f"Working Directory: {os.getcwd()}", "DEBUG")
-    debug_print(f"WSL Detection: {'microsoft' in platform.uname().release.lower()}", "DEBUG")
+    debug_print(f"WSL Detection: {IS_WSL}", "DEBUG")
     debug_print(f"WSL_DISTRO_NAME: {os.environ.get('WSL_DISTRO_NAME', 'Not set')}", "DEBUG")
     debug_print(f"AIMED_UI_PATH: {AIMED_UI_PATH}", "DEBUG")
     debug_print("=== END DEBUG ENVIRONMENT ===", "DEBUG")
 
+# allowedDevOrigins entry in next.config.ts, compiled once for update_next_config
+_ALLOWED_DEV_ORIGINS_RE = re.compile(r"allowedDevOrigins:\\s*\\[[^\\]]*\\]")
+
 def update_next_config(ui_dir_path: str, wsl_ip: Optional[str]):
     \"\"\"
     Ensures next.config.ts has the current WSL2 IP for CORS.
@@ -78,8 +95,7 @@ def update_next_config(ui_dir_path: str, wsl_ip: Optional[str]):
 
         # Has stale/different IP? Replace it
         if "allowedDevOrigins" in current_content:
-            updated_content = re.sub(
-                r"allowedDevOrigins:\\s*\\[[^\\]]*\\]",
+            updated_content = _ALLOWED_DEV_ORIGINS_RE.sub(
                 f"allowedDevOrigins: ['{wsl_ip}']",
                 current_content,
                 count=1
@@ -122,18 +138,58 @@ def workspace_root_from_here() -> str:
     here = os.path.abspath(os.path.dirname(__file__))
     return os.path.dirname(here)
 
-def is_port_open(host: str, port: int, timeout: float = 0.5) -> bool:
+def probe_port(host: str, port: int, timeout: float = 0.5) -> bool:
+    \"\"\"Connects to host:port and reports whether something is listening (uncached).\"\"\"
     with contextlib.closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as sock:
         sock.settimeout(timeout)
         return sock.connect_ex((host, port)) == 0
 
-def wait_for_port(host: str, port: int, timeout: float) -> bool:
-    deadline = time.time() + timeout
-    while time.time() < deadline:
-        if is_port_open(host, port):
+# is_port_open results are reused for 500 ms; the cache is cleared once it holds 64 entries
+_PORT_CACHE_TTL = 0.5
+_PORT_CACHE_MAX_ENTRIES = 64
+_port_cache = {}
+
+def is_port_open(host: str, port: int, timeout: float = 0.5) -> bool:
+    \"\"\"
+    probe_port, memoized for _PORT_CACHE_TTL seconds so the back-to-back checks of the
+    same port during startup share a single probe.
+    \"\"\"
+    key = (host, port)
+    now = time.monotonic()
+    hit = _port_cache.get(key)
+    if hit is not None and now - hit[0] < _PORT_CACHE_TTL:
+        return hit[1]
+    result = probe_port(host, port, timeout)
+    if len(_port_cache) >= _PORT_CACHE_MAX_ENTRIES:
+        _port_cache.clear()
+    _port_cache[key] = (now, result)
+    return result
+
+# Readiness polling: first retry after 10 ms, doubling up to 250 ms between probes
+POLL_INITIAL_DELAY = 0.01
+POLL_MAX_DELAY = 0.25
+
+def wait_until(probe, timeout: float) -> bool:
+    \"\"\"
+    Calls probe() until it returns True or `timeout` seconds have passed, backing off
+    exponentially between attempts. Uses the monotonic clock, so wall-clock
+    adjustments (NTP, sleep/resume) cannot stretch or cut short the wait.
+    \"\"\"
+    deadline = time.monotonic() + timeout
+    delay = POLL_INITIAL_DELAY
+    while True:
+        if probe():
             return True
-        time.sleep(0.5)
-    return is_port_open(host, port)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, POLL_MAX_DELAY)
+
+def wait_for_port(host: str, port: int, timeout: float) -> bool:
+    ready = wait_until(lambda: probe_port(host, port), timeout)
+    _port_cache.pop((host, port), None)
+    return ready
 
 def http_ping(url: str, timeout: float = 2.0) -> bool:
     try:
@@ -145,29 +201,73 @@ def http_ping(url: str, timeout: float = 2.0) -> bool:
         return False
 
 def wait_for_http(url: str, timeout: float) -> bool:
-    deadline = time.time() + timeout
-    while time.time() < deadline:
-        if http_ping(url):
-            return True
-        time.sleep(0.5)
-    return http_ping(url)
+    return wait_until(lambda: http_ping(url), timeout)
+
+def allocate_port(host: str) -> int:
+    \"\"\"Asks the OS for a free TCP port on the given host (bind to port 0).\"\"\"
+    with contextlib.closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, 0))
+        port = sock.getsockname()[1]
+    _port_cache.pop((host, port), None)
+    return port
 
-def find_free_port(host: str, start_port: int, max_tries: int = 50) -> int:
+def find_free_port(host: str, start_port: int) -> int:
     \"\"\"
-    Finds the next available TCP port on the given host, starting from start_port.
-    Returns the first free port found, or start_port + max_tries if none were free.
+    Returns start_port if nothing is listening on it, otherwise a free port
+    allocated by the OS (see allocate_port).
     \"\"\"
-    port = start_port
-    tries = 0
-    while tries < max_tries and is_port_open(host, port):
-        port += 1
-        tries += 1
-    return port
+    if not is_port_open(host, start_port):
+        return start_port
+    return allocate_port(host)
+
+@contextlib.contextmanager
+def file_lock(lock_path: str):
+    \"\"\"
+    Holds an exclusive lock on lock_path (created if missing) for the duration of the
+    block, so concurrent launchers serialize their read-modify-write of shared files.
+    \"\"\"
+    with open(lock_path, 'a+b') as lock_file:
+        if PLATFORM_SYSTEM == "Windows":
+            import msvcrt
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
 
+def atomic_write_json(path: str, data) -> None:
+    \"\"\"
+    Writes data as compact JSON to a temp file next to path, then swaps it into place
+    with os.replace, so readers never see a truncated or half-written file.
+    \"\"\"
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+@functools.lru_cache(maxsize=16)
 def resolve_ui_dir(workspace_root: str, ui_dir: str) -> str:
     \"\"\"
     Resolve UI directory path with fallback options.
     Order: 1) Central UI path 2) Environment override 3) Workspace-relative 4) Workspace detection 5) Package heuristic
+    Successful lookups are cached for the life of the launcher process.
     \"\"\"
     workspace_path = Path(workspace_root)
     
@@ -180,7 +280,7 @@ def resolve_ui_dir(workspace_root: str, ui_dir: str) -> str:
             parts = str(p).split("/")
             if parts[1] == "mnt" and len(parts) >= 3:
                 drive = parts[2].upper()
-                if platform.system() == "Windows":
+                if PLATFORM_SYSTEM == "Windows":
                     windows_path = f"{drive}:/" + "/".join(parts[3:])
                     p = Path(windows_path)
         
@@ -227,18 +327,19 @@ def resolve_ui_dir(workspace_root: str, ui_dir: str) -> str:
 
     raise FileNotFoundError(f"UI directory not found. Tried multiple locations for '{ui_dir}'.")
 
+@functools.lru_cache(maxsize=None)
 def detect_isolated_environment() -> bool:
     \"\"\"
     Detect if we're in an isolated environment where localhost binding
     won't be accessible from external systems (generic detection for WSL, Docker, etc.)
+    Computed once per launcher process.
     \"\"\"
-    if platform.system().lower() != "linux":
+    if not IS_LINUX:
         return False
     
     # Check for common virtualization indicators (not hardcoded to specific platforms)
     virtualization_indicators = [
-        ("microsoft" in platform.uname().release.lower()),  # WSL
-        bool(os.environ.get("WSL_DISTRO_NAME")),           # WSL env var
+        IS_WSL,                                             # WSL (kernel release or env var)
         os.path.exists("/.dockerenv"),                      # Docker
         bool(os.environ.get("CONTAINER")),                 # Generic container
         bool(os.environ.get("KUBERNETES_SERVICE_HOST")),   # Kubernetes
@@ -246,8 +347,9 @@ def detect_isolated_environment() -> bool:
     
     return any(virtualization_indicators)
 
+@functools.lru_cache(maxsize=1)
 def get_wsl_ip() -> Optional[str]:
-    \"\"\"Get WSL2 IP address for Windows host access\"\"\"
+    \"\"\"Get WSL2 IP address for Windows host access (looked up once per launcher process)\"\"\"
     try:
         # Get WSL2 IP from hostname command
         result = subprocess.run(['hostname', '-I'], capture_output=True, text=True)
@@ -274,7 +376,7 @@ def provide_access_instructions(effective_port: int, is_isolated: bool):
     debug_print(f"📍 Access from within this environment: http://localhost:{effective_port}/", "DEBUG")
     
     # Try to provide WSL2 IP for Windows host access
-    if ("microsoft" in platform.uname().release.lower()) or bool(os.environ.get("WSL_DISTRO_NAME")):
+    if IS_WSL:
         wsl_ip = get_wsl_ip()
         if wsl_ip:
             wsl_url = f"http://{wsl_ip}:{effective_port}/"
@@ -289,31 +391,40 @@ def provide_access_instructions(effective_port: int, is_isolated: bool):
     # For other isolated environments (Docker, etc.), use localhost
     return f"http://localhost:{effective_port}/"
 
+@functools.lru_cache(maxsize=1)
+def ui_cache():
+    \"\"\"
+    Returns the central ConPort installation's ui_cache module (env_vars.json helpers).
+    The installation is put on sys.path and the module imported on first use only;
+    later calls return the same module. Raises ImportError if it cannot be imported.
+    \"\"\"
+    central_conport_path = CENTRAL_CONPORT_PATH
+    if not central_conport_path:
+        raise ImportError("AIMED_UI_PATH is not configured")
+    if central_conport_path not in sys.path:
+        sys.path.insert(0, central_conport_path)
+    from src.context_portal_mcp.core import ui_cache as ui_cache_module
+    return ui_cache_module
+
 def get_workspace_mcp_port(workspace_root: str) -> Optional[int]:
     \"\"\"
     Get the cached MCP server port from consolidated env_vars.json.
     Returns None if no port is cached or if the cached port is no longer available.
     \"\"\"
     try:
-        # Import UI cache functions from the central ConPort installation
-        central_conport_path = AIMED_UI_PATH.replace('/ui', '') if AIMED_UI_PATH else None
-        if central_conport_path:
-            sys.path.insert(0, central_conport_path)
-            from src.context_portal_mcp.core.ui_cache import load_workspace_env_vars
-            
-            env_vars = load_workspace_env_vars(workspace_root)
-            cached_port = env_vars.get("mcp_server_port")
-            if cached_port and isinstance(cached_port, int):
-                # Use same host detection as main launcher for consistency
-                is_isolated = detect_isolated_environment()
-                host = "0.0.0.0" if is_isolated else "127.0.0.1"
-                # Verify the port is still available for reuse
-                if not is_port_open(host, cached_port):
-                    debug_print(f"Reusing cached MCP server port {cached_port} from env_vars.json", "CACHE")
-                    return cached_port
-                else:
-                    debug_print(f"Cached MCP server port {cached_port} is now busy, will find new port", "CACHE")
-            return None
+        env_vars = ui_cache().load_workspace_env_vars(workspace_root)
+        cached_port = env_vars.get("mcp_server_port")
+        if cached_port and isinstance(cached_port, int):
+            # Use same host detection as main launcher for consistency
+            is_isolated = detect_isolated_environment()
+            host = "0.0.0.0" if is_isolated else "127.0.0.1"
+            # Verify the port is still available for reuse
+            if not is_port_open(host, cached_port):
+                debug_print(f"Reusing cached MCP server port {cached_port} from env_vars.json", "CACHE")
+                return cached_port
+            else:
+                debug_print(f"Cached MCP server port {cached_port} is now busy, will find new port", "CACHE")
+        return None
     except Exception as e:
         debug_print(f"Failed to load cached MCP server port from env_vars.json: {e}", "WARNING")
         return None
@@ -324,15 +435,9 @@ def save_workspace_mcp_port(workspace_root: str, port: int) -> None:
     Legacy individual cache files are no longer created.
     \"\"\"
     try:
-        # Import UI cache functions from the central ConPort installation
-        central_conport_path = AIMED_UI_PATH.replace('/ui', '') if AIMED_UI_PATH else None
-        if central_conport_path:
-            sys.path.insert(0, central_conport_path)
-            from src.context_portal_mcp.core.ui_cache import update_workspace_env_var
-            
-            # ONLY update consolidated env_vars.json, no individual cache files
-            update_workspace_env_var(workspace_root, "mcp_server_port", port)
-            debug_print(f"Cached MCP server port {port} in consolidated env_vars.json", "CACHE")
+        # ONLY update consolidated env_vars.json, no individual cache files
+        ui_cache().update_workspace_env_var(workspace_root, "mcp_server_port", port)
+        debug_print(f"Cached MCP server port {port} in consolidated env_vars.json", "CACHE")
     except Exception as e:
         debug_print(f"Failed to cache MCP server port {port} in env_vars.json: {e}", "WARNING")
 
@@ -347,31 +452,17 @@ def find_workspace_specific_mcp_port(workspace_root: str, base_port: int = 8020)
     host = "0.0.0.0" if is_isolated else "127.0.0.1"
     debug_print(f"Port detection using host: {host} (isolated: {is_isolated})", "CACHE")
     
-    # Check if base port is available (preferred)
-    if not is_port_open(host, base_port):
-        available_port = base_port
+    # Base port is preferred; if it is busy the OS allocates a free one
+    available_port = find_free_port(host, base_port)
+    if available_port == base_port:
         debug_print(f"Base port {base_port} is available, using fresh start", "CACHE")
     else:
-        # Base port busy, find next available
-        available_port = find_free_port(host, base_port)
         debug_print(f"Base port {base_port} busy, allocated port {available_port}", "CACHE")
     
-    # IMMEDIATELY update cache with the port we're about to use
+    # IMMEDIATELY update consolidated env_vars.json with the port we're about to use,
+    # before the server starts, to prevent stale data CORS failures
     save_workspace_mcp_port(workspace_root, available_port)
     
-    # CRITICAL FIX: Immediately update consolidated env_vars.json with discovered port
-    try:
-        central_conport_path = AIMED_UI_PATH.replace('/ui', '') if AIMED_UI_PATH else None
-        if central_conport_path:
-            sys.path.insert(0, central_conport_path)
-            from src.context_portal_mcp.core.ui_cache import update_workspace_env_var
-            
-            # Update the MCP server port immediately to prevent stale data CORS failures
-            update_workspace_env_var(workspace_root, "mcp_server_port", available_port)
-            debug_print(f"Updated consolidated env_vars.json with MCP port {available_port}", "CACHE")
-    except Exception as e:
-        debug_print(f"Failed to update consolidated env_vars.json with MCP port {available_port}: {e}", "WARNING")
-    
     debug_print(f"Allocated MCP server port {available_port} for workspace {workspace_root}", "CACHE")
     return available_port
 
@@ -383,10 +474,8 @@ def open_browser(url: str) -> None:
     \"\"\"
     try:
         if sys.platform.startswith("linux"):
-            # Detect WSL
-            is_wsl_env = ("microsoft" in platform.uname().release.lower()) or bool(os.environ.get("WSL_DISTRO_NAME"))
             linux_cmds = []
-            if is_wsl_env:
+            if IS_WSL:
                 linux_cmds.extend([["wslview", url], ["powershell.exe", "-NoProfile", "Start-Process", url], ["cmd.exe", "/c", "start", "", url]])
             
             # Fall back to common Linux openers (excluding gio to avoid noisy stderr)
@@ -447,6 +536,8 @@ class Managed:
                     self.popen.kill()
         except Exception as ex:
             eprint(f"[launcher] terminate error for {self.name}: {ex}")
+        # The process's ports are (being) released, so earlier probe results are stale
+        _port_cache.clear()
 
 def start_conport(workspace_root: str, host: str, port: int, timeout: float) -> Tuple[Managed, int]:
     \"\"\"
@@ -521,25 +612,20 @@ def start_ui(
     
     # Cache the allocated UI port - ONLY in consolidated env_vars.json
     try:
-        central_conport_path = AIMED_UI_PATH.replace('/ui', '') if AIMED_UI_PATH else None
+        central_conport_path = CENTRAL_CONPORT_PATH
         if central_conport_path:
-            sys.path.insert(0, central_conport_path)
-            from src.context_portal_mcp.core.ui_cache import update_workspace_env_var
-            
             # ONLY update consolidated env_vars.json, no individual cache files
-            update_workspace_env_var(workspace_root, "ui_port", effective_port)
+            ui_cache().update_workspace_env_var(workspace_root, "ui_port", effective_port)
             debug_print(f"Updated consolidated env_vars.json with UI port {effective_port}", "CACHE")
             
             # CRITICAL: Register UI port in central mapping for API route
             try:
-                # Write directly to central mapping file (FIXED: proper template replacement detection)
-                central_mapping_file = AIMED_UI_PATH.replace('/ui', '/context_portal_aimed/ui-cache/port_workspace_mapping.json')
+                # Write directly to central mapping file
+                central_mapping_file = CENTRAL_MAPPING_FILE
                 
                 debug_print(f"[CENTRAL_MAPPING] Attempting to create central mapping file: {central_mapping_file}", "DEBUG")
                 
-                # FIXED: Proper condition to detect successful template replacement (platform-agnostic)
-                if central_mapping_file and os.path.isabs(central_mapping_file) and '{' not in central_mapping_file and '}' not in central_mapping_file:
-                    import json
+                if os.path.isabs(central_mapping_file):
                     debug_print(f"[CENTRAL_MAPPING] Condition passed, proceeding with file creation", "DEBUG")
                     
                     # Ensure directory exists
@@ -552,56 +638,49 @@ def start_ui(
                         debug_print(f"[CENTRAL_MAPPING] FAILED to create directory: {dir_e}", "ERROR")
                         raise dir_e
                     
-                    # Load existing mapping or create empty mapping if file doesn't exist
-                    mapping = {}
-                    if os.path.exists(central_mapping_file):
-                        try:
-                            with open(central_mapping_file, 'r') as f:
-                                mapping = json.load(f)
-                                debug_print(f"[CENTRAL_MAPPING] Loaded existing mapping: {mapping}", "DEBUG")
-                        except Exception as load_e:
-                            debug_print(f"[CENTRAL_MAPPING] Failed to load existing mapping, starting fresh: {load_e}", "WARNING")
-                            mapping = {}
-                    else:
-                        debug_print(f"[CENTRAL_MAPPING] No existing file, creating new mapping", "DEBUG")
-                    
-                    # CLEANUP STALE ENTRIES (prevent multiple ports for same workspace)
-                    # Remove entries that:
-                    # 1) Point to the same workspace (workspace moved to new port)
-                    # 2) Use the same port (port freed up, old mapping is stale)
-                    cleaned_mapping = {}
-                    for port, ws in mapping.items():
-                        # Keep entry only if it's NOT for our workspace and NOT for our port
-                        if ws != workspace_root and port != str(effective_port):
-                            cleaned_mapping[port] = ws
+                    # Serialize the read-modify-write with other launchers sharing this file
+                    with file_lock(central_mapping_file + ".lock"):
+                        # Load existing mapping or create empty mapping if file doesn't exist
+                        mapping = {}
+                        if os.path.exists(central_mapping_file):
+                            try:
+                                with open(central_mapping_file, 'r') as f:
+                                    mapping = json.load(f)
+                                    debug_print(f"[CENTRAL_MAPPING] Loaded existing mapping: {mapping}", "DEBUG")
+                            except Exception as load_e:
+                                debug_print(f"[CENTRAL_MAPPING] Failed to load existing mapping, starting fresh: {load_e}", "WARNING")
+                                mapping = {}
                         else:
-                            debug_print(f"[CENTRAL_MAPPING] Cleaned up stale entry: port {port} -> {ws}", "INFO")
+                            debug_print(f"[CENTRAL_MAPPING] No existing file, creating new mapping", "DEBUG")
                     
-                    mapping = cleaned_mapping
+                        # CLEANUP STALE ENTRIES (prevent multiple ports for same workspace)
+                        # Remove entries that:
+                        # 1) Point to the same workspace (workspace moved to new port)
+                        # 2) Use the same port (port freed up, old mapping is stale)
+                        effective_port_str = str(effective_port)
+                        cleaned_mapping = {
+                            p: ws for p, ws in mapping.items()
+                            if ws != workspace_root and p != effective_port_str
+                        }
+                        if len(cleaned_mapping) != len(mapping):
+                            debug_print(f"[CENTRAL_MAPPING] Cleaned up {len(mapping) - len(cleaned_mapping)} stale entries", "INFO")
+                        mapping = cleaned_mapping
                     
-                    # Add current UI port → workspace mapping
-                    mapping[str(effective_port)] = workspace_root
-                    debug_print(f"[CENTRAL_MAPPING] Registered port {effective_port} -> {workspace_root}", "INFO")
+                        # Add current UI port → workspace mapping
+                        mapping[effective_port_str] = workspace_root
+                        debug_print(f"[CENTRAL_MAPPING] Registered port {effective_port} -> {workspace_root}", "INFO")
                     
-                    # Save updated mapping with comprehensive error handling
-                    try:
-                        with open(central_mapping_file, 'w') as f:
-                            json.dump(mapping, f, indent=2)
-                        debug_print(f"[CENTRAL_MAPPING] ✓ SUCCESS: Central mapping file saved to {central_mapping_file}", "INFO")
-                        debug_print(f"[CENTRAL_MAPPING] ✓ Mapping contents: {mapping}", "DEBUG")
-                    except Exception as save_e:
-                        debug_print(f"[CENTRAL_MAPPING] ❌ FAILED to save mapping file: {save_e}", "ERROR")
-                        raise save_e
+                        # Save updated mapping with comprehensive error handling
+                        try:
+                            atomic_write_json(central_mapping_file, mapping)
+                            debug_print(f"[CENTRAL_MAPPING] ✓ SUCCESS: Central mapping file saved to {central_mapping_file}", "INFO")
+                            debug_print(f"[CENTRAL_MAPPING] ✓ Mapping contents: {mapping}", "DEBUG")
+                        except Exception as save_e:
+                            debug_print(f"[CENTRAL_MAPPING] ❌ FAILED to save mapping file: {save_e}", "ERROR")
+                            raise save_e
                 else:
                     debug_print(f"[CENTRAL_MAPPING] ❌ Condition FAILED for file: {central_mapping_file}", "ERROR")
-                    if not central_mapping_file:
-                        debug_print(f"[CENTRAL_MAPPING] ❌ Reason: central_mapping_file is empty", "ERROR")
-                    elif not os.path.isabs(central_mapping_file):
-                        debug_print(f"[CENTRAL_MAPPING] ❌ Reason: not an absolute path", "ERROR")
-                    elif '{' in central_mapping_file or '}' in central_mapping_file:
-                        debug_print(f"[CENTRAL_MAPPING] ❌ Reason: template replacement failed (contains braces)", "ERROR")
-                    else:
-                        debug_print(f"[CENTRAL_MAPPING] ❌ Reason: unknown condition failure", "ERROR")
+                    debug_print(f"[CENTRAL_MAPPING] ❌ Reason: not an absolute path", "ERROR")
             except Exception as reg_e:
                 debug_print(f"[CENTRAL_MAPPING] ❌ EXCEPTION during central mapping creation: {reg_e}", "ERROR")
                 import traceback
@@ -631,15 +710,14 @@ def start_ui(
     env["HOSTNAME"] = ui_host  # Alternative env var some frameworks use
     # FIXED: Use ui-cache for workspace environment variables - NO LEGACY FALLBACKS
     # Import UI cache functions from the central ConPort installation
-    central_conport_path = AIMED_UI_PATH.replace('/ui', '') if AIMED_UI_PATH else None
+    central_conport_path = CENTRAL_CONPORT_PATH
     if not central_conport_path:
         eprint(f"[launcher] ERROR: No central ConPort path available. Cannot create consolidated env_vars.json")
         eprint(f"[launcher] AIMED_UI_PATH is not configured. ConPort installation may be corrupted.")
         sys.exit(1)
     
-    sys.path.insert(0, central_conport_path)
     try:
-        from src.context_portal_mcp.core.ui_cache import save_workspace_env_vars, update_workspace_env_var
+        save_workspace_env_vars = ui_cache().save_workspace_env_vars
     except ImportError as e:
         eprint(f"[launcher] ERROR: Cannot import ui_cache functions: {e}")
         eprint(f"[launcher] ConPort installation at {central_conport_path} may be corrupted")
@@ -653,7 +731,7 @@ def start_ui(
     # Detect WSL2 IP if in isolated environment
     if is_isolated:
         wsl_ip = get_wsl_ip()
-        if wsl_ip and (("microsoft" in platform.uname().release.lower()) or bool(os.environ.get("WSL_DISTRO_NAME"))):
+        if wsl_ip and IS_WSL:
             # For WSL2, use WSL2 IP for both browser and API calls
             conport_server_url = f"http://{wsl_ip}:{server_port}/mcp/"
             debug_print(f"WSL2 detected - using WSL2 IP for MCP server URL: {wsl_ip}:{server_port}", "NETWORK")
@@ -836,7 +914,7 @@ def main():
         mcp_port = find_workspace_specific_mcp_port(workspace_root)
         debug_print(f"Using workspace-specific MCP server port {mcp_port}", "SERVER")
         # Get the central ConPort installation path
-        central_conport_path = AIMED_UI_PATH.replace('/ui', '') if AIMED_UI_PATH else None
+        central_conport_path = CENTRAL_CONPORT_PATH
         if not central_conport_path:
             # Try to detect ConPort installation location
             try:
@@ -1840,3 +1918,307 @@ def downgrade() -> None:
     
     log.warning("Reverted to buggy custom_data_fts schema")
 '''
+
+# Template for context history version indexes migration
+ADD_CONTEXT_HISTORY_INDEXES_CONTENT = '''"""Add version indexes to the context history tables
+
+Revision ID: 20251101
+Revises: 20251022
+Create Date: 2025-11-01 00:00:00.000000
+
+get_item_history orders by (version DESC, timestamp DESC) and usually applies
+a LIMIT. Without an index SQLite sorts the whole history table on every read;
+with a matching composite index it walks the index and stops after LIMIT rows.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import logging
+
+# revision identifiers, used by Alembic.
+revision = '20251101'
+down_revision = '20251022'
+branch_labels = None
+depends_on = None
+
+log = logging.getLogger(__name__)
+
+
+def upgrade() -> None:
+    """Create (version DESC, timestamp DESC) indexes on both context history tables."""
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_product_context_history_version "
+        "ON product_context_history (version DESC, timestamp DESC)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_active_context_history_version "
+        "ON active_context_history (version DESC, timestamp DESC)"
+    )
+    log.info("Created context history version indexes")
+
+
+def downgrade() -> None:
+    """Drop the context history version indexes."""
+    op.execute("DROP INDEX IF EXISTS idx_product_context_history_version")
+    op.execute("DROP INDEX IF EXISTS idx_active_context_history_version")
+'''
+
+ADD_CONTEXT_LINK_INDEXES_CONTENT = '''"""Add composite lookup indexes to context_links
+
+Revision ID: 20251108
+Revises: 20251101
+Create Date: 2025-11-08 00:00:00.000000
+
+get_context_links looks links up by (source_item_type, source_item_id) and by
+(target_item_type, target_item_id), one UNION ALL arm each, ordered by timestamp.
+The original single-column indexes only cover one of those columns, so SQLite
+scans every link of a given type; a composite index per end turns each arm into
+a direct seek.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import logging
+
+# revision identifiers, used by Alembic.
+revision = '20251108'
+down_revision = '20251101'
+branch_labels = None
+depends_on = None
+
+log = logging.getLogger(__name__)
+
+
+def upgrade() -> None:
+    """Create (item_type, item_id, timestamp DESC) indexes for both link ends."""
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_context_links_source "
+        "ON context_links (source_item_type, source_item_id, timestamp DESC)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_context_links_target "
+        "ON context_links (target_item_type, target_item_id, timestamp DESC)"
+    )
+    log.info("Created context_links composite lookup indexes")
+
+
+def downgrade() -> None:
+    """Drop the context_links composite lookup indexes."""
+    op.execute("DROP INDEX IF EXISTS idx_context_links_source")
+    op.execute("DROP INDEX IF EXISTS idx_context_links_target")
+'''
+
+ADD_TAG_SIDE_TABLES_CONTENT = '''"""Add decision_tags / system_pattern_tags side tables
+
+Revision ID: 20251115
+Revises: 20251108
+Create Date: 2025-11-15 00:00:00.000000
+
+Tag filters used to run json_each over the tags column of every row. These
+tables hold one (owner id, tag) row per tag, kept in sync with the JSON tags
+column by triggers, so include_all / include_any become indexed lookups.
+The tags column itself stays the source of truth.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import logging
+
+# revision identifiers, used by Alembic.
+revision = '20251115'
+down_revision = '20251108'
+branch_labels = None
+depends_on = None
+
+log = logging.getLogger(__name__)
+
+# (side table, owner column, source table)
+_TAG_TABLES = (
+    ("decision_tags", "decision_id", "decisions"),
+    ("system_pattern_tags", "pattern_id", "system_patterns"),
+)
+
+_BLANKS = "' ' || char(9) || char(10) || char(13)"
+
+
+def _tags_array(col: str) -> str:
+    """`col` as a JSON array: JSON arrays as-is, legacy 'a, b' text split on commas."""
+    legacy = (
+        f"""'["' || replace(replace(replace(replace(replace(replace({col}, """
+        "char(92), char(92) || char(92)), char(34), char(92) || char(34)), "
+        "char(9), char(92) || 't'), char(10), char(92) || 'n'), "
+        f"""char(13), char(92) || 'r'), ',', '","') || '"]'"""
+    )
+    return (
+        f"CASE WHEN NOT json_valid({col}) THEN {legacy} "
+        f"WHEN json_type({col}) = 'array' THEN {col} ELSE {legacy} END"
+    )
+
+
+def _select_tags(owner_id: str, col: str, from_prefix: str = "") -> str:
+    """SELECT of (owner id, tag) rows for a tags value; legacy tags are trimmed."""
+    return (
+        f"SELECT {owner_id}, CASE WHEN json_valid({col}) AND json_type({col}) = 'array' "
+        f"THEN value ELSE trim(value, {_BLANKS}) END "
+        f"FROM {from_prefix}json_each({_tags_array(col)}) WHERE type = 'text'"
+    )
+
+
+def upgrade() -> None:
+    """Create the tag side tables, their sync triggers, and backfill existing rows."""
+    for tag_table, owner, source in _TAG_TABLES:
+        op.execute(f"""
+        CREATE TABLE IF NOT EXISTS {tag_table} (
+            {owner} INTEGER NOT NULL,
+            tag TEXT NOT NULL,
+            PRIMARY KEY ({owner}, tag)
+        ) WITHOUT ROWID
+        """)
+        op.execute(f"CREATE INDEX IF NOT EXISTS idx_{tag_table}_tag ON {tag_table} (tag, {owner})")
+
+        op.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {tag_table}_after_insert AFTER INSERT ON {source}
+        BEGIN
+            INSERT OR IGNORE INTO {tag_table} ({owner}, tag) {_select_tags("new.id", "new.tags")};
+        END;
+        """)
+        op.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {tag_table}_after_update AFTER UPDATE OF tags ON {source}
+        BEGIN
+            DELETE FROM {tag_table} WHERE {owner} = old.id;
+            INSERT OR IGNORE INTO {tag_table} ({owner}, tag) {_select_tags("new.id", "new.tags")};
+        END;
+        """)
+        op.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {tag_table}_after_delete AFTER DELETE ON {source}
+        BEGIN
+            DELETE FROM {tag_table} WHERE {owner} = old.id;
+        END;
+        """)
+
+        op.execute(
+            f"INSERT OR IGNORE INTO {tag_table} ({owner}, tag) "
+            + _select_tags(f"{source}.id", f"{source}.tags", from_prefix=f"{source}, ")
+        )
+    log.info("Created and backfilled decision_tags / system_pattern_tags")
+
+
+def downgrade() -> None:
+    """Drop the tag side tables and their triggers."""
+    for tag_table, _owner, _source in _TAG_TABLES:
+        for suffix in ("after_insert", "after_update", "after_delete"):
+            op.execute(f"DROP TRIGGER IF EXISTS {tag_table}_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {tag_table}")
+    log.info("Dropped decision_tags / system_pattern_tags")
+'''
+
+NORMALIZE_LEGACY_TAGS_CONTENT = '''"""Rewrite legacy comma-separated tags as canonical JSON arrays
+
+Revision ID: 20251122
+Revises: 20251115
+Create Date: 2025-11-22 00:00:00.000000
+
+Tags are written as a canonical JSON array (trimmed, de-duplicated, sorted), but
+rows from older versions may still hold 'tag1, tag2' text, which every reader has
+to detect and split again on each read. Rewrite those rows once into the canonical
+form so reads always take the JSON path. Empty legacy values (e.g. ' , ') become
+NULL, matching how they were read. The tag side-table triggers fire on the UPDATE
+and keep decision_tags / system_pattern_tags in sync.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import logging
+
+# revision identifiers, used by Alembic.
+revision = '20251122'
+down_revision = '20251115'
+branch_labels = None
+depends_on = None
+
+log = logging.getLogger(__name__)
+
+_TAGGED_TABLES = ("decisions", "system_patterns")
+
+_BLANKS = "' ' || char(9) || char(10) || char(13)"
+
+
+def _canonical_tags(col: str) -> str:
+    """Legacy 'a, b' text in `col` as a sorted, de-duplicated JSON array (NULL if no tags)."""
+    legacy_array = (
+        f"""'["' || replace(replace(replace(replace(replace(replace({col}, """
+        "char(92), char(92) || char(92)), char(34), char(92) || char(34)), "
+        "char(9), char(92) || 't'), char(10), char(92) || 'n'), "
+        f"""char(13), char(92) || 'r'), ',', '","') || '"]'"""
+    )
+    return (
+        "(SELECT CASE WHEN count(*) = 0 THEN NULL ELSE json_group_array(tag) END "
+        f"FROM (SELECT DISTINCT trim(value, {_BLANKS}) AS tag FROM json_each({legacy_array}) "
+        f"WHERE trim(value, {_BLANKS}) != '' ORDER BY tag))"
+    )
+
+
+def upgrade() -> None:
+    """Rewrite non-JSON tags values in place."""
+    for table in _TAGGED_TABLES:
+        op.execute(
+            f"UPDATE {table} SET tags = {_canonical_tags('tags')} "
+            "WHERE tags IS NOT NULL AND tags != '' "
+            "AND NOT (json_valid(tags) AND json_type(tags) = 'array')"
+        )
+    log.info("Rewrote legacy comma-separated tags as JSON arrays")
+
+
+def downgrade() -> None:
+    """No-op: JSON tags are also readable by the previous schema version."""
+    pass
+'''
+
+ADD_TIMESTAMP_INDEXES_CONTENT = '''"""Add timestamp indexes to the tables read newest-first
+
+Revision ID: 20251129
+Revises: 20251122
+Create Date: 2025-11-29 00:00:00.000000
+
+The recent-activity report reads each of these tables with
+`WHERE timestamp >= ? ORDER BY timestamp DESC LIMIT ?`, and get_progress lists
+entries by `ORDER BY timestamp DESC`. Without an index on timestamp SQLite scans
+and sorts the whole table; with one it walks the index from the newest row and
+stops after LIMIT rows. ANALYZE refreshes the planner statistics afterwards.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import logging
+
+# revision identifiers, used by Alembic.
+revision = '20251129'
+down_revision = '20251122'
+branch_labels = None
+depends_on = None
+
+log = logging.getLogger(__name__)
+
+_TIMESTAMP_TABLES = (
+    "decisions",
+    "progress_entries",
+    "system_patterns",
+    "context_links",
+    "product_context_history",
+    "active_context_history",
+)
+
+
+def upgrade() -> None:
+    """Create a (timestamp DESC) index per table and re-analyze them."""
+    for table in _TIMESTAMP_TABLES:
+        op.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_timestamp ON {table} (timestamp DESC)")
+        op.execute(f"ANALYZE {table}")
+    log.info("Created timestamp indexes")
+
+
+def downgrade() -> None:
+    """Drop the timestamp indexes."""
+    for table in _TIMESTAMP_TABLES:
+        op.execute(f"DROP INDEX IF EXISTS idx_{table}_timestamp")
+'''
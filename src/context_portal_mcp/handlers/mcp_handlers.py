@@ -178,13 +178,14 @@ def handle_get_decisions(args: models.GetDecisionsArgs) -> List[Dict[str, Any]]:
     """
     try:
         normalized_workspace_id = normalize_workspace_id(args.workspace_id)
-        decisions_list = db.get_decisions(
+        # SQLite renders the decisions as JSON directly (same shape as model_dump(mode='json'))
+        decisions_json = db.get_decisions_json(
             normalized_workspace_id,
             limit=args.limit,
             tags_filter_include_all=args.tags_filter_include_all,
             tags_filter_include_any=args.tags_filter_include_any
         )
-        return [d.model_dump(mode='json') for d in decisions_list]
+        return json.loads(decisions_json)
     except DatabaseError as e:
         raise ContextPortalError(f"Database error getting decisions: {e}")
     except Exception as e:
@@ -570,12 +571,13 @@ def handle_get_system_patterns(args: models.GetSystemPatternsArgs) -> List[Dict[
     """
     try:
         normalized_workspace_id = normalize_workspace_id(args.workspace_id)
-        patterns_list = db.get_system_patterns(
+        # SQLite renders the patterns as JSON directly (same shape as model_dump(mode='json'))
+        patterns_json = db.get_system_patterns_json(
             normalized_workspace_id,
             tags_filter_include_all=args.tags_filter_include_all,
             tags_filter_include_any=args.tags_filter_include_any
         )
-        return [p.model_dump(mode='json') for p in patterns_list]
+        return json.loads(patterns_json)
     except DatabaseError as e:
         raise ContextPortalError(f"Database error getting system patterns: {e}")
     except Exception as e:
@@ -1293,7 +1295,8 @@ def handle_get_linked_items(args: models.GetLinkedItemsArgs) -> List[Dict[str, A
     """
     try:
         normalized_workspace_id = normalize_workspace_id(args.workspace_id)
-        links_list = db.get_context_links(
+        # SQLite renders the links as JSON directly (same shape as model_dump(mode='json'))
+        links_json = db.get_context_links_json(
             workspace_id=normalized_workspace_id,
             item_type=args.item_type,
             item_id=args.item_id,
@@ -1301,7 +1304,7 @@ def handle_get_linked_items(args: models.GetLinkedItemsArgs) -> List[Dict[str, A
             linked_item_type_filter=args.linked_item_type_filter,
             limit=args.limit
         )
-        return [link.model_dump(mode='json') for link in links_list]
+        return json.loads(links_json)
     except DatabaseError as e:
         raise ContextPortalError(f"Database error retrieving context links: {e}")
     except Exception as e:
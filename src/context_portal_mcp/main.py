@@ -56,8 +56,8 @@ def _maybe_capture_and_annotate(
 ) -> Any:
     """If capture enabled, write result.
 
-    For list results, shape is preserved; filename is stored in output_capture.last_capture_file
-    via the cache for visibility through get_output_capture_status.
+    For list results, shape is preserved; filename is stored as last_capture_file
+    (mcp-cache/last_capture.json) for visibility through get_output_capture_status.
 
     IMPORTANT: By default we **do not modify tool return values**. Some MCP clients
     validate tool responses strictly and will error if extra fields are injected.
@@ -496,7 +496,7 @@ def _build_output_capture_help_payload() -> Dict[str, Any]:
                 ],
             },
             "response_annotation": "Tool responses are NOT modified when capture is enabled (to avoid breaking strict output validators).",
-            "persistence": "Workspace-scoped config is stored in <workspace_id>/context_portal_aimed/mcp-cache/output_capture.json",
+            "persistence": "Workspace-scoped config is stored in <workspace_id>/context_portal_aimed/mcp-cache/output_capture.json (last captured file in last_capture.json)",
             "finding_the_file": {
                 "lightweight": "Call get_last_capture_file(workspace_id)",
                 "last_n_or_filters": "Call list_captured_files(workspace_id, limit=..., name_like=..., since=..., until=...)",
@@ -1891,9 +1891,8 @@ def main_logic(sys_args=None):
         try:
             # Also ensure the default output_capture setting exists, with enabled=false.
             mcp_cache.get_mcp_cache_dir(args.workspace_id)
-            mcp_cache.save_mcp_setting(
+            mcp_cache.save_output_capture_config(
                 args.workspace_id,
-                "output_capture",
                 mcp_cache.get_output_capture_config(args.workspace_id),
             )
         except Exception as e:
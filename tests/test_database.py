@@ -0,0 +1,245 @@
+import contextlib
+import json
+import sqlite3
+import tempfile
+
+import pytest
+
+from src.context_portal_mcp.core.exceptions import DatabaseError
+from src.context_portal_mcp.db import database as db
+from src.context_portal_mcp.db import models
+from src.context_portal_mcp.db._tags import parse_tags
+
+
+@contextlib.contextmanager
+def workspace():
+    """A fresh workspace directory whose connections are closed before it is removed."""
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            yield tmp
+        finally:
+            db.close_db_connection(tmp)
+
+
+def _unstorable_decision() -> models.Decision:
+    # Skips validation so the row reaches SQLite and trips the NOT NULL constraint on summary
+    return models.Decision.model_construct(
+        id=None, timestamp=models.Decision(summary="x").timestamp,
+        summary=None, rationale=None, implementation_details=None, tags=None,
+    )
+
+
+def test_log_decisions_many_writes_nothing_and_assigns_no_ids_when_one_row_fails():
+    with workspace() as workspace_id:
+        first = models.Decision(summary="first", tags=["a"])
+        second = models.Decision(summary="second")
+
+        with pytest.raises(DatabaseError):
+            db.log_decisions_many(workspace_id, [first, second, _unstorable_decision()])
+
+        assert db.get_decisions(workspace_id) == []
+        assert first.id is None and second.id is None
+
+        logged = db.log_decisions_many(workspace_id, [first, second])
+        assert all(d.id is not None for d in logged)
+        assert sorted(d.id for d in logged) == sorted(d.id for d in db.get_decisions(workspace_id))
+
+
+def test_transaction_rolls_back_every_write_when_the_block_raises():
+    with workspace() as workspace_id:
+        with pytest.raises(RuntimeError):
+            with db.transactional(workspace_id):
+                db.log_decision(workspace_id, models.Decision(summary="outer"))
+                # A nested writer joins the outer transaction instead of committing early
+                db.log_progress(workspace_id, models.ProgressEntry(status="TODO", description="inner"))
+                raise RuntimeError("abort")
+
+        assert db.get_decisions(workspace_id) == []
+        assert db.get_progress(workspace_id) == []
+
+        # The writer is usable again afterwards
+        db.log_decision(workspace_id, models.Decision(summary="after"))
+        assert [d.summary for d in db.get_decisions(workspace_id)] == ["after"]
+
+
+def test_uncommitted_writes_are_visible_only_inside_the_transaction():
+    from concurrent.futures import ThreadPoolExecutor
+
+    with workspace() as workspace_id:
+        with db.transactional(workspace_id), ThreadPoolExecutor(max_workers=1) as other_thread:
+            db.log_decision(workspace_id, models.Decision(summary="pending"))
+            # Reads on the transaction's thread go to the writer and see the pending row
+            assert [d.summary for d in db.get_decisions(workspace_id)] == ["pending"]
+            # Other threads read through a pooled read-only connection
+            assert other_thread.submit(db.get_decisions, workspace_id).result() == []
+        assert [d.summary for d in db.get_decisions(workspace_id)] == ["pending"]
+
+
+def test_reader_connections_are_read_only_and_reused():
+    with workspace() as workspace_id:
+        pool = db.get_connection_pool(workspace_id)
+        with pool.reader() as conn:
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute("DELETE FROM decisions")
+        with pool.reader() as again:
+            assert again is conn
+
+
+def _python_merge(content, patch):
+    """The merge update_*_context performed in Python before it moved to JSON1."""
+    merged = dict(content)
+    for key, value in patch.items():
+        if value == "__DELETE__":
+            merged.pop(key, None)
+        else:
+            merged[key] = value
+    return merged
+
+
+@pytest.mark.parametrize("patch", [
+    {"status": "active", "count": 3, "ratio": 0.5, "done": False, "nothing": None},
+    {"nested": {"a": [1, {"b": "c"}]}, "list": [], "unicode": "héllo ✓"},
+    {"keep": "__DELETE__", "missing": "__DELETE__", "new": "value"},
+    {"dotted.key": 1, "spaced key": 2, "[bracket]": 3, "back\\slash": 4},
+    # '"' cannot be written as a JSON path, so this patch takes the Python fallback
+    {'quoted"key': 1, "keep": "__DELETE__"},
+])
+def test_context_patch_matches_python_merge(patch):
+    initial = {"keep": 1, "nested": {"old": True}, "dotted.key": 0, "status": "draft"}
+    with workspace() as workspace_id:
+        db.update_active_context(workspace_id, models.UpdateContextArgs(workspace_id=workspace_id, content=initial))
+        db.update_active_context(workspace_id, models.UpdateContextArgs(workspace_id=workspace_id, patch_content=patch))
+
+        assert db.get_active_context(workspace_id).content == _python_merge(initial, patch)
+        # The pre-patch content was recorded as the latest history version
+        history = db.get_item_history(workspace_id, models.GetItemHistoryArgs(workspace_id=workspace_id, item_type="active_context", limit=1))
+        assert history[0]["content"] == initial
+
+
+def test_json_endpoints_match_model_dumps():
+    with workspace() as workspace_id:
+        db.log_decisions_many(workspace_id, [
+            models.Decision(summary="first", rationale="r", tags=["b", "a"]),
+            models.Decision(summary="second", implementation_details="d"),
+        ])
+        db.log_system_pattern(workspace_id, models.SystemPattern(name="pattern", description="d", tags=["t"]))
+        db.log_context_link(workspace_id, models.ContextLink(
+            source_item_type="decision", source_item_id="1",
+            target_item_type="system_pattern", target_item_id="1", relationship_type="implements",
+        ))
+
+        assert json.loads(db.get_decisions_json(workspace_id)) == [
+            d.model_dump(mode="json") for d in db.get_decisions(workspace_id)
+        ]
+        assert json.loads(db.get_decisions_json(workspace_id, limit=1, tags_filter_include_any=["a"])) == [
+            d.model_dump(mode="json") for d in db.get_decisions(workspace_id, limit=1, tags_filter_include_any=["a"])
+        ]
+        assert json.loads(db.get_system_patterns_json(workspace_id)) == [
+            p.model_dump(mode="json") for p in db.get_system_patterns(workspace_id)
+        ]
+        assert json.loads(db.get_context_links_json(workspace_id, "decision", "1")) == [
+            link.model_dump(mode="json") for link in db.get_context_links(workspace_id, "decision", "1")
+        ]
+
+
+# Stored tags values as written by older versions (legacy comma-separated text) next to
+# canonical JSON arrays
+_STORED_TAGS = [
+    "a, b", "b,c", " a ", "c", "a,,b", " , ", "", None,
+    '["a", "c"]', "x y, a", 'q"uote, a\\b', "[not json, c",
+]
+
+_TAG_FILTERS = [
+    (["a"], None), (["a", "b"], None), (["a", "a"], None), (None, ["c"]),
+    (None, ["b", "x y"]), (["a"], ["c", 'q"uote']), (None, ["a\\b"]), (["missing"], None),
+]
+
+
+def _python_tag_filter(rows, include_all, include_any):
+    """The Python-side filtering get_decisions did before tags moved to the side table."""
+    matched = []
+    for row_id, stored in rows:
+        tags = parse_tags(stored)
+        if include_all and not (tags and all(tag in tags for tag in include_all)):
+            continue
+        if include_any and not (tags and any(tag in tags for tag in include_any)):
+            continue
+        matched.append(row_id)
+    return sorted(matched)
+
+
+def _assert_tag_filters_match(workspace_id, rows):
+    for include_all, include_any in _TAG_FILTERS:
+        expected = _python_tag_filter(rows, include_all, include_any)
+        decisions = db.get_decisions(workspace_id, tags_filter_include_all=include_all, tags_filter_include_any=include_any)
+        patterns = db.get_system_patterns(workspace_id, tags_filter_include_all=include_all, tags_filter_include_any=include_any)
+        assert sorted(d.id for d in decisions) == expected, (include_all, include_any)
+        assert sorted(p.id for p in patterns) == expected, (include_all, include_any)
+
+
+def _insert_raw_tagged_rows(conn):
+    """Inserts one decision and one system pattern per stored tags value, bypassing encode_tags."""
+    rows = []
+    for i, stored in enumerate(_STORED_TAGS):
+        row_id = conn.execute(
+            "INSERT INTO decisions (timestamp, summary, tags) VALUES (datetime('now'), ?, ?) RETURNING id",
+            (f"decision {i}", stored),
+        ).fetchone()[0]
+        conn.execute(
+            "INSERT INTO system_patterns (id, timestamp, name, tags) VALUES (?, datetime('now'), ?, ?)",
+            (row_id, f"pattern {i}", stored),
+        )
+        rows.append((row_id, stored))
+    return rows
+
+
+def test_tag_filters_on_legacy_tags_match_python_filtering():
+    with workspace() as workspace_id:
+        # Raw inserts and updates go through the side-table triggers only
+        with db.transactional(workspace_id) as conn:
+            rows = _insert_raw_tagged_rows(conn)
+        _assert_tag_filters_match(workspace_id, rows)
+
+        with db.transactional(workspace_id) as conn:
+            conn.execute("UPDATE decisions SET tags = 'c, a' WHERE id = ?", (rows[0][0],))
+            conn.execute("UPDATE system_patterns SET tags = 'c, a' WHERE id = ?", (rows[0][0],))
+        rows[0] = (rows[0][0], "c, a")
+        _assert_tag_filters_match(workspace_id, rows)
+
+
+def test_tag_migrations_backfill_legacy_tags():
+    with workspace() as workspace_id:
+        db.get_connection_pool(workspace_id)
+        db_path = db.get_database_path(workspace_id)
+        db.close_db_connection(workspace_id)
+
+        # Rewind the database to before the tag side tables (20251108) with legacy rows in it
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        try:
+            for tag_table in ("decision_tags", "system_pattern_tags"):
+                for suffix in ("after_insert", "after_update", "after_delete"):
+                    conn.execute(f"DROP TRIGGER {tag_table}_{suffix}")
+                conn.execute(f"DROP TABLE {tag_table}")
+            rows = _insert_raw_tagged_rows(conn)
+            conn.execute("UPDATE alembic_version SET version_num = '20251108'")
+        finally:
+            conn.close()
+
+        # Reconnecting runs the side-table, legacy-rewrite and index migrations again
+        _assert_tag_filters_match(workspace_id, rows)
+        # Legacy values were rewritten as JSON arrays holding the same tags
+        decisions = {d.id: d.tags for d in db.get_decisions(workspace_id)}
+        for row_id, stored in rows:
+            assert set(decisions[row_id] or []) == set(parse_tags(stored) or []), stored
+
+
+def test_logged_items_carry_the_tags_as_stored():
+    with workspace() as workspace_id:
+        decision = db.log_decision(workspace_id, models.Decision(summary="d", tags=[" b ", "a", "a", ""]))
+        pattern = db.log_system_pattern(workspace_id, models.SystemPattern(name="p", tags=["z", "y"]))
+        untagged = db.log_decision(workspace_id, models.Decision(summary="none"))
+
+        stored = {d.id: d for d in db.get_decisions(workspace_id)}
+        assert decision.tags == stored[decision.id].tags == ["a", "b"]
+        assert untagged.tags is None and stored[untagged.id].tags is None
+        assert pattern.tags == db.get_system_patterns(workspace_id)[0].tags == ["y", "z"]
@@ -147,3 +147,174 @@ def test_output_capture_help_tool_is_static_and_mentions_paths():
     how = payload.get("how_it_works", {})
     assert "conport-aimed_output" in how.get("where_files_go", "")
     assert "mcp-cache" in how.get("persistence", "")
+
+
+def test_load_mcp_setting_cache_is_written_through_and_sees_external_edits():
+    with tempfile.TemporaryDirectory() as tmp:
+        workspace_id = tmp
+        mcp_cache.save_mcp_setting(workspace_id, "demo", {"v": 1})
+        assert mcp_cache.load_mcp_setting(workspace_id, "demo") == {"v": 1}
+
+        mcp_cache.save_mcp_setting(workspace_id, "demo", {"v": 2})
+        assert mcp_cache.load_mcp_setting(workspace_id, "demo") == {"v": 2}
+
+        # An external edit changes the file's mtime, which invalidates the entry.
+        cache_file = Path(workspace_id) / "context_portal_aimed" / "mcp-cache" / "demo.json"
+        cache_file.write_text(json.dumps({"data": {"v": 3}}))
+        st = cache_file.stat()
+        os.utime(cache_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        assert mcp_cache.load_mcp_setting(workspace_id, "demo") == {"v": 3}
+
+
+def test_last_capture_pointer_is_persisted_on_flush():
+    with tempfile.TemporaryDirectory() as tmp:
+        workspace_id = tmp
+        mcp_cache.set_output_capture_config(workspace_id, enabled=True, base_filename="results.json")
+        rel = mcp_cache.write_captured_result(workspace_id, "dummy_tool", {"a": 1})
+        mcp_cache.flush_last_capture_pointers()
+
+        cache_file = Path(workspace_id) / "context_portal_aimed" / "mcp-cache" / "last_capture.json"
+        data = json.loads(cache_file.read_text())
+        assert data["data"]["last_capture_file"] == rel
+        assert data["data"]["last_capture_tool"] == "dummy_tool"
+
+
+def test_write_captured_result_async_mode_writes_after_flush(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        workspace_id = tmp
+        monkeypatch.setattr(mcp_cache, "CAPTURE_ASYNC", True)
+        mcp_cache.set_output_capture_config(workspace_id, enabled=True, base_filename="results.json")
+        rel = mcp_cache.write_captured_result(workspace_id, "dummy_tool", {"a": 1})
+        assert rel is not None
+        mcp_cache.flush_captures()
+        payload = json.loads((Path(workspace_id) / rel).read_text())
+        assert payload["result"] == {"a": 1}
+
+
+def test_save_and_capture_recreate_directories_removed_while_running():
+    import shutil
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workspace_id = tmp
+        mcp_cache.set_output_capture_config(workspace_id, enabled=True, base_filename="results.json")
+        rel = mcp_cache.write_captured_result(workspace_id, "dummy_tool", {"a": 1})
+        assert rel is not None
+
+        # Both directories are memoized by now; deleting them must not break later writes.
+        cache_dir = Path(workspace_id) / "context_portal_aimed" / "mcp-cache"
+        output_dir = Path(workspace_id) / "conport-aimed_output"
+        shutil.rmtree(cache_dir)
+        shutil.rmtree(output_dir)
+
+        # Removing mcp-cache also removed the saved config, so enable capture again.
+        mcp_cache.set_output_capture_config(workspace_id, enabled=True, base_filename="results.json")
+        assert (cache_dir / "output_capture.json").exists()
+        rel = mcp_cache.write_captured_result(workspace_id, "dummy_tool", {"b": 2})
+        assert rel is not None
+        assert json.loads((Path(workspace_id) / rel).read_text())["result"] == {"b": 2}
+
+
+def test_saving_merged_config_does_not_copy_last_capture_pointers():
+    with tempfile.TemporaryDirectory() as tmp:
+        workspace_id = tmp
+        mcp_cache.set_output_capture_config(workspace_id, enabled=True, base_filename="results.json")
+        mcp_cache.write_captured_result(workspace_id, "dummy_tool", {"a": 1})
+        mcp_cache.flush_last_capture_pointers()
+
+        # As done at server startup: re-save the merged config.
+        mcp_cache.save_output_capture_config(workspace_id, mcp_cache.get_output_capture_config(workspace_id))
+
+        cache_file = Path(workspace_id) / "context_portal_aimed" / "mcp-cache" / "output_capture.json"
+        stored = json.loads(cache_file.read_text())["data"]
+        assert stored["enabled"] is True
+        assert "last_capture_file" not in stored
+        assert "last_capture_tool" not in stored
+
+
+def test_update_workspace_env_var_does_not_mutate_cached_env_vars(monkeypatch):
+    from src.context_portal_mcp.core import ui_cache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workspace_id = tmp
+        ui_cache.save_workspace_env_vars(workspace_id, {"workspace_id": workspace_id, "ui_port": 3000})
+        before = ui_cache.load_workspace_env_vars(workspace_id)
+
+        def fail(*args, **kwargs):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(ui_cache, "save_workspace_env_vars", fail)
+        with pytest.raises(OSError):
+            ui_cache.update_workspace_env_var(workspace_id, "ui_port", 3001)
+
+        # Neither the dict handed out earlier nor the cache picked up the failed change.
+        assert before["ui_port"] == 3000
+        assert ui_cache.load_workspace_env_vars(workspace_id)["ui_port"] == 3000
+
+
+def test_legacy_ui_preference_migration_leaves_unrelated_json_files():
+    from src.context_portal_mcp.core import ui_cache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workspace_id = tmp
+        ui_cache_dir = Path(workspace_id) / "context_portal_aimed" / "ui-cache"
+        ui_cache_dir.mkdir(parents=True)
+        legacy = ui_cache_dir / "dashboard_settings.json"
+        legacy.write_text(json.dumps({"updated_at": "2025-01-01T00:00:00", "data": {"layout": "grid"}}))
+        unrelated = ui_cache_dir / "notes.json"
+        unrelated.write_text(json.dumps({"hello": "world"}))
+
+        assert ui_cache.load_ui_preference(workspace_id, "dashboard_settings") == {"layout": "grid"}
+        assert not legacy.exists()
+        assert json.loads(unrelated.read_text()) == {"hello": "world"}
+
+
+def test_ui_state_saves_from_concurrent_processes_are_not_lost():
+    import subprocess
+    import sys
+
+    from src.context_portal_mcp.core import ui_cache
+
+    writer = (
+        "import sys\n"
+        "from src.context_portal_mcp.core import ui_cache\n"
+        "workspace_id, name = sys.argv[1], sys.argv[2]\n"
+        "for i in range(20):\n"
+        "    ui_cache.save_ui_preference(workspace_id, f'{name}_{i}', i)\n"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        workspace_id = tmp
+        procs = [
+            subprocess.Popen([sys.executable, "-c", writer, workspace_id, f"p{n}"], cwd=os.getcwd())
+            for n in range(4)
+        ]
+        assert all(p.wait(timeout=60) == 0 for p in procs)
+
+        for n in range(4):
+            for i in range(20):
+                assert ui_cache.load_ui_preference(workspace_id, f"p{n}_{i}") == i
+
+
+def test_central_port_mapping_sees_same_tick_replacements_and_updates_in_place(monkeypatch):
+    from src.context_portal_mcp.core import ui_cache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        monkeypatch.setattr(ui_cache, "_CENTRAL_UI_CACHE_DIR", Path(tmp))
+        mapping_file = Path(tmp) / "port_workspace_mapping.json"
+
+        assert ui_cache.register_workspace_ui_port(3000, "/ws/a")
+        assert ui_cache.register_workspace_ui_port(3001, "/ws/b")
+        assert json.loads(mapping_file.read_text()) == {"3000": "/ws/a", "3001": "/ws/b"}
+        assert ui_cache.lookup_workspace_by_ui_port(3000) == "/ws/a"
+
+        # Another process (the launcher) replaces the file within the same mtime tick
+        st = mapping_file.stat()
+        replacement = Path(tmp) / "replacement.json"
+        replacement.write_text(json.dumps({"3000": "/ws/c", "3001": "/ws/b"}, separators=(",", ":")))
+        os.replace(replacement, mapping_file)
+        os.utime(mapping_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+        assert ui_cache.lookup_workspace_by_ui_port(3000) == "/ws/c"
+
+        assert ui_cache.cleanup_workspace_ui_port(3000)
+        assert json.loads(mapping_file.read_text()) == {"3001": "/ws/b"}
+        assert (Path(tmp) / "port_workspace_mapping.json.lock").exists()
+        assert not [p for p in Path(tmp).iterdir() if ".tmp" in p.name]